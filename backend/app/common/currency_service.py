@@ -1,76 +1,130 @@
 import re
-import requests
-from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from backend.app.common.models import ExchangeRate
-from backend.app.core.database import SessionLocal
-
-# Cache rates in memory briefly to avoid DB hits on every row
-_RATE_CACHE = {}
-_LAST_CACHE_UPDATE = None
-
-def update_exchange_rates(db: Session):
-    """Fetch latest rates from API and update DB."""
-    try:
-        # Using a free API (e.g., exchangerate-api.com or similar)
-        # Base: CNY. If API doesn't support Base CNY for free, fetch USD and convert.
-        # frankfurter.app is free and supports base.
-        response = requests.get("https://api.frankfurter.app/latest?from=CNY")
-        if response.status_code == 200:
-            data = response.json()
-            rates = data.get("rates", {})
-            
-            # Update DB
-            # Note: Frankfurter gives rates FROM CNY. So 1 CNY = X USD.
-            # We want to convert TO CNY. So we need rate X Foreign = 1 CNY?
-            # No, usually we have Foreign Amount, want CNY.
-            # If 1 CNY = 0.14 USD, then 1 USD = 1/0.14 CNY.
-            # Let's store the rate TO CNY.
-            
-            for currency, rate_from_cny in rates.items():
-                if rate_from_cny == 0: continue
-                rate_to_cny = 1 / rate_from_cny
-                
-                db_rate = db.get(ExchangeRate, currency)
-                if not db_rate:
-                    db_rate = ExchangeRate(currency_code=currency)
-                    db.add(db_rate)
-                
-                db_rate.rate_to_cny = rate_to_cny
-                db_rate.updated_at = datetime.now()
-            
-            # Also ensure USD is there (Frankfurter might not have all, but usually does)
-            # Add CNY itself
-            cny_rate = db.get(ExchangeRate, "CNY")
-            if not cny_rate:
-                cny_rate = ExchangeRate(currency_code="CNY", rate_to_cny=1.0, updated_at=datetime.now())
-                db.add(cny_rate)
-            else:
-                cny_rate.rate_to_cny = 1.0
-                cny_rate.updated_at = datetime.now()
-                
-            db.commit()
-            print("Exchange rates updated successfully.")
-    except Exception as e:
-        print(f"Failed to update exchange rates: {e}")
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# update_exchange_rates is re-exported for existing callers
+from backend.app.common.exchange_rates import rate_provider, update_exchange_rates  # noqa: F401
+
 
 def get_rate(currency: str) -> float:
-    """Get rate to convert Currency -> CNY."""
-    global _RATE_CACHE, _LAST_CACHE_UPDATE
-    
-    # Refresh cache if empty or old (e.g. 1 hour)
-    if not _RATE_CACHE or not _LAST_CACHE_UPDATE or datetime.now() - _LAST_CACHE_UPDATE > timedelta(hours=1):
-        with SessionLocal() as db:
-            rates = db.query(ExchangeRate).all()
-            if not rates:
-                # Try update if empty
-                update_exchange_rates(db)
-                rates = db.query(ExchangeRate).all()
-            
-            _RATE_CACHE = {r.currency_code: r.rate_to_cny for r in rates}
-            _LAST_CACHE_UPDATE = datetime.now()
-    
-    return _RATE_CACHE.get(currency.upper(), 1.0) # Default 1.0 if not found
+    """Get rate to convert Currency -> CNY (never blocks on the rate API, see exchange_rates)."""
+    return rate_provider.get_rate(currency)
+
+# Common prefixes in this dataset: "中国人民币", "美元", "日元", "欧元"
+CURRENCY_MAP = {
+    "中国人民币": {"code": "CNY", "symbol": "¥"},
+    "人民币": {"code": "CNY", "symbol": "¥"},
+    "美元": {"code": "USD", "symbol": "$"},
+    "日元": {"code": "JPY", "symbol": "JP¥"}, # Or just 日元 symbol? User said "日元或其他币种保持现在的中文币种名"
+    "欧元": {"code": "EUR", "symbol": "€"},
+    "英镑": {"code": "GBP", "symbol": "£"},
+}
+
+_AMOUNT_RE = re.compile(r"^([^\d\s]+)\s*([\d,.]+)")
+
+
+@lru_cache(maxsize=8192)
+def parse_amount(amount_str: str) -> Optional[Tuple[str, float]]:
+    """
+    Split an amount string into (currency name, amount).
+    Input: "美元 5000.00" -> ("美元", 5000.0). Returns None if parse fails.
+    Memoized: harvested amounts repeat a lot across rows and requests.
+    """
+    if not amount_str:
+        return None
+    # Regex to separate non-digits from digits
+    match = _AMOUNT_RE.match(amount_str.strip())
+    if not match:
+        return None
+    try:
+        amount = float(match.group(2).replace(',', ''))
+    except ValueError:
+        return None
+    return match.group(1).strip(), amount
+
+
+CURRENCY_SYMBOLS = {info["code"]: info["symbol"] for info in CURRENCY_MAP.values()}
+
+
+def currency_code(currency_name: str) -> str:
+    """Map a currency name to its ISO code; unknown names are returned unchanged."""
+    info = CURRENCY_MAP.get(currency_name)
+    return info["code"] if info else currency_name
+
+
+def amount_in_cny(amount: float, currency: Optional[str]) -> Optional[float]:
+    """
+    Convert `amount` in `currency` (code from currency_code) to CNY. Unknown currencies are taken 1:1.
+    Returns None for a known currency whose rate is not loaded yet (rather than assuming 1:1).
+    """
+    if currency in CURRENCY_SYMBOLS and currency != "CNY":
+        rate = rate_provider.find_rate(currency)
+        return amount * rate if rate is not None else None
+    return amount
+
+
+class ConvertedAmount(NamedTuple):
+    amount: Optional[float]
+    currency: Optional[str]  # ISO code (see currency_code), or the raw name if unknown
+    amount_cny: Optional[float]
+    formatted: str
+
+
+def format_amounts(
+    amounts: Sequence[Optional[float]],
+    currencies: Sequence[Optional[str]],
+    raws: Optional[Sequence[Optional[str]]] = None,
+) -> List[ConvertedAmount]:
+    """
+    Convert and format a column of already parsed amounts in one pass.
+    Rates are looked up once per distinct currency rather than once per row.
+    A known currency without a loaded rate gets no CNY value, as in amount_in_cny.
+    """
+    if raws is None:
+        raws = [None] * len(amounts)
+    rates: Dict[str, Optional[float]] = {
+        code: rate_provider.find_rate(code) for code in set(currencies) if code in CURRENCY_SYMBOLS and code != "CNY"
+    }
+
+    results = []
+    for amount, currency, raw in zip(amounts, currencies, raws):
+        if amount is None or not currency:
+            results.append(ConvertedAmount(amount, currency, None, raw or "-"))
+            continue
+        # User rule: "中国人民币换成¥ ，美元换成$，日元或其他币种保持现在的中文币种名显示"
+        formatted = f"{CURRENCY_SYMBOLS.get(currency, currency)} {amount:,.2f}"
+        if currency not in rates:
+            # CNY or unknown currency (shown as-is, taken 1:1)
+            results.append(ConvertedAmount(amount, currency, amount, formatted))
+            continue
+        rate = rates[currency]
+        if rate is None:
+            # Rate not loaded yet: don't show a made-up CNY value
+            results.append(ConvertedAmount(amount, currency, None, formatted))
+            continue
+        amount_cny_value = amount * rate
+        results.append(ConvertedAmount(amount, currency, amount_cny_value, f"{formatted}（¥ {amount_cny_value:,.2f}）"))
+    return results
+
+
+def convert_amounts(amount_strs: Sequence[Optional[str]]) -> List[ConvertedAmount]:
+    """Parse, convert and format a column of raw amount strings ("美元 5000.00", ...)."""
+    amounts: List[Optional[float]] = []
+    currencies: List[Optional[str]] = []
+    for amount_str in amount_strs:
+        parsed = parse_amount(amount_str) if amount_str else None
+        amounts.append(parsed[1] if parsed else None)
+        currencies.append(currency_code(parsed[0]) if parsed else None)
+    return format_amounts(amounts, currencies, amount_strs)
+
+
+def format_amount(amount: Optional[float], currency: Optional[str], raw: Optional[str] = None) -> str:
+    """
+    Format an already parsed amount (see convert_and_format for the rules).
+    `currency` is the code returned by currency_code(); `raw` is shown when parsing failed.
+    """
+    return format_amounts([amount], [currency], [raw])[0].formatted
+
 
 def convert_and_format(amount_str: str) -> str:
     """
@@ -80,51 +134,4 @@ def convert_and_format(amount_str: str) -> str:
     """
     if not amount_str:
         return "-"
-        
-    # 1. Parse Currency and Amount
-    # Common prefixes in this dataset: "中国人民币", "美元", "日元", "欧元"
-    # Regex to separate non-digits from digits
-    match = re.match(r"^([^\d\s]+)\s*([\d,.]+)", amount_str.strip())
-    if not match:
-        return amount_str # Return as is if parse fails
-        
-    currency_name = match.group(1).strip()
-    amount_val_str = match.group(2).replace(',', '')
-    
-    try:
-        amount = float(amount_val_str)
-    except:
-        return amount_str
-        
-    # 2. Map Currency Name to Code & Symbol
-    currency_map = {
-        "中国人民币": {"code": "CNY", "symbol": "¥"},
-        "人民币": {"code": "CNY", "symbol": "¥"},
-        "美元": {"code": "USD", "symbol": "$"},
-        "日元": {"code": "JPY", "symbol": "JP¥"}, # Or just 日元 symbol? User said "日元或其他币种保持现在的中文币种名"
-        "欧元": {"code": "EUR", "symbol": "€"},
-        "英镑": {"code": "GBP", "symbol": "£"},
-    }
-    
-    info = currency_map.get(currency_name)
-    
-    # User rule: "中国人民币换成¥ ，美元换成$，日元或其他币种保持现在的中文币种名显示"
-    if info:
-        display_symbol = info["symbol"]
-        code = info["code"]
-    else:
-        display_symbol = currency_name # Keep original name
-        # Try to guess code? If unknown, assume 1:1 or skip conversion
-        code = None
-
-    # Format original amount
-    formatted_original = f"{display_symbol} {amount:,.2f}"
-    
-    # 3. Convert if not CNY
-    if code and code != "CNY":
-        rate = get_rate(code)
-        cny_amount = amount * rate
-        formatted_cny = f"¥ {cny_amount:,.2f}"
-        return f"{formatted_original}（{formatted_cny}）"
-    
-    return formatted_original
+    return convert_amounts([amount_str])[0].formatted
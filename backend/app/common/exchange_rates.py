@@ -0,0 +1,232 @@
+"""Exchange-rate provider used by currency conversion.
+
+Rates are served from an in-memory snapshot that is never refreshed on the
+request path: a stale snapshot keeps being served while a single background
+reload runs (stale-while-revalidate). Rates come from a pluggable source
+(the exchange_rates table, a static JSON file or a fixed stub), and the
+remote rate API is only ever called by the background refresher, with a
+timeout, to update the exchange_rates table.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Protocol
+
+import requests
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.app.common.models import ExchangeRate
+from backend.app.core.config import settings
+from backend.app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+RATES_API_URL = "https://api.frankfurter.app/latest?from=CNY"
+
+# Used by the stub source (and as nothing-loaded-yet fallback for CNY)
+DEFAULT_RATES_TO_CNY: Dict[str, float] = {"CNY": 1.0}
+
+
+class RateSource(Protocol):
+    def load(self) -> Dict[str, float]:
+        """Return currency code -> rate to CNY."""
+
+
+class DatabaseRateSource:
+    """Rates from the exchange_rates table of the main database."""
+
+    def load(self) -> Dict[str, float]:
+        with SessionLocal() as db:
+            return {r.currency_code: r.rate_to_cny for r in db.query(ExchangeRate).all()}
+
+
+class StaticFileRateSource:
+    """Rates from a JSON file such as {"USD": 7.2, "EUR": 7.8}."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load(self) -> Dict[str, float]:
+        with self.path.open(encoding="utf-8") as handle:
+            return {code: float(rate) for code, rate in json.load(handle).items()}
+
+
+class StubRateSource:
+    """Fixed rates (tests, offline development)."""
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        self.rates = dict(rates or DEFAULT_RATES_TO_CNY)
+
+    def load(self) -> Dict[str, float]:
+        return dict(self.rates)
+
+
+class RateProvider:
+    """Thread-safe rate snapshot with single-flight, non-blocking refresh."""
+
+    def __init__(self, source: RateSource, ttl_seconds: float):
+        self.source = source
+        self.ttl_seconds = ttl_seconds
+        self._rates: Optional[Dict[str, float]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._listeners: List[Callable[[], None]] = []
+
+    def rates(self) -> Dict[str, float]:
+        """Current snapshot; schedules a background reload once it is older than the TTL."""
+        rates = self._rates
+        if rates is None:
+            # First use: load synchronously from the (local) source, once
+            with self._lock:
+                if self._rates is None:
+                    self._reload()
+            return self._rates  # type: ignore[return-value]
+        if time.monotonic() - self._loaded_at > self.ttl_seconds:
+            self.refresh_async()
+        return rates
+
+    def get_rate(self, currency: str) -> float:
+        """Rate to convert `currency` -> CNY (1.0 if unknown)."""
+        return self.rates().get(currency.upper(), 1.0)
+
+    def find_rate(self, currency: str) -> Optional[float]:
+        """Rate to convert `currency` -> CNY, or None if no rate is loaded for it."""
+        return self.rates().get(currency.upper())
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """Call `callback` (in the reloading thread) whenever a reload changes the snapshot."""
+        self._listeners.append(callback)
+
+    def refresh_async(self) -> None:
+        """Reload the snapshot in a background thread unless a reload is already running."""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name="exchange-rate-reload", daemon=True).start()
+
+    def reload(self) -> None:
+        """Reload the snapshot now (background jobs and tests)."""
+        with self._lock:
+            changed = self._reload()
+        if changed:
+            self._notify()
+
+    def _refresh(self) -> None:
+        try:
+            changed = self._reload()
+        finally:
+            self._refreshing = False
+        if changed:
+            self._notify()
+
+    def _reload(self) -> bool:
+        """Load the snapshot; True if it replaced a different, previously loaded one."""
+        try:
+            loaded = self.source.load()
+        except Exception as exc:
+            logger.warning(f"Failed to load exchange rates from {type(self.source).__name__}: {exc}")
+            loaded = {}
+        changed = False
+        if loaded or self._rates is None:
+            rates = {**DEFAULT_RATES_TO_CNY, **{code.upper(): rate for code, rate in loaded.items()}}
+            changed = self._rates is not None and rates != self._rates
+            self._rates = rates
+        # Also on failure, so a broken source is retried once per TTL rather than per request
+        self._loaded_at = time.monotonic()
+        return changed
+
+    def _notify(self) -> None:
+        for callback in list(self._listeners):
+            try:
+                callback()
+            except Exception as exc:
+                logger.error(f"Exchange rate listener failed: {exc}", exc_info=True)
+
+
+def build_rate_source() -> RateSource:
+    """Rate source selected by settings.exchange_rate_source (database, file or stub)."""
+
+    if settings.exchange_rate_source == "file":
+        if not settings.exchange_rate_file:
+            raise ValueError("SA_EXCHANGE_RATE_FILE must be set when SA_EXCHANGE_RATE_SOURCE=file")
+        return StaticFileRateSource(Path(settings.exchange_rate_file))
+    if settings.exchange_rate_source == "stub":
+        return StubRateSource()
+    return DatabaseRateSource()
+
+
+rate_provider = RateProvider(build_rate_source(), ttl_seconds=settings.exchange_rate_ttl_seconds)
+
+
+def update_exchange_rates(db: Session, timeout: Optional[float] = None) -> bool:
+    """Fetch latest rates from the rate API and store them in exchange_rates.
+
+    Returns:
+        True if the table was updated
+    """
+    timeout = settings.exchange_rate_api_timeout_seconds if timeout is None else timeout
+    try:
+        # frankfurter.app is free and supports base CNY: 1 CNY = X foreign
+        response = requests.get(RATES_API_URL, timeout=timeout)
+        response.raise_for_status()
+        rates = response.json().get("rates", {})
+    except Exception as exc:
+        logger.warning(f"Failed to fetch exchange rates: {exc}")
+        return False
+
+    now = datetime.now()
+    # Store the rate TO CNY: if 1 CNY = 0.14 USD, then 1 USD = 1/0.14 CNY
+    for currency, rate_from_cny in {**rates, "CNY": 1.0}.items():
+        if not rate_from_cny:
+            continue
+        db_rate = db.get(ExchangeRate, currency)
+        if not db_rate:
+            db_rate = ExchangeRate(currency_code=currency)
+            db.add(db_rate)
+        db_rate.rate_to_cny = 1 / rate_from_cny
+        db_rate.updated_at = now
+    db.commit()
+    logger.info(f"Exchange rates updated ({len(rates)} currencies)")
+    return True
+
+
+_refresher_thread: Optional[threading.Thread] = None
+
+
+def _refresh_stored_rates(max_age: timedelta) -> None:
+    with SessionLocal() as db:
+        newest = db.query(func.max(ExchangeRate.updated_at)).scalar()
+        if newest is not None and datetime.now() - newest < max_age:
+            return
+        updated = update_exchange_rates(db)
+    if updated:
+        rate_provider.reload()
+
+
+def start_rate_refresher(interval_seconds: float) -> None:
+    """Keep the exchange_rates table fresh from the rate API in a daemon thread."""
+
+    global _refresher_thread
+    if _refresher_thread is not None or not isinstance(rate_provider.source, DatabaseRateSource):
+        return
+
+    def _loop() -> None:
+        while True:
+            try:
+                _refresh_stored_rates(timedelta(seconds=interval_seconds))
+            except Exception as exc:
+                logger.error(f"Exchange rate refresh failed: {exc}", exc_info=True)
+            time.sleep(interval_seconds)
+
+    _refresher_thread = threading.Thread(target=_loop, name="exchange-rate-refresher", daemon=True)
+    _refresher_thread.start()
+    logger.info(f"Exchange rate refresher started (interval={interval_seconds}s)")
@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings
@@ -20,6 +20,25 @@ class Settings(BaseSettings):
         default_factory=lambda: f"sqlite:///{Path.cwd() / 'sales_assistant.db'}"
     )
     database_echo: bool = Field(default=False)
+    database_pool_size: int = Field(default=5)
+    database_max_overflow: int = Field(default=10)
+
+    contracts_db_path: Path = Field(
+        default_factory=lambda: Path(__file__).resolve().parent.parent.parent.parent / "data" / "contracts_new.db"
+    )
+    # contracts_new.db is opened read-only (mode=ro). immutable additionally skips
+    # locking/change detection and must only be enabled while the harvester is idle.
+    contracts_db_read_only: bool = Field(default=True)
+    contracts_db_immutable: bool = Field(default=False)
+    # Sized for uvicorn's default 40-thread pool per worker process
+    contracts_db_pool_size: int = Field(default=10)
+    contracts_db_max_overflow: int = Field(default=30)
+
+    # Per-connection SQLite tuning (applied to both databases)
+    sqlite_mmap_size_bytes: int = Field(default=256 * 1024 * 1024)
+    sqlite_cache_size_kib: int = Field(default=64 * 1024)
+    sqlite_busy_timeout_ms: int = Field(default=5000)
+    sqlite_synchronous: str = Field(default="NORMAL")  # main DB only (WAL)
 
     jwt_secret_key: str = Field(default="change-me", alias="SA_JWT_SECRET")
     jwt_algorithm: str = Field(default="HS256")
@@ -32,6 +51,68 @@ class Settings(BaseSettings):
     wechat_app_id: Optional[str] = Field(default=None)
     wechat_app_secret: Optional[str] = Field(default=None)
 
+    # Seconds between passes that normalize new/updated rows in contracts_new.db (0 disables)
+    search_sync_interval_seconds: int = Field(default=300)
+    # Search result cache (ordered ids + total per distinct query); size 0 disables it
+    search_cache_size: int = Field(default=512)
+    search_cache_ttl_seconds: int = Field(default=600)
+    search_cache_max_ids: int = Field(default=2000)
+    # Per-entity relevance weight overrides, e.g. {"contracts": {"title": 3.0}} (see search.ranking)
+    search_ranking_weights: Dict[str, Dict[str, float]] = Field(default_factory=dict)
+    # Buffered search-history writes (records beyond the queue size are dropped)
+    search_history_queue_size: int = Field(default=10000)
+    search_history_batch_size: int = Field(default=200)
+    search_history_flush_interval_seconds: float = Field(default=2.0)
+    # Type-ahead index: rebuilt on data-version change or after this many seconds (new history);
+    # past queries are suggested once they were searched by at least min_count users
+    search_suggest_refresh_seconds: int = Field(default=600)
+    search_suggest_history_min_count: int = Field(default=2)
+    search_suggest_history_limit: int = Field(default=1000)
+    # /search/all runs the entity searches on a shared pool of this many threads
+    search_fanout_workers: int = Field(default=8)
+    search_fanout_timeout_seconds: float = Field(default=10.0)
+    # Request latency metrics: rolling window per endpoint (last N samples within the
+    # window), and statements slower than the threshold logged with their query plan (0 disables)
+    metrics_window_size: int = Field(default=1000)
+    metrics_window_seconds: int = Field(default=900)
+    slow_query_threshold_ms: float = Field(default=200.0)
+    slow_query_log_size: int = Field(default=100)
+    # Exchange rates: source of the in-memory snapshot ("database", "file" or "stub"),
+    # how long a snapshot is served before a background reload, and how often the
+    # background refresher pulls the rate API into the exchange_rates table (0 disables)
+    exchange_rate_source: Literal["database", "file", "stub"] = Field(default="database")
+    exchange_rate_file: Optional[str] = Field(default=None)
+    exchange_rate_ttl_seconds: int = Field(default=3600)
+    exchange_rate_refresh_interval_seconds: int = Field(default=6 * 3600)
+    exchange_rate_api_timeout_seconds: float = Field(default=5.0)
+    # Task worker: tasks run concurrently on a "thread" (I/O-bound LLM calls) or "process"
+    # pool of max_concurrency slots; type limits cap how many tasks of one type run at once
+    # (types not listed are only bounded by the pool)
+    task_worker_pool: Literal["thread", "process"] = Field(default="thread")
+    task_worker_max_concurrency: int = Field(default=8)
+    task_worker_type_limits: Dict[str, int] = Field(
+        default_factory=lambda: {"bidding_analysis": 4, "workload_analysis": 2, "cost_estimation": 2}
+    )
+    # Idle workers poll every poll_interval, backing off up to max_poll_interval while the queue
+    # stays empty; new tasks wake them immediately via a notification socket in task_notify_dir
+    # (default: <tmp>/sales-assistant-tasks), so polling is only a fallback
+    task_worker_poll_interval_seconds: float = Field(default=2.0)
+    task_worker_max_poll_interval_seconds: float = Field(default=30.0)
+    task_notify_enabled: bool = Field(default=True)
+    task_notify_dir: Optional[str] = Field(default=None)
+    task_worker_batch_size: int = Field(default=5)
+    # Claimed tasks are leased to their worker; heartbeats renew the lease, and tasks whose
+    # lease expired (worker died) are reclaimed by any worker. Keep the lease several heartbeats long
+    task_lease_seconds: int = Field(default=120)
+    task_heartbeat_interval_seconds: float = Field(default=30.0)
+    # Fair share: a user's tasks started within this window count against their next turn
+    task_fair_share_window_seconds: int = Field(default=900)
+    # Files attached to tasks (content-addressed, see tasks.blobs); files of finished tasks are
+    # deleted by the worker every cleanup interval once older than the grace period
+    task_blob_dir: str = Field(default_factory=lambda: str(Path.cwd() / "task_blobs"))
+    task_blob_cleanup_interval_seconds: int = Field(default=600)
+    task_blob_grace_seconds: int = Field(default=3600)
+
     model_config = {
         "env_file": ".env",
         "env_prefix": "SA_",
@@ -3,23 +3,98 @@
 from __future__ import annotations
 
 from contextlib import contextmanager
-from typing import Iterator
+from pathlib import Path
+from typing import Iterator, List
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 from .config import settings
+from .metrics import install_query_hooks
+
+
+def _sqlite_pragmas(read_only: bool, wal: bool) -> List[str]:
+    pragmas = [
+        f"PRAGMA busy_timeout = {settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA mmap_size = {settings.sqlite_mmap_size_bytes}",
+        f"PRAGMA cache_size = -{settings.sqlite_cache_size_kib}",  # negative = KiB
+        "PRAGMA temp_store = MEMORY",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    if wal:
+        pragmas += ["PRAGMA journal_mode = WAL", f"PRAGMA synchronous = {settings.sqlite_synchronous}"]
+    return pragmas
+
 
+def _apply_sqlite_pragmas(target: Engine, read_only: bool = False, wal: bool = False) -> None:
+    """Run the tuning PRAGMAs on every new DBAPI connection of a SQLite engine."""
 
-engine = create_engine(settings.database_url, echo=settings.database_echo, future=True)
+    if target.dialect.name != "sqlite":
+        return
+    pragmas = _sqlite_pragmas(read_only, wal)
+
+    @event.listens_for(target, "connect")
+    def _on_connect(dbapi_connection, connection_record) -> None:  # noqa: ARG001
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def _pool_args(url: str, pool_size: int, max_overflow: int) -> dict:
+    # In-memory SQLite uses a per-thread singleton pool that takes no sizing
+    if url.startswith("sqlite") and ":memory:" in url:
+        return {}
+    return {"pool_size": pool_size, "max_overflow": max_overflow}
+
+
+engine = create_engine(
+    settings.database_url,
+    echo=settings.database_echo,
+    future=True,
+    **_pool_args(settings.database_url, settings.database_pool_size, settings.database_max_overflow),
+)
+_apply_sqlite_pragmas(engine, wal=True)
+install_query_hooks(engine)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False, class_=Session)
 Base = declarative_base()
 
-# Contracts database (read-only for existing data)
-from pathlib import Path
-CONTRACTS_DB_PATH = Path(__file__).resolve().parent.parent.parent.parent / "data" / "contracts_new.db"
-contracts_engine = create_engine(f"sqlite:///{CONTRACTS_DB_PATH}", echo=False, future=True)
+# Contracts database (owned by the harvester; the API only reads it)
+CONTRACTS_DB_PATH = Path(settings.contracts_db_path)
+
+
+def create_contracts_engine(read_only: bool = True) -> Engine:
+    """Engine on contracts_new.db.
+
+    The API engine is read-only (mode=ro URI + query_only). Derived index
+    maintenance and admin scripts pass read_only=False. The journal mode is
+    left to the harvester that owns the file.
+    """
+
+    if not (read_only and settings.contracts_db_read_only):
+        writable = create_engine(f"sqlite:///{CONTRACTS_DB_PATH}", echo=False, future=True)
+        _apply_sqlite_pragmas(writable)
+        return writable
+    # immutable=1 also skips locking and change detection: only safe while nothing writes the file
+    mode = "immutable=1" if settings.contracts_db_immutable else "mode=ro"
+    url = f"sqlite:///file:{CONTRACTS_DB_PATH.as_posix()}?{mode}&uri=true"
+    reader = create_engine(
+        url,
+        echo=False,
+        future=True,
+        **_pool_args(url, settings.contracts_db_pool_size, settings.contracts_db_max_overflow),
+    )
+    _apply_sqlite_pragmas(reader, read_only=True)
+    return reader
+
+
+contracts_engine = create_contracts_engine()
+install_query_hooks(contracts_engine)
 ContractsSessionLocal = sessionmaker(bind=contracts_engine, autoflush=False, autocommit=False, expire_on_commit=False, class_=Session)
 
 
@@ -31,6 +106,11 @@ def init_db() -> None:
 
     Base.metadata.create_all(bind=engine)
     _ensure_user_columns()
+    _ensure_task_columns()
+
+    from backend.app.search.indexing import ensure_search_schema
+
+    ensure_search_schema()
 
 
 def _ensure_user_columns() -> None:
@@ -67,3 +147,22 @@ def get_session() -> Iterator[Session]:
         raise
     finally:
         session.close()
+
+
+def _ensure_task_columns() -> None:
+    inspector = sa_inspect(engine)
+    if not inspector.has_table("tasks"):
+        return
+    existing_columns = {column["name"] for column in inspector.get_columns("tasks")}
+    statements = []
+    if "worker_id" not in existing_columns:
+        statements.append(text("ALTER TABLE tasks ADD COLUMN worker_id VARCHAR(128)"))
+    if "lease_expires_at" not in existing_columns:
+        statements.append(text("ALTER TABLE tasks ADD COLUMN lease_expires_at DATETIME"))
+    if "priority" not in existing_columns:
+        statements.append(text("ALTER TABLE tasks ADD COLUMN priority INTEGER NOT NULL DEFAULT 0"))
+    # Fair-share scheduling counts recently started tasks
+    statements.append(text("CREATE INDEX IF NOT EXISTS ix_tasks_started_at ON tasks (started_at)"))
+    with engine.begin() as connection:
+        for stmt in statements:
+            connection.execute(stmt)
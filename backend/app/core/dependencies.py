@@ -43,3 +43,14 @@ def get_current_user(
             detail="用户不存在或已被禁用",
         )
     return user
+
+
+def get_current_admin(
+    current_user: auth_models.User = Depends(get_current_user),
+) -> auth_models.User:
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限",
+        )
+    return current_user
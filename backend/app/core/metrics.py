@@ -0,0 +1,221 @@
+"""Request latency instrumentation and slow-query log.
+
+* ``timing_middleware`` opens a RequestTrace for every HTTP request and, when
+  the request finishes, records its duration per endpoint (route template) in
+  a rolling window. It also adds a Server-Timing header with the spans.
+* Code on the request path adds spans (``with span("format"): ...``) and
+  counters (``count("rows_fetched", n)``) to the current trace; both are
+  no-ops outside a request.
+* ``install_query_hooks`` times every SQL statement of an engine. It adds the
+  time to the current trace's "sql" span. Statements slower than
+  ``slow_query_threshold_ms`` go to the slow-query log together with their
+  EXPLAIN QUERY PLAN.
+
+Spans are totals, not a partition: "sql" overlaps the code spans it runs in,
+and work fanned out to threads (see search.service.search_all) adds up
+across threads, so spans can exceed the request duration.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from starlette.requests import Request
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTrace:
+    """Span durations (seconds) and counters collected during one request."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.spans: Dict[str, float] = defaultdict(float)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.spans[name] += seconds
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the block into span `name` of the current request (if any)."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - started)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Add `value` to counter `name` of the current request (if any)."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.count(name, value)
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    # Nearest-rank percentile of an ascending list
+    index = max(math.ceil(fraction * len(ordered)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class LatencyRecorder:
+    """Rolling per-endpoint request durations (last N samples within the window)."""
+
+    def __init__(self, window_size: int, window_seconds: float):
+        self.window_size = max(window_size, 1)
+        self.window_seconds = window_seconds
+        self._samples: Dict[str, Deque[Tuple[float, float, Dict[str, float]]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, spans: Optional[Dict[str, float]] = None) -> None:
+        sample = (time.monotonic(), seconds, dict(spans or {}))
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window_size)
+            samples.append(sample)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """p50/p95/p99/max (ms) and mean span times per endpoint over the window."""
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            samples = {endpoint: [s for s in values if s[0] >= cutoff] for endpoint, values in self._samples.items()}
+
+        stats: Dict[str, Dict[str, Any]] = {}
+        for endpoint, values in samples.items():
+            if not values:
+                continue
+            durations = sorted(seconds for _, seconds, _ in values)
+            span_totals: Dict[str, float] = defaultdict(float)
+            for _, _, spans in values:
+                for name, seconds in spans.items():
+                    span_totals[name] += seconds
+            stats[endpoint] = {
+                "count": len(durations),
+                "p50_ms": round(_percentile(durations, 0.50) * 1000, 2),
+                "p95_ms": round(_percentile(durations, 0.95) * 1000, 2),
+                "p99_ms": round(_percentile(durations, 0.99) * 1000, 2),
+                "max_ms": round(durations[-1] * 1000, 2),
+                "mean_span_ms": {
+                    name: round(total / len(durations) * 1000, 2) for name, total in sorted(span_totals.items())
+                },
+            }
+        return stats
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+latency_recorder = LatencyRecorder(settings.metrics_window_size, settings.metrics_window_seconds)
+
+# Most recent slow statements, newest last
+slow_queries: Deque[Dict[str, Any]] = deque(maxlen=max(settings.slow_query_log_size, 1))
+
+
+def _explain(connection, statement: str, parameters: Any) -> List[str]:
+    # Only reads are re-planned; EXPLAIN of a write is harmless but not useful
+    if not statement.lstrip()[:6].upper().startswith(("SELECT", "WITH")):
+        return []
+    try:
+        cursor = connection.connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return [row[-1] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except Exception as exc:
+        return [f"EXPLAIN failed: {exc}"]
+
+
+def _record_slow_query(connection, statement: str, parameters: Any, seconds: float, executemany: bool) -> None:
+    entry = {
+        "at": time.time(),
+        "duration_ms": round(seconds * 1000, 2),
+        "statement": statement,
+        "parameters": repr(parameters)[:500],
+        "plan": [] if executemany else _explain(connection, statement, parameters),
+    }
+    slow_queries.append(entry)
+    logger.warning(
+        f"Slow query ({entry['duration_ms']} ms): {' '.join(statement.split())[:300]} | plan: {entry['plan']}"
+    )
+
+
+def install_query_hooks(engine: Engine) -> None:
+    """Time every statement of `engine` (current trace "sql" span + slow-query log)."""
+
+    threshold = settings.slow_query_threshold_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(connection, cursor, statement, parameters, context, executemany):
+        started = connection.info["query_started"].pop()
+        elapsed = time.perf_counter() - started
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add("sql", elapsed)
+            trace.count("sql_queries")
+        if threshold > 0 and elapsed >= threshold:
+            _record_slow_query(connection, statement, parameters, elapsed, executemany)
+
+
+def _server_timing(trace: RequestTrace, total: float) -> str:
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in trace.spans.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+async def timing_middleware(request: Request, call_next):
+    """HTTP middleware: trace the request and record its latency per endpoint."""
+    trace = RequestTrace()
+    token = _current_trace.set(trace)
+    try:
+        response = await call_next(request)
+    finally:
+        _current_trace.reset(token)
+    total = trace.elapsed()
+    route = request.scope.get("route")
+    endpoint = f"{request.method} {getattr(route, 'path', request.url.path)}"
+    latency_recorder.record(endpoint, total, trace.spans)
+    response.headers["Server-Timing"] = _server_timing(trace, total)
+    if trace.counters:
+        logger.debug(f"{endpoint} {total * 1000:.1f} ms spans={dict(trace.spans)} counters={dict(trace.counters)}")
+    return response
@@ -11,6 +11,7 @@ from fastapi.staticfiles import StaticFiles
 from backend.app.auth.router import router as auth_router
 from backend.app.core.config import settings
 from backend.app.core.database import init_db
+from backend.app.core.metrics import timing_middleware
 from backend.app.modules.bidding.app import get_bidding_subapp
 # from backend.app.modules.costing.router import router as costing_router
 # from backend.app.modules.workload.router import router as workload_router
@@ -21,6 +22,7 @@ from backend.app.search.router import router as search_router
 def create_app() -> FastAPI:
     init_db()
     app = FastAPI(title=settings.app_name, version="0.1.0")
+    app.middleware("http")(timing_middleware)
 
     if settings.cors_origins:
         app.add_middleware(
@@ -79,6 +81,24 @@ def create_app() -> FastAPI:
         )
 
 
+    @app.on_event("startup")
+    def start_background_jobs() -> None:
+        from backend.app.common.exchange_rates import start_rate_refresher
+        from backend.app.search.indexing import start_search_sync, watch_exchange_rates
+
+        # Stored CNY amounts follow rate reloads (also the first fetch on a fresh deploy)
+        watch_exchange_rates()
+        if settings.search_sync_interval_seconds > 0:
+            start_search_sync(settings.search_sync_interval_seconds)
+        if settings.exchange_rate_refresh_interval_seconds > 0:
+            start_rate_refresher(settings.exchange_rate_refresh_interval_seconds)
+
+    @app.on_event("shutdown")
+    def stop_background_jobs() -> None:
+        from backend.app.search.history import history_writer
+
+        history_writer.stop()
+
     frontend_dir = Path(__file__).resolve().parent.parent.parent / "frontend" / "web"
     if frontend_dir.exists():
         app.mount("/web", StaticFiles(directory=str(frontend_dir), html=True), name="web")
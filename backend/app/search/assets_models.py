@@ -37,6 +37,12 @@ class QualificationAsset(ContractsBase):
     updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     data_status: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
 
+    # Derived columns maintained by backend.app.search.indexing (not written by the harvester)
+    issue_date_iso: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # YYYY-MM-DD
+    expire_date_iso: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # YYYY-MM-DD, NULL = no end date
+    next_review_date_iso: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # YYYY-MM-DD
+    normalized_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
     def __repr__(self) -> str:
         return f"<QualificationAsset(name={self.qualification_name}, company={self.company_name})>"
 
@@ -69,5 +75,10 @@ class IntellectualPropertyAsset(ContractsBase):
     updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     data_status: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
 
+    # Derived columns maintained by backend.app.search.indexing (not written by the harvester)
+    issue_date_iso: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # YYYY-MM-DD
+    application_date_iso: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # YYYY-MM-DD
+    normalized_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
     def __repr__(self) -> str:
         return f"<IntellectualPropertyAsset(name={self.knowledge_name}, category={self.knowledge_category})>"
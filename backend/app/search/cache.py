@@ -0,0 +1,156 @@
+"""In-process cache of search results keyed on normalized search params.
+
+Each entry holds the ordered result ids (up to ``search_cache_max_ids``) and
+the total for one distinct query. Keys include the contracts DB data version
+(see ``indexing.DATA_VERSION_TABLE``), so entries from before a harvester run
+are never served; the TTL only bounds memory held by idle queries.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from cachetools import TTLCache
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import settings
+from backend.app.search import indexing
+
+# Pagination (and facet toggle) params are not part of the cache key
+PAGE_FIELDS = {"limit", "offset", "cursor", "facets"}
+
+# load_rows(offset, after, limit) -> sort key tuples in display order, starting
+# after the key tuple `after` when given (else at `offset`); limit None = all
+RowLoader = Callable[[int, Optional[Sequence[Any]], Optional[int]], List[tuple]]
+
+
+class CachedResult(NamedTuple):
+    rows: Tuple[tuple, ...]  # sort key tuples (primary key last) in display order
+    total: int
+
+    @property
+    def complete(self) -> bool:
+        return len(self.rows) >= self.total
+
+
+class SearchResultCache:
+    """Thread-safe LRU/TTL cache of (ordered sort keys, total) per search."""
+
+    def __init__(self, maxsize: int, ttl_seconds: float, max_ids: int):
+        self.enabled = maxsize > 0 and ttl_seconds > 0
+        self.max_ids = max_ids
+        self._entries: TTLCache = TTLCache(maxsize=max(maxsize, 1), ttl=max(ttl_seconds, 1))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(entity: str, version: int, params: BaseModel) -> Tuple[str, int, str]:
+        filters = {k: v for k, v in params.dict(exclude=PAGE_FIELDS).items() if v is not None and v != ""}
+        return entity, version, json.dumps(filters, sort_keys=True, ensure_ascii=False, default=str)
+
+    def get(self, key: Tuple) -> Optional[CachedResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, key: Tuple, rows: List[tuple], total: int) -> CachedResult:
+        entry = CachedResult(tuple(rows[: self.max_ids]), total)
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self._entries.maxsize,
+                "ttl_seconds": self._entries.ttl,
+            }
+
+
+search_cache = SearchResultCache(
+    maxsize=settings.search_cache_size,
+    ttl_seconds=settings.search_cache_ttl_seconds,
+    max_ids=settings.search_cache_max_ids,
+)
+
+
+def cached_page(
+    contracts_db: Session,
+    entity: str,
+    params: BaseModel,
+    after: Optional[Sequence[Any]],
+    load_rows: RowLoader,
+    count_rows: Callable[[], int],
+) -> Tuple[List[tuple], int, bool]:
+    """
+    Return (sort key tuples of the requested page, total, has_more).
+
+    The page starts after the cursor key tuple `after` if given, else at
+    params.offset. On a miss the first max_ids rows are cached; pages inside
+    the cached prefix are then sliced from memory and deeper pages only
+    re-run the (keyset) row query.
+    """
+    offset, limit = params.offset, params.limit
+    version = indexing.read_data_version(contracts_db.connection()) if search_cache.enabled else None
+    if version is None:
+        rows = load_rows(offset, after, limit + 1)
+        return rows[:limit], count_rows(), len(rows) > limit
+
+    key = search_cache.make_key(entity, version, params)
+    entry = search_cache.get(key)
+    if entry is None:
+        rows = load_rows(0, None, search_cache.max_ids + 1)
+        total = len(rows) if len(rows) <= search_cache.max_ids else count_rows()
+        entry = search_cache.put(key, rows, total)
+
+    start: Optional[int] = offset
+    if after is not None:
+        after = tuple(after)
+        start = next((i + 1 for i, row in enumerate(entry.rows) if tuple(row) == after), None)
+    if start is not None and (entry.complete or start + limit < len(entry.rows)):
+        page = entry.rows[start:start + limit + 1]
+        return list(page[:limit]), entry.total, len(page) > limit
+    rows = load_rows(offset, after, limit + 1)
+    return rows[:limit], entry.total, len(rows) > limit
+
+
+_facet_entries: TTLCache = TTLCache(maxsize=max(settings.search_cache_size, 1), ttl=max(settings.search_cache_ttl_seconds, 1))
+_facet_lock = threading.Lock()
+
+
+def cached_facets(
+    contracts_db: Session,
+    entity: str,
+    params: BaseModel,
+    compute: Callable[[], Dict[str, List[dict]]],
+) -> Dict[str, List[dict]]:
+    """Facet counts of a search (see search.facets), cached like result pages."""
+    version = indexing.read_data_version(contracts_db.connection()) if search_cache.enabled else None
+    if version is None:
+        return compute()
+    key = search_cache.make_key(entity, version, params)
+    with _facet_lock:
+        counts = _facet_entries.get(key)
+    if counts is None:
+        counts = compute()
+        with _facet_lock:
+            _facet_entries[key] = counts
+    return counts
@@ -42,5 +42,12 @@ class Company(ContractsBase):
     updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     data_status: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
+    # Derived columns maintained by backend.app.search.indexing (not written by the harvester)
+    registered_capital_wan: Mapped[Optional[float]] = mapped_column(REAL, nullable=True)  # 万元, CNY
+    capital_currency_code: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # currency of registered_capital
+    setup_date_iso: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # YYYY-MM-DD
+    operating_state_code: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    normalized_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
     def __repr__(self) -> str:
         return f"<Company(name={self.name}, code={self.code})>"
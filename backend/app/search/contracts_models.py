@@ -1,10 +1,10 @@
 """Models for querying existing contracts database."""
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
-from sqlalchemy import Integer, String, DateTime, Text, JSON
+from sqlalchemy import Integer, String, Date, DateTime, Text, JSON, REAL
 from sqlalchemy.orm import Mapped, mapped_column, DeclarativeBase
 
 class ContractsBase(DeclarativeBase):
@@ -36,5 +36,15 @@ class ExistingContract(ContractsBase):
     updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     data_status: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
 
+    # Derived columns maintained by backend.app.search.indexing (not written by the harvester)
+    amount_value: Mapped[Optional[float]] = mapped_column(REAL, nullable=True)
+    currency_code: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    amount_cny: Mapped[Optional[float]] = mapped_column(REAL, nullable=True)
+    contract_type_tag: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    signed_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    delivery_location: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    delivery_team: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    normalized_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
     def __repr__(self) -> str:
         return f"<ExistingContract(title={self.title}, customer={self.customer_name})>"
@@ -28,6 +28,10 @@ class Employee(ContractsBase):
     created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
 
+    # Derived columns maintained by triggers from backend.app.search.indexing
+    certificate_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    search_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # school/major/certificate names
+
     # Relationships
     educations: Mapped[list["EmployeeEducation"]] = relationship("EmployeeEducation", back_populates="employee")
     certificates: Mapped[list["EmployeeCertificate"]] = relationship("EmployeeCertificate", back_populates="employee")
@@ -73,6 +77,11 @@ class EmployeeCertificate(ContractsBase):
     certificate_no: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     # remarks: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
+    # Derived columns maintained by backend.app.search.indexing (not written by the harvester)
+    effective_date_iso: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # YYYY-MM-DD
+    expire_date_iso: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # YYYY-MM-DD
+    normalized_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
     # Relationship
     employee: Mapped["Employee"] = relationship("Employee", back_populates="certificates")
 
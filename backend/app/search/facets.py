@@ -0,0 +1,75 @@
+"""Facet counts (value -> number of matching rows) for search filter chips.
+
+All facets of a search come from one statement. The matching set is
+selected once into a materialized CTE of just the facet columns, then each
+facet is a GROUP BY over it, combined with UNION ALL. So the filters run
+once no matter how many facets are requested. Results are cached per
+search like result pages are, see search.cache.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Dict, List, Mapping
+
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from backend.app.search.assets_models import QualificationAsset
+from backend.app.search.contracts_models import ExistingContract
+from backend.app.search.employee_models import Employee
+
+# Values returned per facet (most frequent first)
+MAX_FACET_VALUES = 20
+
+# Facet name -> expression, per entity
+CONTRACT_FACETS: Dict[str, ColumnElement] = {
+    "status": ExistingContract.status,
+    "industry": ExistingContract.industry,
+    "contract_type": ExistingContract.contract_type_tag,
+    "company": ExistingContract.customer_name,
+    "year": func.strftime("%Y", ExistingContract.signed_date),
+}
+QUALIFICATION_FACETS: Dict[str, ColumnElement] = {
+    "status": QualificationAsset.status,
+    "business_type": QualificationAsset.business_type,
+    "company": QualificationAsset.company_name,
+    "year": func.substr(QualificationAsset.expire_date_iso, 1, 4),
+}
+EMPLOYEE_FACETS: Dict[str, ColumnElement] = {
+    "status": Employee.status,
+    "company": Employee.company,
+    "year": func.substr(Employee.joined_at, 1, 4),
+}
+
+# MATERIALIZED keeps SQLite from inlining the CTE into every branch
+_MATERIALIZE = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+def facet_counts(contracts_db: Session, query, facets: Mapping[str, ColumnElement]) -> Dict[str, List[dict]]:
+    """
+    Counts per value of each facet over the rows of `query` (a filtered,
+    unordered select), as {facet: [{"value": ..., "count": ...}, ...]}.
+    Empty values are not counted.
+    """
+    matched = query.with_only_columns(*(expr.label(name) for name, expr in facets.items())).cte("matched")
+    if _MATERIALIZE:
+        matched = matched.prefix_with("MATERIALIZED")
+
+    branches = []
+    for name in facets:
+        value = matched.c[name]
+        branches.append(
+            select(literal(name).label("facet"), value.label("value"), func.count().label("count"))
+            .where(value.isnot(None), value != "")
+            .group_by(value)
+        )
+
+    counts: Dict[str, List[dict]] = {name: [] for name in facets}
+    for facet, value, count in contracts_db.execute(union_all(*branches)):
+        counts[facet].append({"value": value, "count": count})
+    for name, values in counts.items():
+        values.sort(key=lambda item: (-item["count"], str(item["value"])))
+        del values[MAX_FACET_VALUES:]
+    return counts
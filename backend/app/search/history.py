@@ -0,0 +1,127 @@
+"""Buffered, asynchronous search-history writer.
+
+Search requests only enqueue history records; a background thread inserts
+them into the main database in batches (one executemany per flush). The
+queue is bounded and never blocks: when it is full the record is dropped and
+counted, so a slow disk cannot stall search.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from backend.app.auth import models as auth_models
+from backend.app.core.config import settings
+from backend.app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+
+class SearchHistoryWriter:
+    """Collects search-history rows in memory and writes them in batches."""
+
+    def __init__(self, max_queue_size: int, batch_size: int, flush_interval_seconds: float):
+        self.batch_size = max(batch_size, 1)
+        self.flush_interval_seconds = flush_interval_seconds
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max(max_queue_size, 1))
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def enqueue(self, user_id: int, query: Optional[str], filters: dict) -> None:
+        """Queue one history record; never blocks the caller."""
+        # Filter out None values and empty strings to save space
+        clean_filters = {k: v for k, v in filters.items() if v}
+        record = {
+            "user_id": user_id,
+            "query": query,
+            "filters": json.dumps(clean_filters, ensure_ascii=False, default=str),
+            "search_time": datetime.now(timezone.utc),
+        }
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"Search history queue full, {self.dropped} records dropped so far")
+            return
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()  # batch is full, flush now rather than at the next tick
+
+    def flush(self) -> int:
+        """Write everything queued so far; returns the number of rows written."""
+        with self._flush_lock:
+            written = 0
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    return written
+                try:
+                    with engine.begin() as connection:
+                        connection.execute(insert(auth_models.SearchHistory.__table__), batch)
+                except Exception as exc:
+                    self.failed += len(batch)
+                    logger.error(f"Failed to write {len(batch)} search history records: {exc}")
+                    return written
+                written += len(batch)
+                self.written += len(batch)
+
+    def stop(self) -> None:
+        """Stop the background thread and write what is still queued."""
+        thread = self._thread
+        self._thread = None
+        if thread is not None:
+            self._wakeup.set()
+            thread.join(timeout=self.flush_interval_seconds + 5)
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        batch: List[Dict[str, Any]] = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="search-history-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        current = threading.current_thread()
+        while self._thread is current:
+            self._wakeup.wait(self.flush_interval_seconds)
+            self._wakeup.clear()
+            self.flush()
+
+
+history_writer = SearchHistoryWriter(
+    max_queue_size=settings.search_history_queue_size,
+    batch_size=settings.search_history_batch_size,
+    flush_interval_seconds=settings.search_history_flush_interval_seconds,
+)
@@ -0,0 +1,667 @@
+"""Derived search structures kept inside contracts_new.db.
+
+The harvester owns the base tables of the contracts database. Everything in
+this module is a shadow structure (full-text index, sync triggers, normalized
+columns) that can be dropped and rebuilt from the base tables at any time.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from backend.app.common.currency_service import CURRENCY_SYMBOLS
+from backend.app.common.exchange_rates import rate_provider
+from backend.app.core.database import CONTRACTS_DB_PATH, create_contracts_engine
+from backend.app.search.names import (
+    NAME_GRAMS_TABLE,
+    NAME_INDEX_SOURCES,
+    NAME_INDEX_TABLE,
+    name_grams,
+    name_index_ddl,
+    name_keys,
+)
+from backend.app.search.normalize import (
+    normalize_certificate,
+    normalize_company,
+    normalize_contract,
+    normalize_ip_asset,
+    normalize_qualification,
+)
+
+logger = logging.getLogger(__name__)
+
+
+CONTRACTS_FTS_TABLE = "contracts_fts"
+CONTRACTS_FTS_COLUMNS = (
+    "title",
+    "contract_number",
+    "project_code",
+    "customer_name",
+    "description",
+    "tags",
+    "industry",
+)
+
+# The trigram tokenizer indexes every 3-character window, which gives us
+# substring matching for Chinese text without a word segmenter. Shorter
+# keywords cannot be answered from the index and fall back to LIKE.
+FTS_MIN_KEYWORD_LENGTH = 3
+
+# Typed columns derived from harvested text, added to the contracts table so
+# filters, ordering and result building never re-parse text per row.
+# Rows with normalized_at NULL are pending (see backend.app.search.normalize).
+CONTRACT_DERIVED_COLUMNS: Dict[str, str] = {
+    "amount_value": "REAL",
+    "currency_code": "TEXT",
+    "amount_cny": "REAL",
+    "contract_type_tag": "TEXT",
+    "signed_date": "DATE",
+    "delivery_location": "TEXT",
+    "delivery_team": "TEXT",
+    "normalized_at": "DATETIME",
+}
+CONTRACT_DERIVED_INDEXES: Dict[str, str] = {
+    "ix_contracts_amount_cny": "contracts (amount_cny)",
+    "ix_contracts_contract_type_tag": "contracts (contract_type_tag, signed_date)",
+    "ix_contracts_signed_date": "contracts (signed_date)",
+    "ix_contracts_normalized_at": "contracts (normalized_at)",
+}
+# Source columns whose change invalidates the derived ones
+CONTRACT_NORMALIZED_SOURCES = ("contract_amount", "tags", "signed_at", "raw_payload")
+
+# Exchange rates (to CNY) the stored CNY amounts were computed with. When the
+# current rate of a currency differs (including a rate that was not loaded
+# before, which left the amount NULL), contracts and companies in that
+# currency are normalized again, so amount filters and ordering follow the
+# rates shown in results. A rate reload triggers a sync pass right away
+# (see watch_exchange_rates).
+NORMALIZED_RATES_TABLE = "search_normalized_rates"
+
+# Typed company columns for capital/setup-date/state filters and ordering.
+# registered_capital_wan is in 万元 CNY (see normalize.parse_capital);
+# capital_currency_code is the currency it was converted from.
+COMPANY_DERIVED_COLUMNS: Dict[str, str] = {
+    "registered_capital_wan": "REAL",
+    "capital_currency_code": "TEXT",
+    "setup_date_iso": "TEXT",
+    "operating_state_code": "TEXT",
+    "normalized_at": "DATETIME",
+}
+COMPANY_DERIVED_INDEXES: Dict[str, str] = {
+    "ix_companies_registered_capital_wan": "companies (registered_capital_wan)",
+    "ix_companies_setup_date_iso": "companies (setup_date_iso)",
+    "ix_companies_operating_state_code": "companies (operating_state_code, setup_date_iso)",
+    "ix_companies_normalized_at": "companies (normalized_at)",
+}
+COMPANY_NORMALIZED_SOURCES = ("registered_capital", "currency", "setup_date", "operating_state")
+
+# ISO (YYYY-MM-DD) copies of the free-form date columns of qualifications, IP
+# assets and employee certificates, for expiry filters and ordering.
+# Per table: (derived columns, indexes, source columns, normalize function)
+NO_EXPIRY_SORT_KEY = "9999-12-31"  # orders rows without an end date last
+DATE_DERIVED_TABLES: Dict[str, tuple] = {
+    "qualification_assets": (
+        {
+            "issue_date_iso": "TEXT",
+            "expire_date_iso": "TEXT",
+            "next_review_date_iso": "TEXT",
+            "normalized_at": "DATETIME",
+        },
+        {
+            "ix_qualification_assets_expire_date_iso": "qualification_assets (expire_date_iso)",
+            # Matches the default ordering in search_qualifications
+            "ix_qualification_assets_expire_order": (
+                f"qualification_assets (coalesce(expire_date_iso, '{NO_EXPIRY_SORT_KEY}'), id)"
+            ),
+            "ix_qualification_assets_normalized_at": "qualification_assets (normalized_at)",
+        },
+        ("issue_date", "expire_date", "next_review_date"),
+        normalize_qualification,
+    ),
+    "intellectual_property_assets": (
+        {
+            "issue_date_iso": "TEXT",
+            "application_date_iso": "TEXT",
+            "normalized_at": "DATETIME",
+        },
+        {
+            "ix_intellectual_property_assets_issue_date_iso": "intellectual_property_assets (issue_date_iso, id)",
+            "ix_intellectual_property_assets_normalized_at": "intellectual_property_assets (normalized_at)",
+        },
+        ("issue_date", "application_date"),
+        normalize_ip_asset,
+    ),
+    "employee_certificates": (
+        {
+            "effective_date_iso": "TEXT",
+            "expire_date_iso": "TEXT",
+            "normalized_at": "DATETIME",
+        },
+        {
+            "ix_employee_certificates_expire_date_iso": "employee_certificates (expire_date_iso, employee_id)",
+            "ix_employee_certificates_normalized_at": "employee_certificates (normalized_at)",
+        },
+        ("effective_date", "expire_date"),
+        normalize_certificate,
+    ),
+}
+
+# Denormalized employee columns so employee search is a single indexed query:
+# certificate_count drives the default ordering, search_text concatenates
+# school/major/certificate names (separated by char(31)) for the text match.
+EMPLOYEE_DERIVED_COLUMNS: Dict[str, str] = {
+    "certificate_count": "INTEGER NOT NULL DEFAULT 0",
+    "search_text": "TEXT",
+}
+EMPLOYEE_DERIVED_INDEXES: Dict[str, str] = {
+    "ix_employees_certificate_order": "employees (certificate_count DESC, employee_no)",
+    "ix_employee_certificates_employee_id": "employee_certificates (employee_id)",
+    "ix_employee_educations_employee_id": "employee_educations (employee_id)",
+}
+# Child tables and the columns that feed the employee derived columns
+EMPLOYEE_CHILD_SOURCES: Dict[str, tuple] = {
+    "employee_certificates": ("employee_id", "certificate_name"),
+    "employee_educations": ("employee_id", "school", "major"),
+}
+EMPLOYEE_ROW_TRIGGER = "employees_derived_ai"
+
+# Single-row counter bumped by triggers on every write to a searched table.
+# Search result caches key on it, so any harvester run invalidates them.
+DATA_VERSION_TABLE = "search_data_version"
+DATA_VERSION_SOURCES = (
+    "contracts",
+    "qualification_assets",
+    "intellectual_property_assets",
+    "employees",
+    "employee_educations",
+    "employee_certificates",
+    "companies",
+)
+
+_fts_available = False
+_sync_thread: Optional[threading.Thread] = None
+# Serializes sync passes (periodic job, rate reloads)
+_sync_lock = threading.Lock()
+_watching_rates = False
+# Data version the name index was last synced at (in this process)
+_name_index_version: Optional[int] = None
+
+
+def _contracts_fts_ddl() -> List[str]:
+    cols = ", ".join(CONTRACTS_FTS_COLUMNS)
+    new_cols = ", ".join(f"new.{c}" for c in CONTRACTS_FTS_COLUMNS)
+    old_cols = ", ".join(f"old.{c}" for c in CONTRACTS_FTS_COLUMNS)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {CONTRACTS_FTS_TABLE} USING fts5("
+        f"{cols}, content='contracts', content_rowid='id', tokenize='trigram')",
+        # Keep the index in sync with harvester writes. The update trigger only
+        # fires for indexed columns so normalization passes don't churn it.
+        f"CREATE TRIGGER IF NOT EXISTS {CONTRACTS_FTS_TABLE}_ai AFTER INSERT ON contracts BEGIN "
+        f"INSERT INTO {CONTRACTS_FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {CONTRACTS_FTS_TABLE}_ad AFTER DELETE ON contracts BEGIN "
+        f"INSERT INTO {CONTRACTS_FTS_TABLE}({CONTRACTS_FTS_TABLE}, rowid, {cols}) "
+        f"VALUES ('delete', old.id, {old_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {CONTRACTS_FTS_TABLE}_au AFTER UPDATE OF {cols} ON contracts BEGIN "
+        f"INSERT INTO {CONTRACTS_FTS_TABLE}({CONTRACTS_FTS_TABLE}, rowid, {cols}) "
+        f"VALUES ('delete', old.id, {old_cols}); "
+        f"INSERT INTO {CONTRACTS_FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+    ]
+
+
+def maintenance_engine() -> Engine:
+    """Return a writable engine on the contracts database for index maintenance."""
+
+    return create_contracts_engine(read_only=False)
+
+
+def _table_exists(connection: Connection, name: str) -> bool:
+    row = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": name}
+    ).first()
+    return row is not None
+
+
+def ensure_contracts_fts(connection: Connection) -> bool:
+    """Create the contracts FTS index and its sync triggers if missing.
+
+    Returns:
+        True if the index was newly created and still needs to be populated
+    """
+    created = not _table_exists(connection, CONTRACTS_FTS_TABLE)
+    for stmt in _contracts_fts_ddl():
+        connection.execute(text(stmt))
+    return created
+
+
+def rebuild_contracts_fts(connection: Connection) -> None:
+    """Re-populate the contracts FTS index from the contracts table."""
+
+    connection.execute(
+        text(f"INSERT INTO {CONTRACTS_FTS_TABLE}({CONTRACTS_FTS_TABLE}) VALUES ('rebuild')")
+    )
+
+
+def drop_contracts_fts(connection: Connection) -> None:
+    """Drop the contracts FTS index and its triggers."""
+
+    for suffix in ("ai", "ad", "au"):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {CONTRACTS_FTS_TABLE}_{suffix}"))
+    connection.execute(text(f"DROP TABLE IF EXISTS {CONTRACTS_FTS_TABLE}"))
+
+
+def _ensure_derived_columns(
+    connection: Connection,
+    table_name: str,
+    columns: Dict[str, str],
+    indexes: Dict[str, str],
+    sources: Sequence[str],
+) -> None:
+    """Add derived columns, their indexes and the staleness trigger to `table_name` if missing."""
+
+    existing = {row[1] for row in connection.execute(text(f"PRAGMA table_info({table_name})"))}
+    missing = [name for name in columns if name not in existing]
+    for name in missing:
+        connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {columns[name]}"))
+    if missing and "normalized_at" in existing:
+        # New derived columns: every row has to be normalized again
+        connection.execute(text(f"UPDATE {table_name} SET normalized_at = NULL"))
+    for name, target in indexes.items():
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {target}"))
+    # New rows start with normalized_at NULL; updated rows are flagged here.
+    connection.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {table_name}_normalize_au "
+        f"AFTER UPDATE OF {', '.join(sources)} ON {table_name} BEGIN "
+        f"UPDATE {table_name} SET normalized_at = NULL WHERE id = new.id; END"
+    ))
+
+
+def _normalize_pending(
+    connection: Connection,
+    table_name: str,
+    columns: Dict[str, str],
+    sources: Sequence[str],
+    normalize: Callable[..., Dict[str, Any]],
+    batch_size: int,
+) -> int:
+    """Fill derived columns for every row of `table_name` still pending normalization.
+
+    Returns:
+        Number of rows normalized
+    """
+    rows = connection.execute(
+        text(f"SELECT id, {', '.join(sources)} FROM {table_name} WHERE normalized_at IS NULL")
+    ).all()
+    if not rows:
+        return 0
+
+    now = datetime.utcnow()
+    assignments = ", ".join(f"{name} = :{name}" for name in columns)
+    update = text(f"UPDATE {table_name} SET {assignments} WHERE id = :id")
+    for start in range(0, len(rows), batch_size):
+        updates = [
+            {"id": row.id, "normalized_at": now, **normalize(*row[1:])}
+            for row in rows[start:start + batch_size]
+        ]
+        connection.execute(update, updates)
+    return len(rows)
+
+
+def ensure_contract_columns(connection: Connection) -> None:
+    """Add the contract derived columns, their indexes and the staleness trigger if missing."""
+
+    _ensure_derived_columns(
+        connection, "contracts", CONTRACT_DERIVED_COLUMNS, CONTRACT_DERIVED_INDEXES, CONTRACT_NORMALIZED_SOURCES
+    )
+
+
+def normalize_contracts(connection: Connection, batch_size: int = 1000) -> int:
+    """Fill derived columns for every contract still pending normalization."""
+
+    return _normalize_pending(
+        connection, "contracts", CONTRACT_DERIVED_COLUMNS, CONTRACT_NORMALIZED_SOURCES, normalize_contract, batch_size
+    )
+
+
+def _current_rates() -> Dict[str, float]:
+    rates = {code: rate_provider.find_rate(code) for code in CURRENCY_SYMBOLS if code != "CNY"}
+    return {code: rate for code, rate in rates.items() if rate is not None}
+
+
+def _changed_rates(connection: Connection, current: Dict[str, float]) -> List[str]:
+    """Currencies whose current rate differs from the one stored rows were normalized with."""
+
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {NORMALIZED_RATES_TABLE} ("
+        "currency_code TEXT PRIMARY KEY, rate_to_cny REAL NOT NULL)"
+    ))
+    stored = dict(connection.execute(text(f"SELECT currency_code, rate_to_cny FROM {NORMALIZED_RATES_TABLE}")).all())
+    return sorted(code for code in set(stored) | set(current) if stored.get(code) != current.get(code))
+
+
+def _store_rates(connection: Connection, current: Dict[str, float]) -> None:
+    connection.execute(text(f"DELETE FROM {NORMALIZED_RATES_TABLE}"))
+    if current:
+        connection.execute(
+            text(f"INSERT INTO {NORMALIZED_RATES_TABLE} (currency_code, rate_to_cny) VALUES (:code, :rate)"),
+            [{"code": code, "rate": rate} for code, rate in current.items()],
+        )
+
+
+def _mark_rate_dependent(connection: Connection, table_name: str, code_column: str, codes: Sequence[str]) -> None:
+    if not codes:
+        return
+    placeholders = ", ".join(f":c{i}" for i in range(len(codes)))
+    connection.execute(
+        text(f"UPDATE {table_name} SET normalized_at = NULL WHERE {code_column} IN ({placeholders})"),
+        {f"c{i}": code for i, code in enumerate(codes)},
+    )
+
+
+def _sync_contracts(connection: Connection, rebuild: bool, changed_rates: Sequence[str] = ()) -> None:
+    ensure_contract_columns(connection)
+    if rebuild:
+        connection.execute(text("UPDATE contracts SET normalized_at = NULL"))
+    else:
+        _mark_rate_dependent(connection, "contracts", "currency_code", changed_rates)
+    count = normalize_contracts(connection)
+    if count:
+        logger.info(f"Normalized {count} contracts")
+
+
+def _sync_companies(connection: Connection, rebuild: bool, changed_rates: Sequence[str] = ()) -> None:
+    _ensure_derived_columns(
+        connection, "companies", COMPANY_DERIVED_COLUMNS, COMPANY_DERIVED_INDEXES, COMPANY_NORMALIZED_SOURCES
+    )
+    if rebuild:
+        connection.execute(text("UPDATE companies SET normalized_at = NULL"))
+    else:
+        _mark_rate_dependent(connection, "companies", "capital_currency_code", changed_rates)
+    count = _normalize_pending(
+        connection, "companies", COMPANY_DERIVED_COLUMNS, COMPANY_NORMALIZED_SOURCES, normalize_company, 1000
+    )
+    if count:
+        logger.info(f"Normalized {count} companies")
+
+
+def _sync_dates(connection: Connection, table_name: str, rebuild: bool) -> None:
+    columns, indexes, sources, normalize = DATE_DERIVED_TABLES[table_name]
+    _ensure_derived_columns(connection, table_name, columns, indexes, sources)
+    if rebuild:
+        connection.execute(text(f"UPDATE {table_name} SET normalized_at = NULL"))
+    count = _normalize_pending(connection, table_name, columns, sources, normalize, 1000)
+    if count:
+        logger.info(f"Normalized dates of {count} {table_name} rows")
+
+
+def _employee_derived_assignments(employee_id: str) -> str:
+    return (
+        "certificate_count = (SELECT count(*) FROM employee_certificates "
+        f"WHERE employee_id = {employee_id}), "
+        "search_text = (SELECT group_concat(t, char(31)) FROM ("
+        f"SELECT school AS t FROM employee_educations WHERE employee_id = {employee_id} AND school IS NOT NULL "
+        f"UNION ALL SELECT major FROM employee_educations WHERE employee_id = {employee_id} AND major IS NOT NULL "
+        f"UNION ALL SELECT certificate_name FROM employee_certificates WHERE employee_id = {employee_id} "
+        "AND certificate_name IS NOT NULL))"
+    )
+
+
+def _employee_triggers_ddl() -> List[str]:
+    def refresh(ref: str) -> str:
+        return f"UPDATE employees SET {_employee_derived_assignments(ref)} WHERE id = {ref};"
+
+    statements = []
+    for table_name, columns in EMPLOYEE_CHILD_SOURCES.items():
+        statements += [
+            f"CREATE TRIGGER IF NOT EXISTS {table_name}_derived_ai AFTER INSERT ON {table_name} "
+            f"BEGIN {refresh('new.employee_id')} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table_name}_derived_ad AFTER DELETE ON {table_name} "
+            f"BEGIN {refresh('old.employee_id')} END",
+            f"CREATE TRIGGER IF NOT EXISTS {table_name}_derived_au AFTER UPDATE OF {', '.join(columns)} "
+            f"ON {table_name} BEGIN {refresh('old.employee_id')} {refresh('new.employee_id')} END",
+        ]
+    # Employees inserted (or REPLACEd) after their children start from the column defaults
+    statements += [
+        f"CREATE TRIGGER IF NOT EXISTS {EMPLOYEE_ROW_TRIGGER} AFTER INSERT ON employees "
+        f"BEGIN {refresh('new.id')} END",
+        "CREATE TRIGGER IF NOT EXISTS employees_derived_au AFTER UPDATE OF id ON employees "
+        f"BEGIN {refresh('new.id')} END",
+    ]
+    return statements
+
+
+def _sync_employees(connection: Connection, rebuild: bool) -> None:
+    """Add employee derived columns + maintenance triggers; fill them when new or rebuilding."""
+
+    existing = {row[1] for row in connection.execute(text("PRAGMA table_info(employees)"))}
+    missing = [name for name in EMPLOYEE_DERIVED_COLUMNS if name not in existing]
+    for name in missing:
+        connection.execute(text(f"ALTER TABLE employees ADD COLUMN {name} {EMPLOYEE_DERIVED_COLUMNS[name]}"))
+    for name, target in EMPLOYEE_DERIVED_INDEXES.items():
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {target}"))
+    # Rows written before the employees trigger existed may still hold the defaults
+    stale = not _table_exists(connection, EMPLOYEE_ROW_TRIGGER)
+    for stmt in _employee_triggers_ddl():
+        connection.execute(text(stmt))
+    if missing or stale or rebuild:
+        connection.execute(text(f"UPDATE employees SET {_employee_derived_assignments('employees.id')}"))
+        logger.info("Refreshed employee certificate counts and search text")
+
+
+def ensure_data_version(connection: Connection) -> None:
+    """Create the data-version counter and the triggers that bump it."""
+
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {DATA_VERSION_TABLE} ("
+        "id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)"
+    ))
+    connection.execute(text(f"INSERT OR IGNORE INTO {DATA_VERSION_TABLE} (id, version) VALUES (1, 0)"))
+    bump = f"UPDATE {DATA_VERSION_TABLE} SET version = version + 1 WHERE id = 1;"
+    for table_name in DATA_VERSION_SOURCES:
+        if not _table_exists(connection, table_name):
+            continue
+        for suffix, event in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE")):
+            connection.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {table_name}_version_{suffix} AFTER {event} ON {table_name} "
+                f"BEGIN {bump} END"
+            ))
+
+
+def read_data_version(connection: Connection) -> Optional[int]:
+    """Current data version, or None if the counter has not been created yet."""
+
+    if not _table_exists(connection, DATA_VERSION_TABLE):
+        return None
+    return connection.execute(text(f"SELECT version FROM {DATA_VERSION_TABLE} WHERE id = 1")).scalar()
+
+
+def _delete_names(connection: Connection, ids: Sequence[int]) -> None:
+    for start in range(0, len(ids), 500):
+        chunk = list(ids[start:start + 500])
+        placeholders = ", ".join(str(int(i)) for i in chunk)
+        connection.execute(text(f"DELETE FROM {NAME_GRAMS_TABLE} WHERE name_id IN ({placeholders})"))
+        connection.execute(text(f"DELETE FROM {NAME_INDEX_TABLE} WHERE id IN ({placeholders})"))
+
+
+def _sync_name_index(connection: Connection, rebuild: bool) -> None:
+    """Add new and drop vanished distinct names of NAME_INDEX_SOURCES (see search.names)."""
+
+    global _name_index_version
+    version = read_data_version(connection)
+    for stmt in name_index_ddl():
+        connection.execute(text(stmt))
+    if rebuild:
+        connection.execute(text(f"DELETE FROM {NAME_GRAMS_TABLE}"))
+        connection.execute(text(f"DELETE FROM {NAME_INDEX_TABLE}"))
+    elif version is not None and version == _name_index_version:
+        return
+
+    added = removed = 0
+    for table_name, column_name in NAME_INDEX_SOURCES:
+        if not _table_exists(connection, table_name):
+            continue
+        current = {
+            row[0] for row in connection.execute(text(
+                f"SELECT DISTINCT {column_name} FROM {table_name} "
+                f"WHERE {column_name} IS NOT NULL AND TRIM({column_name}) != ''"
+            ))
+        }
+        indexed = dict(connection.execute(
+            text(f"SELECT name, id FROM {NAME_INDEX_TABLE} WHERE source_table = :t AND source_column = :c"),
+            {"t": table_name, "c": column_name},
+        ).all())
+
+        stale = [name_id for name, name_id in indexed.items() if name not in current]
+        _delete_names(connection, stale)
+        removed += len(stale)
+
+        for name in current.difference(indexed):
+            name_key, pinyin, initials = name_keys(name)
+            name_id = connection.execute(
+                text(
+                    f"INSERT INTO {NAME_INDEX_TABLE} "
+                    "(source_table, source_column, name, name_key, pinyin, initials) "
+                    "VALUES (:t, :c, :name, :name_key, :pinyin, :initials)"
+                ),
+                {"t": table_name, "c": column_name, "name": name,
+                 "name_key": name_key, "pinyin": pinyin, "initials": initials},
+            ).lastrowid
+            connection.execute(
+                text(f"INSERT OR IGNORE INTO {NAME_GRAMS_TABLE} (gram, name_id) VALUES (:gram, :name_id)"),
+                [{"gram": gram, "name_id": name_id} for gram in name_grams(name_key, pinyin)],
+            )
+            added += 1
+
+    if added or removed:
+        logger.info(f"Name index synced: {added} names added, {removed} removed")
+    _name_index_version = version
+
+
+def _sync_tables(connection: Connection, rebuild: bool) -> None:
+    ensure_data_version(connection)
+    rates = _current_rates()
+    changed_rates = _changed_rates(connection, rates)
+    if changed_rates:
+        logger.info(f"Exchange rates changed for {', '.join(changed_rates)}, re-normalizing amounts")
+    if _table_exists(connection, "contracts"):
+        _sync_contracts(connection, rebuild=rebuild, changed_rates=changed_rates)
+    if all(_table_exists(connection, name) for name in ("employees", *EMPLOYEE_CHILD_SOURCES)):
+        _sync_employees(connection, rebuild=rebuild)
+    if _table_exists(connection, "companies"):
+        _sync_companies(connection, rebuild=rebuild, changed_rates=changed_rates)
+    for table_name in DATE_DERIVED_TABLES:
+        if _table_exists(connection, table_name):
+            _sync_dates(connection, table_name, rebuild=rebuild)
+    _sync_name_index(connection, rebuild=rebuild)
+    if changed_rates:
+        _store_rates(connection, rates)
+
+
+def ensure_search_schema() -> None:
+    """Make sure derived columns/triggers exist and pending rows are normalized.
+
+    Called on application startup; cheap when everything is up to date.
+    """
+    if not CONTRACTS_DB_PATH.exists():
+        return
+    engine = maintenance_engine()
+    try:
+        with _sync_lock, engine.begin() as connection:
+            _sync_tables(connection, rebuild=False)
+    except Exception as exc:
+        logger.error(f"Failed to prepare search schema in {CONTRACTS_DB_PATH}: {exc}", exc_info=True)
+    finally:
+        engine.dispose()
+
+
+def watch_exchange_rates() -> None:
+    """Run a sync pass whenever the exchange-rate snapshot changes (see NORMALIZED_RATES_TABLE)."""
+
+    global _watching_rates
+    if _watching_rates:
+        return
+    _watching_rates = True
+    rate_provider.add_listener(ensure_search_schema)
+
+
+def start_search_sync(interval_seconds: float) -> None:
+    """Start a daemon thread that normalizes newly harvested/updated rows periodically."""
+
+    global _sync_thread
+    if _sync_thread is not None:
+        return
+
+    def _loop() -> None:
+        while True:
+            time.sleep(interval_seconds)
+            ensure_search_schema()
+
+    _sync_thread = threading.Thread(target=_loop, name="search-sync", daemon=True)
+    _sync_thread.start()
+    logger.info(f"Search sync job started (interval={interval_seconds}s)")
+
+
+def build_search_indexes(rebuild: bool = False) -> None:
+    """Create (or fully rebuild) the shadow search indexes in contracts_new.db."""
+
+    engine = maintenance_engine()
+    try:
+        with engine.begin() as connection:
+            _sync_tables(connection, rebuild=rebuild)
+            if not _table_exists(connection, "contracts"):
+                logger.warning(f"contracts table not found in {CONTRACTS_DB_PATH}, skipping FTS index")
+                return
+            if rebuild:
+                drop_contracts_fts(connection)
+            if ensure_contracts_fts(connection) or rebuild:
+                logger.info(f"Populating {CONTRACTS_FTS_TABLE} ...")
+                rebuild_contracts_fts(connection)
+    finally:
+        engine.dispose()
+
+
+def has_contracts_fts(db: Session) -> bool:
+    """Check whether the contracts FTS index exists (positive result is cached)."""
+
+    global _fts_available
+    if not _fts_available:
+        _fts_available = _table_exists(db.connection(), CONTRACTS_FTS_TABLE)
+    return _fts_available
+
+
+def split_keywords(keywords: Sequence[str]) -> tuple[List[str], List[str]]:
+    """Split keywords into (index-searchable, LIKE-only) groups."""
+
+    indexed = [k for k in keywords if len(k) >= FTS_MIN_KEYWORD_LENGTH]
+    short = [k for k in keywords if len(k) < FTS_MIN_KEYWORD_LENGTH]
+    return indexed, short
+
+
+def fts_match_expression(keywords: Sequence[str]) -> Optional[str]:
+    """Build an FTS5 MATCH expression requiring every keyword as a substring."""
+
+    phrases = ['"{}"'.format(k.replace('"', '""')) for k in keywords if k]
+    return " AND ".join(phrases) if phrases else None
+
+
+def contracts_fts_subquery(match: str, weights: Sequence[float] = ()):
+    """Subquery of (contract_id, rank) for contracts matching `match`.
+
+    Lower rank is better (BM25 as returned by SQLite). `weights` are optional
+    per-column BM25 weights in CONTRACTS_FTS_COLUMNS order.
+    """
+    fts = table(CONTRACTS_FTS_TABLE, column("rowid"))
+    fts_ref = literal_column(CONTRACTS_FTS_TABLE)
+    return (
+        select(fts.c.rowid.label("contract_id"), func.bm25(fts_ref, *weights).label("rank"))
+        .select_from(fts)
+        .where(fts_ref.match(match))
+        .subquery("contracts_match")
+    )
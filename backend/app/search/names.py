@@ -0,0 +1,209 @@
+"""Pinyin / initials / typo-tolerant lookup of names.
+
+Names users type in pinyin or as abbreviations ("zhangsan", "zs" for 张三)
+cannot be found with LIKE. Every distinct name of the indexed columns is
+stored once in an auxiliary table with its lowercased text, full pinyin and
+pinyin initials, plus a table of character bigrams for typo tolerance:
+
+* prefixes of the name as typed, its pinyin and its initials are answered
+  by range scans on their indexes;
+* queries that match no name as typed (neither as a prefix nor anywhere
+  inside it) are retried with typo tolerance: names sharing the most
+  bigrams with the query (count filter) are verified with an edit distance
+  bounded by ``max_edits(len(q))``.
+
+Lookups return the matching names per column, so searches filter with
+``column IN (...)`` on their existing indexes. The tables are maintained by
+search.indexing from the base tables and can be rebuilt at any time.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:
+    lazy_pinyin = None  # type: ignore
+
+NAME_INDEX_TABLE = "search_names"
+NAME_GRAMS_TABLE = "search_name_grams"
+
+# (table, column) pairs whose distinct values are indexed
+NAME_INDEX_SOURCES: Tuple[Tuple[str, str], ...] = (
+    ("contracts", "customer_name"),
+    ("employees", "name"),
+    ("employee_certificates", "certificate_name"),
+    ("companies", "name"),
+    ("companies", "shorthand"),
+    ("companies", "prev_name"),
+)
+
+MAX_MATCHES = 200
+MAX_FUZZY_CANDIDATES = 500
+# Initials shorter than this match too many names to be useful
+MIN_INITIALS_LENGTH = 2
+
+# Sorts after every valid character, so [q, q + _PREFIX_END) is "starts with q"
+_PREFIX_END = "\U0010ffff"
+
+_WORD_RE = re.compile(r"[^\W_]+")
+
+_names_available = False
+
+
+def name_index_ddl() -> List[str]:
+    return [
+        f"CREATE TABLE IF NOT EXISTS {NAME_INDEX_TABLE} ("
+        "id INTEGER PRIMARY KEY, source_table TEXT NOT NULL, source_column TEXT NOT NULL, "
+        "name TEXT NOT NULL, name_key TEXT NOT NULL, pinyin TEXT NOT NULL, initials TEXT NOT NULL, "
+        "UNIQUE (source_table, source_column, name))",
+        f"CREATE INDEX IF NOT EXISTS ix_{NAME_INDEX_TABLE}_name_key ON {NAME_INDEX_TABLE} (source_table, name_key)",
+        f"CREATE INDEX IF NOT EXISTS ix_{NAME_INDEX_TABLE}_pinyin ON {NAME_INDEX_TABLE} (source_table, pinyin)",
+        f"CREATE INDEX IF NOT EXISTS ix_{NAME_INDEX_TABLE}_initials ON {NAME_INDEX_TABLE} (source_table, initials)",
+        f"CREATE TABLE IF NOT EXISTS {NAME_GRAMS_TABLE} ("
+        "gram TEXT NOT NULL, name_id INTEGER NOT NULL, PRIMARY KEY (gram, name_id)) WITHOUT ROWID",
+        f"CREATE INDEX IF NOT EXISTS ix_{NAME_GRAMS_TABLE}_name ON {NAME_GRAMS_TABLE} (name_id)",
+    ]
+
+
+def normalize_query(value: str) -> str:
+    """Lowercase and drop whitespace, the form every key is stored in."""
+    return "".join(value.lower().split())
+
+
+def name_keys(name: str) -> Tuple[str, str, str]:
+    """(name_key, pinyin, initials) of `name`; without pypinyin both pinyin keys are the name key."""
+    name_key = normalize_query(name)
+    if lazy_pinyin is None:
+        return name_key, name_key, name_key
+    # Non-Chinese runs come back unchanged as one item; split them into words
+    # so "Acme Corp" abbreviates to "ac", and drop punctuation
+    words = [
+        word
+        for item in lazy_pinyin(name, style=Style.NORMAL, errors="default")
+        for word in _WORD_RE.findall(item.lower())
+    ]
+    return name_key, "".join(words), "".join(word[0] for word in words)
+
+
+def name_grams(*values: str) -> Set[str]:
+    """Character bigrams of `values` (single characters are kept as-is)."""
+    grams: Set[str] = set()
+    for value in values:
+        if len(value) == 1:
+            grams.add(value)
+        grams.update(value[i:i + 2] for i in range(len(value) - 1))
+    return grams
+
+
+def max_edits(length: int) -> int:
+    """Typos tolerated in a query of `length` characters."""
+    if length <= 3:
+        return 0
+    return 1 if length <= 6 else 2
+
+
+def prefix_edit_distance(query: str, target: str, limit: int) -> Optional[int]:
+    """Smallest edit distance between `query` and a prefix of `target`, or None if above `limit`."""
+    previous = list(range(len(target) + 1))
+    for i, q_char in enumerate(query, start=1):
+        current = [i]
+        for j, t_char in enumerate(target, start=1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (q_char != t_char),
+            ))
+        if min(current) > limit:
+            return None
+        previous = current
+    best = min(previous)
+    return best if best <= limit else None
+
+
+def has_name_index(db: Session) -> bool:
+    """Check whether the name index exists (positive result is cached)."""
+    global _names_available
+    if not _names_available:
+        _names_available = db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": NAME_INDEX_TABLE}
+        ).first() is not None
+    return _names_available
+
+
+def _select_names(db: Session, sql: str, params: dict, columns: Sequence[str]) -> list:
+    statement = text(sql).bindparams(bindparam("columns", expanding=True))
+    return list(db.execute(statement, {**params, "columns": list(columns)}))
+
+
+def match_names(db: Session, table_name: str, columns: Sequence[str], q: Optional[str]) -> Dict[str, List[str]]:
+    """
+    Names of `table_name`.`columns` matching `q` by pinyin, initials or within
+    the edit-distance bound, keyed by column. Empty if nothing matches or the
+    index has not been built.
+    """
+    query = normalize_query(q or "")
+    if not query or not has_name_index(db):
+        return {}
+
+    found: Dict[str, Set[str]] = {}
+
+    def _add(rows: Iterable) -> None:
+        for column_name, name in rows:
+            found.setdefault(column_name, set()).add(name)
+
+    params = {"table_name": table_name, "lower": query, "upper": query + _PREFIX_END, "limit": MAX_MATCHES}
+    key_columns = ["name_key"]
+    if query.isascii():
+        key_columns += ["pinyin"] + (["initials"] if len(query) >= MIN_INITIALS_LENGTH else [])
+    for key in key_columns:
+        _add(_select_names(
+            db,
+            f"SELECT source_column, name FROM {NAME_INDEX_TABLE} "
+            f"WHERE source_table = :table_name AND {key} >= :lower AND {key} < :upper "
+            f"AND source_column IN :columns ORDER BY {key} LIMIT :limit",
+            params,
+            columns,
+        ))
+
+    # Typo tolerance only when the query matched nothing as typed
+    edits = 0 if found else max_edits(len(query))
+    if edits and _select_names(
+        db,
+        f"SELECT 1 FROM {NAME_INDEX_TABLE} WHERE source_table = :table_name "
+        "AND source_column IN :columns AND instr(name_key, :lower) > 0 LIMIT 1",
+        params,
+        columns,
+    ):
+        # Found inside a name (callers match those with LIKE)
+        edits = 0
+    grams = name_grams(query)
+    # Each edit destroys at most two bigrams of a matching name
+    min_shared = len(grams) - 2 * edits
+    if edits and min_shared > 0:
+        statement = text(
+            f"SELECT n.source_column, n.name, n.name_key, n.pinyin FROM {NAME_GRAMS_TABLE} g "
+            f"JOIN {NAME_INDEX_TABLE} n ON n.id = g.name_id "
+            "WHERE g.gram IN :grams AND n.source_table = :table_name AND n.source_column IN :columns "
+            "GROUP BY n.id HAVING COUNT(*) >= :min_shared ORDER BY COUNT(*) DESC, n.id LIMIT :limit"
+        ).bindparams(bindparam("grams", expanding=True), bindparam("columns", expanding=True))
+        candidates = db.execute(statement, {
+            "grams": sorted(grams),
+            "table_name": table_name,
+            "columns": list(columns),
+            "min_shared": min_shared,
+            "limit": MAX_FUZZY_CANDIDATES,
+        })
+        _add(
+            (column_name, name)
+            for column_name, name, name_key, pinyin in candidates
+            if prefix_edit_distance(query, name_key, edits) is not None
+            or prefix_edit_distance(query, pinyin, edits) is not None
+        )
+
+    return {column_name: sorted(names)[:MAX_MATCHES] for column_name, names in found.items()}
@@ -0,0 +1,187 @@
+"""Parsing helpers that turn free-form harvested text into typed values."""
+from __future__ import annotations
+
+import json
+import re
+from datetime import date
+from typing import Any, Dict, Optional
+
+from backend.app.common.currency_service import CURRENCY_MAP, amount_in_cny, currency_code, parse_amount
+
+_TAG_SPLIT_RE = re.compile(r'[,，\s]+')
+# 2023-01-01, 2023/1/1, 2023.01.01, 2023年1月1日, optionally followed by a time part
+_DATE_RE = re.compile(r'^\s*(\d{4})\s*[-/.年]\s*(\d{1,2})\s*[-/.月]\s*(\d{1,2})')
+_COMPACT_DATE_RE = re.compile(r'^\s*(\d{4})(\d{2})(\d{2})\s*$')
+# "100万元", "1,000万人民币", "50.5万", "1亿元", "5000000元"
+_CAPITAL_RE = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(亿|万)?')
+_CURRENCY_NAMES = sorted(CURRENCY_MAP, key=len, reverse=True)
+# Checked in order: "吊销，未注销" is revoked, "存续（在营、开业、在册）" is active
+OPERATING_STATE_CODES = (
+    ('吊销', 'revoked'),
+    ('注销', 'deregistered'),
+    ('迁出', 'moved_out'),
+    ('停业', 'suspended'),
+    ('清算', 'liquidating'),
+    ('存续', 'active'),
+    ('在业', 'active'),
+    ('在营', 'active'),
+    ('开业', 'active'),
+)
+
+
+def parse_amount_string(amount_str: str) -> Optional[float]:
+    """Parse amount string like '中国人民币 526,548.00' to float."""
+    if not amount_str:
+        return None
+    try:
+        # Remove currency prefix and commas
+        number_part = re.sub(r'[^\d.]', '', amount_str)
+        return float(number_part) if number_part else None
+    except ValueError:
+        return None
+
+
+def first_tag(tags: Optional[str]) -> Optional[str]:
+    """Return the first tag of a '固定金额,开发' style tag list (used as contract type)."""
+    if not tags:
+        return None
+    tags_list = [t.strip() for t in _TAG_SPLIT_RE.split(tags) if t.strip()]
+    return tags_list[0] if tags_list else None
+
+
+def parse_date(value: Optional[str]) -> Optional[str]:
+    """Normalize a free-form date string to ISO 'YYYY-MM-DD'. Returns None if it isn't a date."""
+    if not value:
+        return None
+    match = _DATE_RE.match(value) or _COMPACT_DATE_RE.match(value)
+    if not match:
+        return None
+    try:
+        return date(int(match.group(1)), int(match.group(2)), int(match.group(3))).isoformat()
+    except ValueError:
+        return None
+
+
+def parse_payload(raw_payload: Any) -> Dict[str, Any]:
+    """Safe parsing of raw_payload (stored as JSON string)."""
+    if not raw_payload:
+        return {}
+    if isinstance(raw_payload, dict):
+        return raw_payload
+    try:
+        payload = json.loads(raw_payload)
+    except (TypeError, ValueError):
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+def normalize_contract(
+    contract_amount: Optional[str],
+    tags: Optional[str],
+    signed_at: Optional[str],
+    raw_payload: Any,
+) -> Dict[str, Any]:
+    """Compute the derived contract columns (see search.indexing) from harvested text."""
+    parsed = parse_amount(contract_amount)
+    if parsed:
+        currency_name, amount_value = parsed
+        code = currency_code(currency_name)
+    else:
+        amount_value, code = parse_amount_string(contract_amount), None
+    payload = parse_payload(raw_payload)
+    return {
+        'amount_value': amount_value,
+        'currency_code': code,
+        'amount_cny': amount_in_cny(amount_value, code) if amount_value is not None else None,
+        'contract_type_tag': first_tag(tags),
+        'signed_date': parse_date(signed_at),
+        'delivery_location': _as_text(payload.get('delivery_location')),
+        'delivery_team': _as_text(payload.get('delivery_team')),
+    }
+
+
+def _as_text(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def capital_currency(raw: Optional[str], currency: Optional[str] = None) -> Optional[str]:
+    """Currency code of a registered capital text (from the text itself or `currency`); None if unstated."""
+    name = next((n for n in _CURRENCY_NAMES if n in (raw or '')), None) or (currency or '').strip()
+    return currency_code(name) if name else None
+
+
+def parse_capital(raw: Optional[str], currency: Optional[str] = None) -> Optional[float]:
+    """
+    Registered capital in 万元 (CNY). Amounts without a unit are taken as 万,
+    as registries publish them; the currency comes from the text or `currency`.
+    None if unparseable or the currency's exchange rate is not loaded yet.
+    """
+    if not raw:
+        return None
+    match = _CAPITAL_RE.search(raw)
+    if not match:
+        return None
+    try:
+        value = float(match.group(1).replace(',', ''))
+    except ValueError:
+        return None
+    unit = match.group(2)
+    if unit == '亿':
+        value *= 10000
+    elif unit is None and '元' in raw[match.end():match.end() + 2]:
+        value /= 10000  # plain 元
+    code = capital_currency(raw, currency)
+    return amount_in_cny(value, code) if code else value
+
+
+def operating_state_code(state: Optional[str]) -> Optional[str]:
+    """Map an operating state text (存续/在业/注销/...) to a stable code; None if unknown."""
+    if not state:
+        return None
+    return next((code for marker, code in OPERATING_STATE_CODES if marker in state), None)
+
+
+def normalize_company(
+    registered_capital: Optional[str],
+    currency: Optional[str],
+    setup_date: Optional[str],
+    operating_state: Optional[str],
+) -> Dict[str, Any]:
+    """Compute the derived company columns (see search.indexing) from harvested text."""
+    return {
+        'registered_capital_wan': parse_capital(registered_capital, currency),
+        'capital_currency_code': capital_currency(registered_capital, currency),
+        'setup_date_iso': parse_date(setup_date),
+        'operating_state_code': operating_state_code(operating_state),
+    }
+
+
+def normalize_qualification(
+    issue_date: Optional[str],
+    expire_date: Optional[str],
+    next_review_date: Optional[str],
+) -> Dict[str, Any]:
+    """Derived qualification columns: ISO dates ('长期' and other non-dates become NULL, i.e. no end date)."""
+    return {
+        'issue_date_iso': parse_date(issue_date),
+        'expire_date_iso': parse_date(expire_date),
+        'next_review_date_iso': parse_date(next_review_date),
+    }
+
+
+def normalize_ip_asset(issue_date: Optional[str], application_date: Optional[str]) -> Dict[str, Any]:
+    """Derived intellectual-property asset columns (ISO dates)."""
+    return {
+        'issue_date_iso': parse_date(issue_date),
+        'application_date_iso': parse_date(application_date),
+    }
+
+
+def normalize_certificate(effective_date: Optional[str], expire_date: Optional[str]) -> Dict[str, Any]:
+    """Derived employee certificate columns (ISO dates)."""
+    return {
+        'effective_date_iso': parse_date(effective_date),
+        'expire_date_iso': parse_date(expire_date),
+    }
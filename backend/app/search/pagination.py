@@ -0,0 +1,71 @@
+"""Keyset (cursor) pagination helpers for the search endpoints.
+
+A search's ordering is described by a list of sort keys ``(expression,
+descending)`` whose last entry is the primary key, so every row has a unique
+key tuple. A cursor is the key tuple of the last row of a page, encoded as
+opaque URL-safe base64 JSON; the next page is the rows strictly after it.
+
+NULL handling follows SQLite's default ordering (NULL sorts lowest, i.e.
+first ascending and last descending), so sort expressions must not change
+the null placement with NULLS FIRST/LAST.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from typing import Any, List, Sequence, Tuple
+
+from sqlalchemy import and_, false, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+SortKey = Tuple[ColumnElement, bool]
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor cannot be decoded for the requested search."""
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), ensure_ascii=False, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw.decode("utf-8"))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursorError("Invalid cursor") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError("Cursor does not match this search")
+    return values
+
+
+def order_clauses(sort_keys: Sequence[SortKey]) -> list:
+    return [expr.desc() if descending else expr.asc() for expr, descending in sort_keys]
+
+
+def _after(expr: ColumnElement, descending: bool, value: Any):
+    if value is None:
+        # NULL is the lowest value: after it ascending comes any non-NULL value,
+        # descending nothing comes after it
+        return false() if descending else expr.isnot(None)
+    if descending:
+        return or_(expr < value, expr.is_(None))
+    return expr > value
+
+
+def _equal(expr: ColumnElement, value: Any):
+    return expr.is_(None) if value is None else expr == value
+
+
+def after_clause(sort_keys: Sequence[SortKey], values: Sequence[Any]):
+    """WHERE clause selecting rows that sort strictly after the key tuple `values`."""
+
+    branches = []
+    for i, (expr, descending) in enumerate(sort_keys):
+        prefix = [_equal(e, v) for (e, _), v in zip(sort_keys[:i], values[:i])]
+        branches.append(and_(*prefix, _after(expr, descending, values[i])))
+    return or_(*branches)
@@ -0,0 +1,126 @@
+"""Relevance ranking shared by the search endpoints.
+
+Each entity has a ranking profile: a list of fields with a weight and the
+kinds of match (exact, prefix, contains) that count for the field. A row's
+score is the best weighted match of the query over those fields, computed in
+SQL as a CASE expression. Ranking therefore runs only on the rows the filters
+and indexes select, and ORDER BY / keyset pagination stay in the database.
+Higher scores rank first; rows that match none of the ranked fields score 0.
+
+The same weights are used as BM25 column weights when a search uses the
+contracts FTS index. Per-entity weights can be overridden through
+settings.search_ranking_weights, for example
+``SA_SEARCH_RANKING_WEIGHTS='{"contracts": {"customer_name": 3}}'``.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, func, literal
+from sqlalchemy.sql.elements import ColumnElement
+
+from backend.app.core.config import settings
+from backend.app.search.pagination import SortKey
+
+EXACT = "exact"
+PREFIX = "prefix"
+CONTAINS = "contains"
+ALL_MATCHES = (EXACT, PREFIX, CONTAINS)
+
+# Score of a match kind on a field of weight 1.0
+MATCH_SCORES: Dict[str, float] = {EXACT: 4.0, PREFIX: 3.0, CONTAINS: 2.0}
+
+
+def _match(value: ColumnElement, kind: str, q_lower: str) -> ColumnElement:
+    if kind == EXACT:
+        return value == q_lower
+    if kind == PREFIX:
+        return func.substr(value, 1, len(q_lower)) == q_lower
+    return func.instr(value, q_lower) > 0
+
+
+@dataclass(frozen=True)
+class FieldBoost:
+    name: str  # mapped attribute (and FTS column) name
+    weight: float = 1.0
+    matches: Tuple[str, ...] = ALL_MATCHES  # empty: only weights the FTS rank
+
+
+@dataclass(frozen=True)
+class RankingProfile:
+    fields: Tuple[FieldBoost, ...]
+
+    def score(self, model, q: str) -> ColumnElement:
+        """SQL expression scoring how well a row of `model` matches `q` (higher is better)."""
+        q_lower = q.lower()
+        tiers = []
+        for boost in self.fields:
+            value = func.lower(getattr(model, boost.name))
+            for kind in boost.matches:
+                tiers.append((boost.weight * MATCH_SCORES[kind], _match(value, kind, q_lower)))
+        if not tiers:
+            return literal(0.0)
+        # Best match first; a stable sort keeps the profile order between equal scores
+        tiers.sort(key=lambda tier: -tier[0])
+        return case(*((condition, score) for score, condition in tiers), else_=0.0)
+
+    def sort_keys(self, model, q: Optional[str]) -> List[SortKey]:
+        """Leading sort keys for a search on `q` (none without a query)."""
+        return [(self.score(model, q), True)] if q else []
+
+    def column_weights(self, columns: Sequence[str]) -> List[float]:
+        """Weights for `columns` in order (1.0 for unlisted ones), e.g. for bm25()."""
+        weights = {boost.name: boost.weight for boost in self.fields}
+        return [weights.get(name, 1.0) for name in columns]
+
+
+DEFAULT_PROFILES: Dict[str, RankingProfile] = {
+    "contracts": RankingProfile((
+        FieldBoost("title", 2.0),
+        FieldBoost("customer_name", 1.0, (CONTAINS,)),
+        FieldBoost("contract_number", 1.5, ()),
+        FieldBoost("project_code", 1.5, ()),
+    )),
+    "qualifications": RankingProfile((
+        FieldBoost("qualification_name", 2.0),
+        FieldBoost("company_name", 1.0, (CONTAINS,)),
+    )),
+    "assets": RankingProfile((
+        FieldBoost("knowledge_name", 2.0),
+        FieldBoost("certificate_number", 2.0, (EXACT,)),
+        FieldBoost("company_name", 1.0, (CONTAINS,)),
+    )),
+    "employees": RankingProfile((
+        FieldBoost("name", 2.0),
+        FieldBoost("employee_no", 2.0, (EXACT,)),
+    )),
+    "companies": RankingProfile((
+        FieldBoost("name", 2.0),
+        FieldBoost("code", 2.0, (EXACT,)),
+        FieldBoost("legal_person", 1.0, (EXACT,)),
+    )),
+}
+
+
+def _with_overrides(profile: RankingProfile, weights: Dict[str, float]) -> RankingProfile:
+    known = {boost.name for boost in profile.fields}
+    fields = [replace(boost, weight=weights.get(boost.name, boost.weight)) for boost in profile.fields]
+    # Unlisted fields only adjust FTS column weights
+    fields += [FieldBoost(name, weight, ()) for name, weight in weights.items() if name not in known]
+    return RankingProfile(tuple(fields))
+
+
+def ranking_profile(entity: str) -> RankingProfile:
+    """Ranking profile of `entity` with the configured weight overrides applied."""
+    profile = _PROFILES.get(entity)
+    if profile is None:
+        raise KeyError(f"No ranking profile for {entity!r}")
+    return profile
+
+
+_PROFILES: Dict[str, RankingProfile] = {
+    entity: _with_overrides(profile, settings.search_ranking_weights.get(entity, {}))
+    for entity, profile in DEFAULT_PROFILES.items()
+}
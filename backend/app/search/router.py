@@ -1,13 +1,19 @@
 """API router for Simple Search endpoints."""
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional, List
 
 from backend.app.auth import models as auth_models
 from backend.app.core import dependencies
+from backend.app.core.database import ContractsSessionLocal
 from backend.app.core.dependencies import get_db
+from backend.app.core.metrics import latency_recorder, slow_queries
 from backend.app.search import service, schemas
+from backend.app.search.cache import search_cache
+from backend.app.search.history import history_writer
+from backend.app.search.pagination import InvalidCursorError
+from backend.app.search.suggest import suggestion_index
 from pydantic import BaseModel, Field
 
 router = APIRouter(prefix="/search", tags=["search"])
@@ -21,6 +27,12 @@ class SearchParams(BaseModel):
 
 
 
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
 @router.get("/contracts/export")
 def export_contracts(
     q: Optional[str] = Query(None, description="Search query"),
@@ -29,14 +41,16 @@ def export_contracts(
     status: Optional[str] = Query(None, description="Filter by status"),
     tags: Optional[str] = Query(None, description="Filter by tags (comma-separated)"),
     industry: Optional[str] = Query(None, description="Filter by industry"),
+    is_fp: Optional[bool] = Query(None, description="Filter by Fixed Price (FP) projects"),
     min_amount: Optional[float] = Query(None, description="Minimum amount"),
     max_amount: Optional[float] = Query(None, description="Maximum amount"),
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    file_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$", description="csv or xlsx"),
     db: Session = Depends(get_db)
 ):
     """
-    Export contract search results to Excel (CSV).
+    Export all matching contracts to Excel (CSV or XLSX), streamed as it is generated.
     """
     params = schemas.ContractSearchParams(
         q=q,
@@ -45,20 +59,17 @@ def export_contracts(
         status=status,
         tags=tags,
         industry=industry,
+        is_fp=is_fp,
         min_amount=min_amount,
         max_amount=max_amount,
         start_date=start_date,
-        end_date=end_date,
-        limit=10000, # High limit for export
-        offset=0
+        end_date=end_date
     )
     
-    csv_buffer = service.export_contracts(db, params)
-    
     return StreamingResponse(
-        csv_buffer,
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=contracts_export.csv"}
+        service.export_contracts(db, params, file_format),
+        media_type=EXPORT_MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f"attachment; filename=contracts_export.{file_format}"}
     )
 
 
@@ -77,6 +88,8 @@ def search_contracts(
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
     limit: int = Query(50, le=100, description="Max results"),
     offset: int = Query(0, ge=0, description="Offset"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next_cursor"),
+    facets: bool = Query(False, description="Also return facet counts for the filter chips"),
     db: Session = Depends(get_db),
     current_user = Depends(dependencies.get_current_user)
 ):
@@ -100,16 +113,23 @@ def search_contracts(
         start_date=start_date,
         end_date=end_date,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor,
+        facets=facets
     )
     
-    results, total = service.search_contracts(db, params, current_user)
+    try:
+        results, total, next_cursor = service.search_contracts(db, params, current_user)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
     
     return schemas.SearchResponse(
         total=total,
         results=results,  # Already dicts from service
         offset=offset,
-        limit=limit
+        limit=limit,
+        next_cursor=next_cursor,
+        facets=service.search_facets('contracts', params) if facets else None
     )
 
 
@@ -123,6 +143,7 @@ def search_assets(
     is_expired: Optional[bool] = Query(None, description="Filter by expiration (false=active)"),
     limit: int = Query(50, le=100, description="Max results"),
     offset: int = Query(0, ge=0, description="Offset"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next_cursor"),
     db: Session = Depends(get_db),
     current_user = Depends(dependencies.get_current_user)
 ):
@@ -140,16 +161,21 @@ def search_assets(
         business_type=business_type,
         is_expired=is_expired,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor
     )
     
-    results, total = service.search_assets(db, params, current_user)
+    try:
+        results, total, next_cursor = service.search_assets(db, params, current_user)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
     
     return schemas.SearchResponse(
         total=total,
         results=results,  # Already dicts from service
         offset=offset,
-        limit=limit
+        limit=limit,
+        next_cursor=next_cursor
     )
 
 
@@ -160,8 +186,11 @@ def search_qualifications(
     status: Optional[str] = Query(None, description="Filter by status"),
     company_code: Optional[str] = Query(None, description="Filter by company code"),
     is_expired: Optional[bool] = Query(None, description="Filter by expiration (false=active)"),
+    expiring_within_days: Optional[int] = Query(None, ge=0, le=3650, description="Only qualifications expiring within N days"),
     limit: int = Query(50, le=100, description="Max results"),
     offset: int = Query(0, ge=0, description="Offset"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next_cursor"),
+    facets: bool = Query(False, description="Also return facet counts for the filter chips"),
     db: Session = Depends(get_db),
     current_user = Depends(dependencies.get_current_user)
 ):
@@ -177,17 +206,25 @@ def search_qualifications(
         status=status,
         company_code=company_code,
         is_expired=is_expired,
+        expiring_within_days=expiring_within_days,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor,
+        facets=facets
     )
     
-    results, total = service.search_qualifications(db, params, current_user)
+    try:
+        results, total, next_cursor = service.search_qualifications(db, params, current_user)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
     
     return schemas.SearchResponse(
         total=total,
         results=results, # Already dicts from service
         offset=offset,
-        limit=limit
+        limit=limit,
+        next_cursor=next_cursor,
+        facets=service.search_facets('qualifications', params) if facets else None
     )
 
 
@@ -198,8 +235,11 @@ def search_employees(
     company: Optional[str] = Query(None, description="Filter by company"),
     degree: Optional[str] = Query(None, description="Filter by degree level"),
     certificate_name: Optional[str] = Query(None, description="Filter by certificate name"),
+    certificate_expiring_within_days: Optional[int] = Query(None, ge=0, le=3650, description="Only employees holding a certificate expiring within N days"),
     limit: int = Query(50, le=100, description="Max results"),
     offset: int = Query(0, ge=0, description="Offset"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next_cursor"),
+    facets: bool = Query(False, description="Also return facet counts for the filter chips"),
     db: Session = Depends(get_db),
     current_user = Depends(dependencies.get_current_user)
 ):
@@ -216,17 +256,25 @@ def search_employees(
         company=company,
         degree=degree,
         certificate_name=certificate_name,
+        certificate_expiring_within_days=certificate_expiring_within_days,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor,
+        facets=facets
     )
     
-    results, total = service.search_employees(db, params, current_user)
+    try:
+        results, total, next_cursor = service.search_employees(db, params, current_user)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
     
     return schemas.SearchResponse(
         total=total,
         results=results,  # Already dicts from service
         offset=offset,
-        limit=limit
+        limit=limit,
+        next_cursor=next_cursor,
+        facets=service.search_facets('employees', params) if facets else None
     )
 
 
@@ -240,6 +288,7 @@ def search_companies(
     capital_max: Optional[float] = Query(None, description="Max registered capital"),
     limit: int = Query(20, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next_cursor"),
     current_user: auth_models.User = Depends(dependencies.get_current_user),
     db: Session = Depends(dependencies.get_db),
 ):
@@ -252,9 +301,13 @@ def search_companies(
         capital_min=capital_min,
         capital_max=capital_max,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor
     )
-    return service.search_companies(db, params, current_user)
+    try:
+        return service.search_companies(db, params, current_user)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
 @router.get("/companies/{company_id}")
@@ -290,6 +343,79 @@ def get_qualification(qual_id: int, db: Session = Depends(get_db)):
     return qual
 
 
+@router.get("/all", response_model=schemas.SearchAllResponse)
+def search_all(
+    q: str = Query(..., min_length=1, description="Search query"),
+    limit: int = Query(5, ge=1, le=20, description="Max results per entity"),
+    db: Session = Depends(get_db),
+    current_user = Depends(dependencies.get_current_user)
+):
+    """
+    Search contracts, assets, qualifications, employees and companies at once.
+
+    Returns the top `limit` results and the total per entity; each section's
+    next_cursor continues on that entity's own endpoint.
+    """
+    return service.search_all(db, q, limit, current_user)
+
+
+@router.get("/suggest", response_model=schemas.SuggestResponse)
+def suggest(
+    q: str = Query(..., min_length=1, max_length=100, description="Prefix typed so far"),
+    limit: int = Query(10, ge=1, le=20, description="Max suggestions"),
+    current_user: auth_models.User = Depends(dependencies.get_current_user)
+):
+    """
+    Type-ahead suggestions (customer/company/qualification names, contract titles
+    and frequent past queries) for a prefix, also matched by pinyin and initials.
+    """
+    contracts_db = ContractsSessionLocal()
+    try:
+        suggestions = suggestion_index.suggest(contracts_db, q, limit)
+    finally:
+        contracts_db.close()
+    return schemas.SuggestResponse(
+        q=q,
+        suggestions=[schemas.SuggestionRead(text=s.text, kind=s.kind) for s in suggestions]
+    )
+
+
+@router.get("/suggest/stats")
+def get_suggest_stats(
+    current_user: auth_models.User = Depends(dependencies.get_current_user)
+):
+    """Size, data version and age of the type-ahead index."""
+    return suggestion_index.stats()
+
+
+@router.get("/cache/stats")
+def get_search_cache_stats(
+    current_user: auth_models.User = Depends(dependencies.get_current_user)
+):
+    """Hit/miss counters of the server-side search result cache."""
+    return search_cache.stats()
+
+
+@router.get("/admin/metrics")
+def get_search_metrics(
+    slow_limit: int = Query(20, ge=0, le=100),
+    current_user: auth_models.User = Depends(dependencies.get_current_admin)
+):
+    """Rolling p50/p95/p99 latency per endpoint and the most recent slow queries (admin only)."""
+    return {
+        "endpoints": latency_recorder.snapshot(),
+        "slow_queries": list(slow_queries)[-slow_limit:][::-1] if slow_limit else [],
+    }
+
+
+@router.get("/history/stats")
+def get_search_history_stats(
+    current_user: auth_models.User = Depends(dependencies.get_current_user)
+):
+    """Counters of the buffered search-history writer (queued/written/dropped)."""
+    return history_writer.stats()
+
+
 @router.get("/history")
 def get_search_history(
     limit: int = Query(20, le=50),
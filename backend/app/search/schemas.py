@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from decimal import Decimal
 
 from pydantic import BaseModel, Field
@@ -58,6 +58,8 @@ class ContractSearchParams(BaseModel):
     # Pagination
     limit: int = Field(default=50, le=100, description="Max results")
     offset: int = Field(default=0, ge=0, description="Offset for pagination")
+    cursor: Optional[str] = Field(None, description="Opaque keyset cursor (next_cursor of the previous page); overrides offset")
+    facets: bool = Field(default=False, description="Also return facet counts for the filter chips")
 
 
 # Qualification Schemas
@@ -93,8 +95,11 @@ class QualificationSearchParams(BaseModel):
     status: Optional[str] = Field(None, description="Filter by status")
     company_code: Optional[str] = Field(None, description="Filter by company code")
     is_expired: Optional[bool] = Field(None, description="Filter by expiration status (False = Not Expired)")
+    expiring_within_days: Optional[int] = Field(None, ge=0, le=3650, description="Only qualifications expiring within N days from today")
     limit: int = Field(default=50, le=100, description="Max results")
     offset: int = Field(default=0, ge=0, description="Offset for pagination")
+    cursor: Optional[str] = Field(None, description="Opaque keyset cursor (next_cursor of the previous page); overrides offset")
+    facets: bool = Field(default=False, description="Also return facet counts for the filter chips")
 
 
 # Asset (Qualification & IP) Schemas
@@ -127,6 +132,13 @@ class AssetSearchParams(BaseModel):
     is_expired: Optional[bool] = Field(None, description="Filter by expiration status (False = Not Expired)")
     limit: int = Field(default=50, le=100, description="Max results")
     offset: int = Field(default=0, ge=0, description="Offset for pagination")
+    cursor: Optional[str] = Field(None, description="Opaque keyset cursor (next_cursor of the previous page); overrides offset")
+
+
+class FacetCount(BaseModel):
+    """Number of matching rows with one filter value."""
+    value: str
+    count: int
 
 
 class SearchResponse(BaseModel):
@@ -135,6 +147,35 @@ class SearchResponse(BaseModel):
     results: list = Field(..., description="Search results")
     offset: int = Field(..., description="Current offset")
     limit: int = Field(..., description="Current limit")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page (null on the last page)")
+    facets: Optional[Dict[str, List[FacetCount]]] = Field(None, description="Counts per filter value, when requested")
+
+
+class SearchAllSection(BaseModel):
+    """Top results of one entity in a cross-entity search."""
+    total: int
+    results: list
+    next_cursor: Optional[str] = Field(None, description="Continue on the entity's own endpoint with this cursor")
+    error: Optional[str] = Field(None, description="Set when this entity's search failed or timed out")
+
+
+class SearchAllResponse(BaseModel):
+    """Cross-entity search response (contracts, assets, qualifications, employees, companies)."""
+    q: str
+    limit: int
+    sections: Dict[str, SearchAllSection]
+
+
+class SuggestionRead(BaseModel):
+    """One type-ahead suggestion."""
+    text: str
+    kind: str = Field(..., description="customer, contract, company, qualification or history")
+
+
+class SuggestResponse(BaseModel):
+    """Type-ahead suggestions for a prefix."""
+    q: str
+    suggestions: List[SuggestionRead]
 
 
 # Employee Schemas
@@ -201,8 +242,11 @@ class EmployeeSearchParams(BaseModel):
     company: Optional[str] = Field(None, description="Filter by company")
     degree: Optional[str] = Field(None, description="Filter by degree level")
     certificate_name: Optional[str] = Field(None, description="Filter by certificate name")
+    certificate_expiring_within_days: Optional[int] = Field(None, ge=0, le=3650, description="Only employees holding a certificate expiring within N days")
     limit: int = Field(default=50, le=100, description="Max results")
     offset: int = Field(default=0, ge=0, description="Offset for pagination")
+    cursor: Optional[str] = Field(None, description="Opaque keyset cursor (next_cursor of the previous page); overrides offset")
+    facets: bool = Field(default=False, description="Also return facet counts for the filter chips")
 
 
 # Company Schemas
@@ -231,3 +275,4 @@ class CompanySearchParams(BaseModel):
     capital_max: Optional[float] = Field(None, description="Max registered capital")
     limit: int = Field(default=50, le=100)
     offset: int = Field(default=0, ge=0)
+    cursor: Optional[str] = Field(None, description="Opaque keyset cursor (next_cursor of the previous page); overrides offset")
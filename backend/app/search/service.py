@@ -1,36 +1,41 @@
 """Enhanced service layer for Simple Search feature."""
-from typing import Optional, List, Tuple, Any, Dict
+from typing import Optional, List, Tuple, Any, Dict, Iterator, Sequence
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func, select, case, desc
+from sqlalchemy import or_, and_, func, select, case, desc, literal_column, type_coerce, String
 import re
 import csv
+import logging
 import io
-from datetime import datetime, timezone
+import tempfile
+from datetime import date, datetime, timedelta, timezone
 import json
 from enum import Enum, unique
+from collections import defaultdict
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor, wait
 
 from backend.app.search import models, schemas
 from backend.app.search.contracts_models import ExistingContract
 from backend.app.search.assets_models import QualificationAsset, IntellectualPropertyAsset
 from backend.app.search.employee_models import Employee, EmployeeCertificate, EmployeeEducation
 from backend.app.search.company_models import Company
+from backend.app.core.config import settings
 from backend.app.core.database import ContractsSessionLocal
+from backend.app.core.metrics import count, span
+from backend.app.search import indexing
+from backend.app.search.cache import cached_facets, cached_page
+from backend.app.search.facets import CONTRACT_FACETS, EMPLOYEE_FACETS, QUALIFICATION_FACETS, facet_counts
+from backend.app.search.history import history_writer
+from backend.app.search.pagination import SortKey, after_clause, decode_cursor, encode_cursor, order_clauses
+from backend.app.search.names import match_names
+from backend.app.search.ranking import ranking_profile
+from backend.app.search.normalize import parse_date, normalize_contract, operating_state_code
 
 
-from backend.app.common.currency_service import convert_and_format
+from backend.app.common.currency_service import format_amount, format_amounts
 from backend.app.auth import models as auth_models
 
-def parse_amount_string(amount_str: str) -> Optional[float]:
-    """Parse amount string like '中国人民币 526,548.00' to float."""
-    if not amount_str:
-        return None
-    try:
-        # Remove currency prefix and commas
-        number_part = re.sub(r'[^\d.]', '', amount_str)
-        return float(number_part) if number_part else None
-    except:
-        return None
-
+logger = logging.getLogger(__name__)
 
 def extract_industry(customer_name: str) -> Optional[str]:
     """Extract industry from customer_name like '公司名 （ 行业分类 ）'."""
@@ -44,22 +49,12 @@ from backend.app.auth import models as auth_models
 import json
 
 def _log_search_history(db: Session, user_id: int, query: str, filters: dict) -> None:
-    try:
-        # Filter out None values and empty strings to save space
-        clean_filters = {k: v for k, v in filters.items() if v}
-        history = auth_models.SearchHistory(
-            user_id=user_id,
-            query=query,
-            filters=json.dumps(clean_filters, ensure_ascii=False),
-            search_time=datetime.now(timezone.utc)
-        )
-        db.add(history)
-        db.commit()
-    except Exception as e:
-        print(f"Failed to log search history: {e}")
+    # Buffered and written in batches off the request path (see search.history)
+    history_writer.enqueue(user_id, query, filters)
 
 def get_search_history(db: Session, user_id: int, limit: int = 20) -> List[dict]:
     """Get search history for user."""
+    history_writer.flush()  # include searches still waiting in the write buffer
     history = db.query(auth_models.SearchHistory)\
         .filter(auth_models.SearchHistory.user_id == user_id)\
         .order_by(auth_models.SearchHistory.search_time.desc())\
@@ -76,173 +71,255 @@ def get_search_history(db: Session, user_id: int, limit: int = 20) -> List[dict]
         for h in history
     ]
 
+def _contract_keyword_clause(keyword: str):
+    search_term = f"%{keyword}%"
+    return or_(
+        ExistingContract.title.like(search_term),              # 合同名称
+        ExistingContract.contract_number.like(search_term),    # 合同编号
+        ExistingContract.project_code.like(search_term),       # 项目编号
+        ExistingContract.customer_name.like(search_term),      # 客户名称
+        ExistingContract.description.like(search_term),        # 合同描述/概述
+        ExistingContract.tags.like(search_term),               # 合同标签
+        ExistingContract.industry.like(search_term)            # 行业
+    )
+
+
+def _apply_contract_keywords(contracts_db: Session, query, q: Optional[str]):
+    """
+    Restrict `query` to contracts matching every keyword in `q`, or whose
+    customer name matches `q` by pinyin / initials / within the typo bound.
+    Uses the FTS5 index when available; returns (query, rank) where rank is the
+    BM25 column (lower is better) or None when no index match was applied.
+    """
+    if not q:
+        return query, None
+
+    keywords = q.split()
+    matches = None
+    if indexing.has_contracts_fts(contracts_db):
+        indexed, keywords = indexing.split_keywords(keywords)
+        match = indexing.fts_match_expression(indexed)
+        if match:
+            weights = ranking_profile('contracts').column_weights(indexing.CONTRACTS_FTS_COLUMNS)
+            matches = indexing.contracts_fts_subquery(match, weights)
+
+    # Keywords too short for the trigram index (or no index built yet)
+    clauses = [_contract_keyword_clause(keyword) for keyword in keywords]
+    customers = match_names(contracts_db, 'contracts', ('customer_name',), q).get('customer_name')
+    if not customers:
+        if matches is None:
+            return query.where(*clauses), None
+        return query.join(matches, matches.c.contract_id == ExistingContract.id).where(*clauses), matches.c.rank
+
+    # Customer-name matches don't have to match the keywords (nor the FTS index)
+    rank = None
+    if matches is not None:
+        query = query.outerjoin(matches, matches.c.contract_id == ExistingContract.id)
+        clauses.append(matches.c.contract_id.isnot(None))
+        rank = func.coalesce(matches.c.rank, 0.0)
+    return query.where(or_(and_(*clauses), ExistingContract.customer_name.in_(customers))), rank
+
+
+def _name_filter(contracts_db: Session, column, value: str):
+    """LIKE filter on a name column that also accepts pinyin / initials / typo matches."""
+    aliases = match_names(contracts_db, column.table.name, (column.key,), value).get(column.key)
+    if aliases:
+        return or_(column.like(f"%{value}%"), column.in_(aliases))
+    return column.like(f"%{value}%")
+
+
+def _apply_contract_filters(contracts_db: Session, query, params: schemas.ContractSearchParams):
+    """Apply the non-keyword contract filters (all evaluated in SQL)."""
+    # Filter by customer
+    if params.customer:
+        query = query.where(_name_filter(contracts_db, ExistingContract.customer_name, params.customer))
+    
+    # Filter by status
+    if params.status:
+        query = query.where(ExistingContract.status.like(f"%{params.status}%"))
+        
+    # Filter by contract type (using tags or specific logic)
+    if params.contract_type:
+        query = query.where(ExistingContract.tags.like(f"%{params.contract_type}%"))
+        
+    # Filter by tags
+    if params.tags:
+        query = query.where(ExistingContract.tags.like(f"%{params.tags}%"))
+
+    # Filter by industry
+    if params.industry:
+        query = query.where(ExistingContract.industry.like(f"%{params.industry}%"))
+    
+    # Date range filter (on the normalized signing date)
+    if params.start_date:
+        query = query.where(_signed_date_bound(params.start_date, lower=True))
+    if params.end_date:
+        query = query.where(_signed_date_bound(params.end_date, lower=False))
+        
+    if params.is_fp:
+        # Strict FP: first tag must be '固定金额' (precomputed as contract_type_tag)
+        query = query.where(ExistingContract.contract_type_tag == '固定金额')
+
+    # Amount range on the precomputed CNY amount. Unparseable amounts are kept; amounts
+    # whose rate is not loaded yet are compared as written, like before normalization.
+    if params.min_amount or params.max_amount:
+        query = query.where(or_(
+            ExistingContract.amount_value.is_(None),
+            and_(*_amount_bounds(ExistingContract.amount_cny, params)),
+            and_(ExistingContract.amount_cny.is_(None), *_amount_bounds(ExistingContract.amount_value, params)),
+        ))
+    return query
+
+
+def _amount_bounds(column, params: schemas.ContractSearchParams) -> list:
+    clauses = []
+    if params.min_amount:
+        clauses.append(column >= params.min_amount)
+    if params.max_amount:
+        clauses.append(column <= params.max_amount)
+    return clauses
+
+
+def _signed_date_bound(value: str, lower: bool):
+    bound = parse_date(value)
+    if bound is None:
+        # Not a recognizable date; compare against the raw text as before
+        return ExistingContract.signed_at >= value if lower else ExistingContract.signed_at <= value
+    bound = date.fromisoformat(bound)
+    return ExistingContract.signed_date >= bound if lower else ExistingContract.signed_date <= bound
+
+
+def _contract_derived(contract: ExistingContract) -> dict:
+    """Derived values for a contract: precomputed columns, or computed now if still pending."""
+    if contract.normalized_at is None:
+        return normalize_contract(contract.contract_amount, contract.tags, contract.signed_at, contract.raw_payload)
+    return {
+        'amount_value': contract.amount_value,
+        'currency_code': contract.currency_code,
+        'amount_cny': contract.amount_cny,
+        'contract_type_tag': contract.contract_type_tag,
+        'signed_date': contract.signed_date,
+        'delivery_location': contract.delivery_location,
+        'delivery_team': contract.delivery_team,
+    }
+
+
+def _rows_by_ids(contracts_db: Session, model, ids: List[int]) -> list:
+    """Load rows of `model` by primary key, returned in the order of `ids`."""
+    if not ids:
+        return []
+    rows = {row.id: row for row in contracts_db.execute(select(model).where(model.id.in_(ids))).scalars()}
+    return [rows[i] for i in ids if i in rows]
+
+
+def _search_page(
+    contracts_db: Session,
+    entity: str,
+    params,
+    query,
+    model,
+    sort_keys: List[SortKey],
+) -> Tuple[list, int, Optional[str]]:
+    """
+    One page of `query` in `sort_keys` order (primary key last), plus the total
+    and the cursor of the next page (None on the last page).
+
+    params.cursor (keyset) takes precedence over params.offset; pages are served
+    from the search result cache when possible.
+    """
+    after = decode_cursor(params.cursor, len(sort_keys)) if params.cursor else None
+    key_query = query.with_only_columns(*(expr for expr, _ in sort_keys)).order_by(*order_clauses(sort_keys))
+
+    def load_rows(offset: int, after: Optional[Sequence[Any]], limit: Optional[int]) -> List[tuple]:
+        if after is None:
+            rows_query = key_query.offset(offset)
+        else:
+            rows_query = key_query.where(after_clause(sort_keys, after))
+        if limit is not None:
+            rows_query = rows_query.limit(limit)
+        rows = [tuple(row) for row in contracts_db.execute(rows_query)]
+        count("rows_fetched", len(rows))
+        return rows
+
+    def count_rows() -> int:
+        return contracts_db.execute(select(func.count()).select_from(query.subquery())).scalar() or 0
+
+    with span("keys"):
+        rows, total, has_more = cached_page(contracts_db, entity, params, after, load_rows, count_rows)
+    next_cursor = encode_cursor(rows[-1]) if has_more and rows else None
+    with span("hydrate"):
+        results = _rows_by_ids(contracts_db, model, [row[-1] for row in rows])
+    count("rows_returned", len(results))
+    return results, total, next_cursor
+
+
+def _contract_sort_keys(q: Optional[str], rank) -> List[SortKey]:
+    """Relevance + time ordering shared by contract search and export."""
+    # Priority: exact title > title prefix > title contains > customer match (see search.ranking)
+    sort_keys = ranking_profile('contracts').sort_keys(ExistingContract, q)
+    if rank is not None:
+        sort_keys.append((rank, False))
+    sort_keys += [(type_coerce(ExistingContract.signed_date, String), True), (ExistingContract.id, False)]
+    return sort_keys
+
+
 def search_contracts(
     db: Session,
     params: schemas.ContractSearchParams,
     current_user: Optional[auth_models.User] = None
-) -> Tuple[List[dict], int]:
+) -> Tuple[List[dict], int, Optional[str]]:
     """
     Enhanced contract search from existing contracts.db with fuzzy matching, filters, and relevance sorting.
     """
     if current_user:
-        _log_search_history(db, current_user.id, params.q, params.dict(exclude={'q', 'limit', 'offset'}))
+        _log_search_history(db, current_user.id, params.q, params.dict(exclude={'q', 'limit', 'offset', 'cursor', 'facets'}))
 
     contracts_db = ContractsSessionLocal()
     
     try:
-        query = select(ExistingContract)
-        
-        # Enhanced fuzzy search on multiple fields with keyword splitting
-        if params.q:
-            keywords = params.q.split()
-            for keyword in keywords:
-                search_term = f"%{keyword}%"
-                query = query.where(
-                    or_(
-                        ExistingContract.title.like(search_term),              # 合同名称
-                        ExistingContract.contract_number.like(search_term),    # 合同编号
-                        ExistingContract.project_code.like(search_term),       # 项目编号
-                        ExistingContract.customer_name.like(search_term),      # 客户名称
-                        ExistingContract.description.like(search_term),        # 合同描述/概述
-                        ExistingContract.tags.like(search_term),               # 合同标签
-                        ExistingContract.industry.like(search_term)            # 行业
-                    )
-                )
-        
-        # Filter by customer
-        if params.customer:
-            query = query.where(ExistingContract.customer_name.like(f"%{params.customer}%"))
-        
-        # Filter by status
-        if params.status:
-            query = query.where(ExistingContract.status.like(f"%{params.status}%"))
-            
-        # Filter by contract type (using tags or specific logic)
-        if params.contract_type:
-            query = query.where(ExistingContract.tags.like(f"%{params.contract_type}%"))
-            
-        # Filter by tags
-        if params.tags:
-            query = query.where(ExistingContract.tags.like(f"%{params.tags}%"))
-
-        # Filter by industry
-        if params.industry:
-            query = query.where(ExistingContract.industry.like(f"%{params.industry}%"))
-        
-        # Date range filter
-        if params.start_date:
-            query = query.where(ExistingContract.signed_at >= params.start_date)
-        if params.end_date:
-            query = query.where(ExistingContract.signed_at <= params.end_date)
-            
-        if params.is_fp:
-            # Strictly filter by tags for '固定金额' (FP)
-            # Since 'contract_type' column doesn't exist, we assume FP is indicated by strict tag matching
-            query = query.where(ExistingContract.tags.like('%固定金额%'))
-
-        # Execute query
-        all_results = contracts_db.execute(query).scalars().all()
-        
-        # Post-processing for Strict FP (First Tag must be '固定金额')
-        if params.is_fp:
-            strict_fp_results = []
-            for contract in all_results:
-                if contract.tags:
-                    # Robust splitting
-                    clean_tags = contract.tags.replace('，', ',')
-                    tags_list = [t.strip() for t in re.split(r'[,，\s]+', clean_tags) if t.strip()]
-                    if tags_list and tags_list[0] == '固定金额':
-                        strict_fp_results.append(contract)
-            all_results = strict_fp_results
-        
-        filtered_results = all_results
-        
-
-        if params.min_amount is not None or params.max_amount is not None:
-            filtered = []
-            for contract in all_results:
-                amount = parse_amount_string(contract.contract_amount)
-                if amount is not None:
-                    if params.min_amount and amount < params.min_amount:
-                        continue
-                    if params.max_amount and amount > params.max_amount:
-                        continue
-                filtered.append(contract)
-            all_results = filtered
-        
-        total = len(all_results)
+        # Enhanced fuzzy search on multiple fields with keyword splitting (FTS5 MATCH + BM25)
+        query, rank = _apply_contract_keywords(contracts_db, select(ExistingContract), params.q)
+        query = _apply_contract_filters(contracts_db, query, params)
         
         # Relevance + Time Sorting
-        if params.q:
-            query_lower = params.q.lower()
-            def sort_key(contract):
-                title_lower = (contract.title or '').lower()
-                # Priority: exact match > starts with > contains
-                if query_lower == title_lower:
-                    relevance = 1
-                elif title_lower.startswith(query_lower):
-                    relevance = 2
-                elif query_lower in title_lower:
-                    relevance = 3
-                elif query_lower in (contract.customer_name or '').lower():
-                    relevance = 4
-                else:
-                    relevance = 5
-                return relevance
-            
-            # Sort: Relevance ASC, then Date DESC
-            all_results.sort(key=lambda x: str(x.signed_at) if x.signed_at else '0000', reverse=True)
-            all_results.sort(key=lambda x: sort_key(x), reverse=False)
-        else:
-            # No query: just sort by date descending
-            all_results.sort(key=lambda x: str(x.signed_at) if x.signed_at else '0000', reverse=True)
+        sort_keys = _contract_sort_keys(params.q, rank)
         
-        # Pagination
-        paginated = all_results[params.offset:params.offset + params.limit]
+        # Ordered page (cached per query, keyset when a cursor is given), then load just that page
+        paginated, total, next_cursor = _search_page(
+            contracts_db, 'contracts', params, query, ExistingContract, sort_keys
+        )
         
-        # Convert to dicts for API response
-        contracts_list = []
-        for contract in paginated:
-            contract_type = None
-            if contract.tags:
-                tags_list = [t.strip() for t in re.split(r'[,，\s]+', contract.tags) if t.strip()]
-                if tags_list:
-                    contract_type = tags_list[0]
-            
-            amount_raw = parse_amount_string(contract.contract_amount)
-            
-            # Safe parsing of raw_payload (stored as JSON string)
-            payload = {}
-            if contract.raw_payload:
-                if isinstance(contract.raw_payload, dict):
-                    payload = contract.raw_payload
-                else:
-                    try:
-                        payload = json.loads(contract.raw_payload)
-                    except:
-                        payload = {}
-            
-            contracts_list.append({
-                'id': contract.id,
-                'contract_title': contract.title,
-                'contract_number': contract.contract_number,
-                'customer_name': contract.customer_name,
-                'contract_amount': convert_and_format(contract.contract_amount),
-                'contract_amount_raw': amount_raw,
-                'signing_date': contract.signed_at,
-                'contract_type': contract_type,
-                'contract_status': contract.status,
-                'project_code': contract.project_code,
-                'description': contract.description,
-                'tags': contract.tags,
-                'industry': contract.industry,
-                'delivery_location': payload.get('delivery_location'),
-                'delivery_team': payload.get('delivery_team'),
-                'created_at': contract.created_at,
-                'updated_at': contract.updated_at
-            })
+        with span("format"):
+            # Convert to dicts for API response (amounts converted/formatted as one column)
+            derived_rows = [_contract_derived(contract) for contract in paginated]
+            amounts = format_amounts(
+                [derived['amount_value'] for derived in derived_rows],
+                [derived['currency_code'] for derived in derived_rows],
+                [contract.contract_amount for contract in paginated],
+            )
+            contracts_list = []
+            for contract, derived, amount in zip(paginated, derived_rows, amounts):
+                contracts_list.append({
+                    'id': contract.id,
+                    'contract_title': contract.title,
+                    'contract_number': contract.contract_number,
+                    'customer_name': contract.customer_name,
+                    'contract_amount': amount.formatted,
+                    'contract_amount_raw': amount.amount,
+                    'signing_date': contract.signed_at,
+                    'contract_type': derived['contract_type_tag'],
+                    'contract_status': contract.status,
+                    'project_code': contract.project_code,
+                    'description': contract.description,
+                    'tags': contract.tags,
+                    'industry': contract.industry,
+                    'delivery_location': derived['delivery_location'],
+                    'delivery_team': derived['delivery_team'],
+                    'created_at': contract.created_at,
+                    'updated_at': contract.updated_at
+                })
         
-        return contracts_list, total
+        return contracts_list, total or 0, next_cursor
         
     finally:
         contracts_db.close()
@@ -252,14 +329,14 @@ def search_assets(
     db: Session,  # Not used, kept for consistency
     params: schemas.AssetSearchParams,
     current_user: Optional[auth_models.User] = None
-) -> Tuple[List[dict], int]:
+) -> Tuple[List[dict], int, Optional[str]]:
     """
     Search assets (Intellectual Property) from contracts.db.
     Note: This now specifically targets IntellectualPropertyAsset for the 'assets' endpoint (IP tab).
     """
 
     if current_user:
-        filters_dict = params.dict(exclude={'q', 'limit', 'offset'})
+        filters_dict = params.dict(exclude={'q', 'limit', 'offset', 'cursor', 'facets'})
         filters_dict['type'] = 'intellectual_property'
         _log_search_history(db, current_user.id, params.q, filters_dict)
 
@@ -289,16 +366,16 @@ def search_assets(
         if params.company_code:
             query = query.where(IntellectualPropertyAsset.company_code == params.company_code)
             
-        # Filter (Not) Expired
+        # Filter (Not) Expired, on the normalized ISO issue date
         if params.is_expired is not None:
-            today = datetime.now().strftime('%Y-%m-%d')
+            today = date.today().isoformat()
             if params.is_expired: # True = Only Expired
-                query = query.where(IntellectualPropertyAsset.issue_date < today) # Note: IP usually uses issue_date or specific expire logic? Assuming issue_date for simplicity or skip if not applicable for IP
+                query = query.where(IntellectualPropertyAsset.issue_date_iso < today) # Note: IP usually uses issue_date or specific expire logic? Assuming issue_date for simplicity or skip if not applicable for IP
             else: # False = Not Expired
                  query = query.where(
                     or_(
-                        IntellectualPropertyAsset.issue_date >= today,
-                        IntellectualPropertyAsset.issue_date == None
+                        IntellectualPropertyAsset.issue_date_iso >= today,
+                        IntellectualPropertyAsset.issue_date_iso == None
                     )
                 )
 
@@ -320,181 +397,181 @@ def search_assets(
                 )
             )
         
-        # Get total count
-        count_query = select(func.count()).select_from(query.subquery())
-        total = contracts_db.execute(count_query).scalar()
-        
-        # Sort by issue_date
-        query = query.order_by(IntellectualPropertyAsset.issue_date.desc().nullslast())
-        
-        # Pagination
-        query = query.offset(params.offset).limit(params.limit)
-        
-        results = contracts_db.execute(query).scalars().all()
+        # Sort by relevance, then issue_date (page served from the result cache / keyset cursor)
+        results, total, next_cursor = _search_page(
+            contracts_db, 'assets', params, query, IntellectualPropertyAsset,
+            ranking_profile('assets').sort_keys(IntellectualPropertyAsset, params.q)
+            + [(IntellectualPropertyAsset.issue_date_iso, True), (IntellectualPropertyAsset.id, False)]
+        )
         
-        # Convert to dicts
-        assets_list = []
-        for asset in results:
-            assets_list.append({
-                'id': asset.id,
-                'category': 'intellectual_property',
-                'company_name': asset.company_name,
-                'company_code': asset.company_code,
-                'business_type': asset.business_type,
-                'qualification_name': asset.knowledge_name, # Map knowledge_name to qualification_name for schema compatibility
-                'qualification_level': None,
-                'certificate_number': asset.certificate_number,
+        with span("format"):
+            # Convert to dicts
+            assets_list = []
+            for asset in results:
+                assets_list.append({
+                    'id': asset.id,
+                    'category': 'intellectual_property',
+                    'company_name': asset.company_name,
+                    'company_code': asset.company_code,
+                    'business_type': asset.business_type,
+                    'qualification_name': asset.knowledge_name, # Map knowledge_name to qualification_name for schema compatibility
+                    'qualification_level': None,
+                    'certificate_number': asset.certificate_number,
                 
-                # Full Mapping for Detail Popup
-                'patent_category': asset.patent_category,
-                'knowledge_category': asset.knowledge_category,
-                'inventor': asset.inventor,
-                'issue_date': asset.issue_date,
-                'application_date': asset.application_date,
-                'registration_no': asset.registration_no,
-                'internal_id': asset.internal_id,
-                'property_summary': asset.property_summary,
+                    # Full Mapping for Detail Popup
+                    'patent_category': asset.patent_category,
+                    'knowledge_category': asset.knowledge_category,
+                    'inventor': asset.inventor,
+                    'issue_date': asset.issue_date,
+                    'application_date': asset.application_date,
+                    'registration_no': asset.registration_no,
+                    'internal_id': asset.internal_id,
+                    'property_summary': asset.property_summary,
                 
-                'expire_date': None,
-                'next_review_date': None,
-                'download_url': asset.download_url,
-                'collected_at': asset.created_at, # Use created_at as collected_at
-                'created_at': asset.created_at,
-                'updated_at': asset.updated_at
-            })
+                    'expire_date': None,
+                    'next_review_date': None,
+                    'download_url': asset.download_url,
+                    'collected_at': asset.created_at, # Use created_at as collected_at
+                    'created_at': asset.created_at,
+                    'updated_at': asset.updated_at
+                })
         
-        return assets_list, total or 0
+        return assets_list, total or 0, next_cursor
         
     finally:
         contracts_db.close()
 
 
+def _qualification_query(params: schemas.QualificationSearchParams):
+    """Qualifications matching the search query and filters (unordered)."""
+    query = select(QualificationAsset)
+
+    # Fuzzy search
+    if params.q:
+        search_term = f"%{params.q}%"
+        query = query.where(
+            or_(
+                QualificationAsset.qualification_name.like(search_term),
+                QualificationAsset.company_name.like(search_term),
+                QualificationAsset.certificate_number.like(search_term)
+            )
+        )
+
+    # Filters
+    if params.qualification_type:
+         query = query.where(QualificationAsset.qualification_name.like(f"%{params.qualification_type}%"))
+
+    if params.company_code:
+        query = query.where(QualificationAsset.company_code == params.company_code)
+
+    if params.status:
+        query = query.where(QualificationAsset.status == params.status)
+
+    # Expiry on the normalized ISO date (ix_qualification_assets_expire_date_iso);
+    # NULL means no end date ('长期', missing or unparseable)
+    today = date.today()
+    if params.is_expired is not None:
+        if params.is_expired: # Expired: date < today
+            query = query.where(QualificationAsset.expire_date_iso < today.isoformat())
+        else: # Not Expired: date >= today OR no end date
+            query = query.where(
+                or_(
+                    QualificationAsset.expire_date_iso >= today.isoformat(),
+                    QualificationAsset.expire_date_iso.is_(None)
+                )
+            )
+
+    if params.expiring_within_days is not None:
+        horizon = today + timedelta(days=params.expiring_within_days)
+        query = query.where(QualificationAsset.expire_date_iso.between(today.isoformat(), horizon.isoformat()))
+    return query
+
+
 def search_qualifications(
     db: Session,
     params: schemas.QualificationSearchParams,
     current_user: Optional[auth_models.User] = None
-) -> Tuple[List[dict], int]:
+) -> Tuple[List[dict], int, Optional[str]]:
     """
     Search qualifications from contracts.db (QualificationAsset).
     """
     if current_user:
-        filters_dict = params.dict(exclude={'q', 'limit', 'offset'})
+        filters_dict = params.dict(exclude={'q', 'limit', 'offset', 'cursor', 'facets'})
         filters_dict['type'] = 'qualification'
         _log_search_history(db, current_user.id, params.q, filters_dict)
         
     contracts_db = ContractsSessionLocal()
     try:
-        query = select(QualificationAsset)
-        
-        # Fuzzy search
-        if params.q:
-            search_term = f"%{params.q}%"
-            query = query.where(
-                or_(
-                    QualificationAsset.qualification_name.like(search_term),
-                    QualificationAsset.company_name.like(search_term),
-                    QualificationAsset.certificate_number.like(search_term)
-                )
-            )
-        
-        # Filters
-        if params.qualification_type:
-             query = query.where(QualificationAsset.qualification_name.like(f"%{params.qualification_type}%"))
-        
-        if params.company_code:
-            query = query.where(QualificationAsset.company_code == params.company_code)
-            
-        if params.status:
-            query = query.where(QualificationAsset.status == params.status)
-            
-        if params.is_expired is not None:
-            today = datetime.now().strftime('%Y-%m-%d')
-            # Handle date format inconsistencies (e.g. 2023/01/01 vs 2023-01-01) by string replacement in SQL? 
-            # SQLite string comparison works lexicographically. 
-            # We assume format is 'YYYY-MM-DD' or 'YYYY/MM/DD'.
-            # A safe way is to assume ISO format in DB. If not, this needs DB migration. 
-            # Assuming DB has YYYY-MM-DD or YYYY.MM.DD
-            
-            # Simple Strict Logic:
-            if params.is_expired: # Expired: date < today
-                query = query.where(and_(
-                    QualificationAsset.expire_date != None, 
-                    QualificationAsset.expire_date < today
-                ))
-            else: # Not Expired: date >= today OR date is None
-                query = query.where(
-                    or_(
-                        QualificationAsset.expire_date >= today,
-                        QualificationAsset.expire_date == None
-                    )
-                )
+        query = _qualification_query(params)
 
-        # Execute query first
-        results = contracts_db.execute(query).scalars().all()
-        
-        # Post-Processing Sorting
-        def qual_sort_key(q):
-            relevance = 5
-            if params.q:
-                query_lower = params.q.lower()
-                name_lower = (q.qualification_name or '').lower()
-                if query_lower == name_lower:
-                    relevance = 1
-                elif name_lower.startswith(query_lower):
-                    relevance = 2
-                elif query_lower in name_lower:
-                    relevance = 3
-                elif query_lower in (q.company_name or '').lower():
-                    relevance = 4
-            return relevance
-
-        # Sort Logic
+        # Sort Logic (in SQL so pages can use a keyset cursor)
         # 1. Relevance (if q)
         # 2. Special Rule: If company_code == '1100', '客户代理认证证书' goes to bottom
-        # 3. Expire Date (ASC)
-        
-        results.sort(key=lambda x: str(x.expire_date) if x.expire_date else '99999')
-        
+        # 3. Expire Date (ASC, no end date last; ix_qualification_assets_expire_order)
+        sort_keys = ranking_profile('qualifications').sort_keys(QualificationAsset, params.q)
         if params.company_code == '1100':
-             # False (0) comes before True (1). We want "Agent Cert" (True) at END.
-             results.sort(key=lambda x: 1 if "客户代理认证证书" in (x.qualification_name or "") else 0)
-
-        if params.q:
-            results.sort(key=lambda x: qual_sort_key(x))
-            
-        total = len(results)
+            sort_keys.append((case((QualificationAsset.qualification_name.contains("客户代理认证证书"), 1), else_=0), False))
+        sort_keys += [
+            (func.coalesce(QualificationAsset.expire_date_iso, literal_column(f"'{indexing.NO_EXPIRY_SORT_KEY}'")), False),
+            (QualificationAsset.id, False),
+        ]
         
         # Pagination
-        paginated = results[params.offset : params.offset + params.limit]
+        paginated, total, next_cursor = _search_page(
+            contracts_db, 'qualifications', params, query, QualificationAsset, sort_keys
+        )
         
-        # Map to schema
-        qual_list = []
-        for q in paginated:
-            qual_list.append({
-                'id': q.id,
-                'qualification_name': q.qualification_name,
-                'qualification_type': q.business_type, 
-                'qualification_level': q.qualification_level,
-                'company_name': q.company_name,
-                'company_code': q.company_code,
-                'certificate_number': q.certificate_number,
-                'issue_organization': q.issuer,
+        with span("format"):
+            # Map to schema
+            qual_list = []
+            for q in paginated:
+                qual_list.append({
+                    'id': q.id,
+                    'qualification_name': q.qualification_name,
+                    'qualification_type': q.business_type, 
+                    'qualification_level': q.qualification_level,
+                    'company_name': q.company_name,
+                    'company_code': q.company_code,
+                    'certificate_number': q.certificate_number,
+                    'issue_organization': q.issuer,
                 
-                # Full Mapping for Detail Popup
-                'issue_date': q.issue_date, 
-                'expire_date': q.expire_date,
-                'start_date': q.issue_date,
-                'registration_no': q.registration_no,
-                'next_review_date': q.next_review_date,
-                'remark': q.remark,
+                    # Full Mapping for Detail Popup
+                    'issue_date': q.issue_date, 
+                    'expire_date': q.expire_date,
+                    'start_date': q.issue_date,
+                    'registration_no': q.registration_no,
+                    'next_review_date': q.next_review_date,
+                    'remark': q.remark,
                 
-                'scope': None,
-                'status': q.status or 'valid',
-                'created_at': q.created_at,
-                'updated_at': q.updated_at
-            })
+                    'scope': None,
+                    'status': q.status or 'valid',
+                    'created_at': q.created_at,
+                    'updated_at': q.updated_at
+                })
             
-        return qual_list, total or 0
+        return qual_list, total or 0, next_cursor
+    finally:
+        contracts_db.close()
+
+
+def search_facets(entity: str, params) -> Dict[str, List[dict]]:
+    """
+    Facet counts over everything matching a contracts / qualifications /
+    employees search (same query and filters as the search itself).
+    """
+    contracts_db = ContractsSessionLocal()
+    try:
+        if entity == 'contracts':
+            query, _ = _apply_contract_keywords(contracts_db, select(ExistingContract), params.q)
+            query, facets = _apply_contract_filters(contracts_db, query, params), CONTRACT_FACETS
+        elif entity == 'qualifications':
+            query, facets = _qualification_query(params), QUALIFICATION_FACETS
+        elif entity == 'employees':
+            query, facets = select(Employee).where(*_employee_conditions(contracts_db, params)), EMPLOYEE_FACETS
+        else:
+            raise ValueError(f"No facets for {entity!r}")
+        with span("facets"):
+            return cached_facets(contracts_db, entity, params, lambda: facet_counts(contracts_db, query, facets))
     finally:
         contracts_db.close()
 
@@ -507,36 +584,19 @@ def get_contract_by_id(db: Session, contract_id: int) -> Optional[dict]:
         if not contract:
             return None
         
-        amount_raw = parse_amount_string(contract.contract_amount)
-        contract_type = None
-        if contract.tags:
-            tags_list = [t.strip() for t in re.split(r'[,，\s]+', contract.tags) if t.strip()]
-            if tags_list:
-                contract_type = tags_list[0]
-
-        # Safe parsing of raw_payload (stored as JSON string)
-        payload = {}
-        if contract.raw_payload:
-            if isinstance(contract.raw_payload, dict):
-                payload = contract.raw_payload
-            else:
-                try:
-                    payload = json.loads(contract.raw_payload)
-                except:
-                    payload = {}
-
+        derived = _contract_derived(contract)
         return {
             'id': contract.id,
             'project_name': contract.title,
             'contract_number': contract.contract_number,
             'client_name': contract.customer_name,
-            'contract_amount': convert_and_format(contract.contract_amount), # Schema expects Decimal/float? No, schema says Decimal, but we can pass float/str usually
+            'contract_amount': format_amount(derived['amount_value'], derived['currency_code'], contract.contract_amount), # Schema expects Decimal/float? No, schema says Decimal, but we can pass float/str usually
             'signing_date': contract.signed_at,
             'project_description': contract.description,
             'status': contract.status or 'active',
-            'contract_type': contract_type,
-            'delivery_location': payload.get('delivery_location'),
-            'delivery_team': payload.get('delivery_team'),
+            'contract_type': derived['contract_type_tag'],
+            'delivery_location': derived['delivery_location'],
+            'delivery_team': derived['delivery_team'],
             'created_at': contract.created_at,
             'updated_at': contract.updated_at
         }
@@ -566,16 +626,137 @@ def get_qualification_by_id(db: Session, qual_id: int) -> Optional[dict]:
         contracts_db.close()
 
 
+def _dedupe_certificates(certificates: List[EmployeeCertificate]) -> List[EmployeeCertificate]:
+    """Remove duplicate certificates by name, keeping the one with the latest expire_date (or none)."""
+    unique_certs_map = {}
+    for cert in certificates:
+        name = cert.certificate_name
+        expire_date = cert.expire_date_iso or cert.expire_date
+        # If we've seen this cert name before
+        if name in unique_certs_map:
+            existing = unique_certs_map[name]
+            # If existing has expire date and new doesn't, keep existing.
+            # If new has expire date and existing doesn't, keep new.
+            # If both have dates, keep later one.
+            # If neither, keep the first one.
+            existing_expire_date = existing.expire_date_iso or existing.expire_date
+            if expire_date and not existing_expire_date:
+                unique_certs_map[name] = cert
+            elif expire_date and existing_expire_date:
+                if expire_date > existing_expire_date:
+                    unique_certs_map[name] = cert
+        else:
+            unique_certs_map[name] = cert
+    return list(unique_certs_map.values())
+
+
+def _load_employee_children(
+    contracts_db: Session,
+    employee_ids: List[int]
+) -> Tuple[Dict[int, List[EmployeeEducation]], Dict[int, List[EmployeeCertificate]]]:
+    """Batch-load educations and (deduplicated) certificates for a page of employees."""
+    educations: Dict[int, List[EmployeeEducation]] = defaultdict(list)
+    certificates: Dict[int, List[EmployeeCertificate]] = defaultdict(list)
+    if not employee_ids:
+        return educations, certificates
+
+    for edu in contracts_db.execute(
+        select(EmployeeEducation)
+        .where(EmployeeEducation.employee_id.in_(employee_ids))
+        .order_by(EmployeeEducation.id)
+    ).scalars():
+        educations[edu.employee_id].append(edu)
+
+    for cert in contracts_db.execute(
+        select(EmployeeCertificate)
+        .where(EmployeeCertificate.employee_id.in_(employee_ids))
+        .order_by(EmployeeCertificate.id)
+    ).scalars():
+        certificates[cert.employee_id].append(cert)
+
+    deduped = {emp_id: _dedupe_certificates(certs) for emp_id, certs in certificates.items()}
+    return educations, deduped
+
+
+def _employee_conditions(contracts_db: Session, params: schemas.EmployeeSearchParams) -> list:
+    """WHERE conditions on Employee for the search query and filters."""
+    conditions = []
+
+    # Fuzzy search on multiple fields; school/major/certificate names are
+    # denormalized into Employee.search_text so no child join is needed
+    if params.q:
+        search_term = f"%{params.q}%"
+        q_clauses = [
+            Employee.name.like(search_term),
+            Employee.employee_no.like(search_term),
+            Employee.company.like(search_term),
+            Employee.search_text.like(search_term)
+        ]
+        # Pinyin / initials / typo matches on employee and certificate names
+        names = match_names(contracts_db, 'employees', ('name',), params.q).get('name')
+        if names:
+            q_clauses.append(Employee.name.in_(names))
+        certificate_names = match_names(
+            contracts_db, 'employee_certificates', ('certificate_name',), params.q
+        ).get('certificate_name')
+        if certificate_names:
+            q_clauses.append(
+                select(EmployeeCertificate.id).where(
+                    EmployeeCertificate.employee_id == Employee.id,
+                    EmployeeCertificate.certificate_name.in_(certificate_names)
+                ).exists()
+            )
+        conditions.append(or_(*q_clauses))
+
+    # Filter by status
+    if params.status:
+        conditions.append(Employee.status.like(f"%{params.status}%"))
+
+    # Filter by company
+    if params.company:
+        conditions.append(Employee.company.like(f"%{params.company}%"))
+
+    # Filter by degree
+    if params.degree:
+        conditions.append(
+            select(EmployeeEducation.id).where(
+                EmployeeEducation.employee_id == Employee.id,
+                EmployeeEducation.degree.like(f"%{params.degree}%")
+            ).exists()
+        )
+
+    # Filter by certificate
+    if params.certificate_name:
+        conditions.append(
+            select(EmployeeCertificate.id).where(
+                EmployeeCertificate.employee_id == Employee.id,
+                _name_filter(contracts_db, EmployeeCertificate.certificate_name, params.certificate_name)
+            ).exists()
+        )
+
+    # Holds a certificate expiring within N days (ix_employee_certificates_expire_date_iso)
+    if params.certificate_expiring_within_days is not None:
+        today = date.today()
+        horizon = today + timedelta(days=params.certificate_expiring_within_days)
+        conditions.append(
+            select(EmployeeCertificate.id).where(
+                EmployeeCertificate.employee_id == Employee.id,
+                EmployeeCertificate.expire_date_iso.between(today.isoformat(), horizon.isoformat())
+            ).exists()
+        )
+    return conditions
+
+
 def search_employees(
     db: Session,  # Not used for employees, kept for API consistency
     params: schemas.EmployeeSearchParams,
     current_user: Optional[auth_models.User] = None
-) -> Tuple[List[dict], int]:
+) -> Tuple[List[dict], int, Optional[str]]:
     """
     Search employees from contracts.db with fuzzy matching and filters.
     """
     if current_user:
-        filters_dict = params.dict(exclude={'q', 'limit', 'offset'})
+        filters_dict = params.dict(exclude={'q', 'limit', 'offset', 'cursor', 'facets'})
         filters_dict['type'] = 'employee'
         _log_search_history(db, current_user.id, params.q, filters_dict)
 
@@ -584,243 +765,175 @@ def search_employees(
     contracts_db = ContractsSessionLocal()
     
     try:
-        query = select(Employee)
-        
-        # Fuzzy search on multiple fields
-        if params.q:
-            search_term = f"%{params.q}%"
-            # Join both Educations and Certificates for search
-            # Use outer join to include employees without edu/cert records if name matches
-            query = query.outerjoin(Employee.educations).outerjoin(Employee.certificates).where(
-                or_(
-                    Employee.name.like(search_term),
-                    Employee.employee_no.like(search_term),
-                    EmployeeEducation.school.like(search_term),
-                    EmployeeEducation.major.like(search_term),
-                    Employee.company.like(search_term),
-                    EmployeeCertificate.certificate_name.like(search_term)
-                )
-            ).distinct()
-        
-        # Filter by status
-        if params.status:
-            query = query.where(Employee.status.like(f"%{params.status}%"))
-        
-        # Filter by company
-        if params.company:
-            query = query.where(Employee.company.like(f"%{params.company}%"))
-        
-        # Filter by degree (requires join)
-        if params.degree:
-            query = query.join(Employee.educations).where(EmployeeEducation.degree.like(f"%{params.degree}%"))
-        
-        # Filter by certificate (requires join to certificates table)
-        if params.certificate_name:
-            query = query.join(Employee.certificates).where(
-                EmployeeCertificate.certificate_name.like(f"%{params.certificate_name}%")
-            )
-        
-        # Get total count
-        count_query = select(func.count()).select_from(query.subquery())
-        total = contracts_db.execute(count_query).scalar()
-        
-        # Sort by Certificate Count DESC, then Employee No ASC
-        # Left Outer Join and Group By to count certificates
-        query = query.outerjoin(Employee.certificates).group_by(Employee.id).order_by(
-            func.count(EmployeeCertificate.id).desc(),
-            Employee.employee_no.asc()
+        conditions = _employee_conditions(contracts_db, params)
+
+        # Sort by relevance (name matches first), then Certificate Count DESC, then
+        # Employee No ASC (ix_employees_certificate_order)
+        results, total, next_cursor = _search_page(
+            contracts_db, 'employees', params, select(Employee).where(*conditions), Employee,
+            ranking_profile('employees').sort_keys(Employee, params.q)
+            + [(Employee.certificate_count, True), (Employee.employee_no, False), (Employee.id, False)]
         )
         
-        # Pagination
-        query = query.offset(params.offset).limit(params.limit)
-        
-        results = contracts_db.execute(query).scalars().all()
-        
-        # Convert to dicts with nested educations and certificates
-        employees_list = []
-        for emp in results:
-            # Fetch educations and certificates
-            educations = contracts_db.execute(
-                select(EmployeeEducation).where(EmployeeEducation.employee_id == emp.id)
-            ).scalars().all()
-            
-            certificates = contracts_db.execute(
-                select(EmployeeCertificate).where(EmployeeCertificate.employee_id == emp.id)
-            ).scalars().all()
-            
-            # --- DEDUPLICATION LOGIC ---
-            # Remove duplicate certificates by name, keeping the one with the latest expire_date (or none)
-            unique_certs_map = {}
-            for cert in certificates:
-                name = cert.certificate_name
-                # If we've seen this cert name before
-                if name in unique_certs_map:
-                    existing = unique_certs_map[name]
-                    # Logic: favor one with expire_date over one without? Or latest date?
-                    # If existing has expire date and new doesn't, keep existing.
-                    # If new has expire date and existing doesn't, keep new.
-                    # If both have dates, keep later one.
-                    # If neither, keep random.
-                    
-                    if cert.expire_date and not existing.expire_date:
-                        unique_certs_map[name] = cert
-                    elif cert.expire_date and existing.expire_date:
-                        if cert.expire_date > existing.expire_date:
-                            unique_certs_map[name] = cert
-                else:
-                    unique_certs_map[name] = cert
-            
-            # Use deduplicated list
-            final_certificates = list(unique_certs_map.values())
+        with span("format"):
+            # Convert to dicts with nested educations and certificates
+            # (one IN query per child table for the whole page)
+            educations_by_emp, certificates_by_emp = _load_employee_children(
+                contracts_db, [emp.id for emp in results]
+            )
+            employees_list = []
+            for emp in results:
+                educations = educations_by_emp.get(emp.id, [])
+                final_certificates = certificates_by_emp.get(emp.id, [])
             
-            employees_list.append({
-                'id': emp.id,
-                'employee_no': emp.employee_no,
-                'name': emp.name,
-                'gender': emp.gender,
-                'status': emp.status,
-                'joined_at': emp.joined_at,
-                'age': emp.age,
-                'seniority_years': emp.seniority_years,
-                'working_years': emp.working_years,
-                'industry_experience': None, # Removed from model
-                # 'school': emp.educations[0].school if emp.educations else None, # Example logic
-                # For now let's just return what we have. The frontend iterates 'educations'.
-                # But let's keep the structure clean.
-                # Actually, previously `emp.school` was returning None anyway because it was empty in DB?
-                # The user says "build query based on data dictionary".
-                # If I look at the result mapping (lines 509-553 in original file),
-                # it maps `school: emp.school`.
-                # If I removed `school` from `Employee` model, `emp.school` will fail.
-                # I MUST provide a value or remove the key.
-                # I will populate it from the first education record (assuming it's the relevant one).
-                'school': educations[0].school if educations else None,
-                'major': educations[0].major if educations else None,
-                'degree': educations[0].degree if educations else None,
-                'diploma': educations[0].diploma if educations else None,
-                'company': emp.company,
-                'educations': [
-                    {
-                        'id': edu.id,
-                        'degree': edu.degree,
-                        'major': edu.major,
-                        'school': edu.school,
-                        'diploma': edu.diploma,
-                        'is_highest': None # edu.is_highest is removed from DB schema
-                    }
-                    for edu in educations
-                ],
-                'certificates': [
-                    {
-                        'id': cert.id,
-                        'category': None, # Removed from DB
-                        'certificate_type': cert.certificate_type,
-                        'certificate_name': cert.certificate_name,
-                        'qualification_level': cert.level, # mapped from 'level' column
-                        'authority': cert.authority,
-                        'effective_date': cert.effective_date,
-                        'expire_date': cert.expire_date,
-                        'certificate_no': cert.certificate_no,
-                        'remarks': None # Removed from DB
-                    }
-                    for cert in final_certificates
-                ],
-                'created_at': emp.created_at,
-                'updated_at': emp.updated_at
-            })
+                employees_list.append({
+                    'id': emp.id,
+                    'employee_no': emp.employee_no,
+                    'name': emp.name,
+                    'gender': emp.gender,
+                    'status': emp.status,
+                    'joined_at': emp.joined_at,
+                    'age': emp.age,
+                    'seniority_years': emp.seniority_years,
+                    'working_years': emp.working_years,
+                    'industry_experience': None, # Removed from model
+                    # 'school': emp.educations[0].school if emp.educations else None, # Example logic
+                    # For now let's just return what we have. The frontend iterates 'educations'.
+                    # But let's keep the structure clean.
+                    # Actually, previously `emp.school` was returning None anyway because it was empty in DB?
+                    # The user says "build query based on data dictionary".
+                    # If I look at the result mapping (lines 509-553 in original file),
+                    # it maps `school: emp.school`.
+                    # If I removed `school` from `Employee` model, `emp.school` will fail.
+                    # I MUST provide a value or remove the key.
+                    # I will populate it from the first education record (assuming it's the relevant one).
+                    'school': educations[0].school if educations else None,
+                    'major': educations[0].major if educations else None,
+                    'degree': educations[0].degree if educations else None,
+                    'diploma': educations[0].diploma if educations else None,
+                    'company': emp.company,
+                    'educations': [
+                        {
+                            'id': edu.id,
+                            'degree': edu.degree,
+                            'major': edu.major,
+                            'school': edu.school,
+                            'diploma': edu.diploma,
+                            'is_highest': None # edu.is_highest is removed from DB schema
+                        }
+                        for edu in educations
+                    ],
+                    'certificates': [
+                        {
+                            'id': cert.id,
+                            'category': None, # Removed from DB
+                            'certificate_type': cert.certificate_type,
+                            'certificate_name': cert.certificate_name,
+                            'qualification_level': cert.level, # mapped from 'level' column
+                            'authority': cert.authority,
+                            'effective_date': cert.effective_date,
+                            'expire_date': cert.expire_date,
+                            'certificate_no': cert.certificate_no,
+                            'remarks': None # Removed from DB
+                        }
+                        for cert in final_certificates
+                    ],
+                    'created_at': emp.created_at,
+                    'updated_at': emp.updated_at
+                })
         
-        return employees_list, total or 0
+        return employees_list, total or 0, next_cursor
         
     finally:
         contracts_db.close()
 
 
+EXPORT_HEADERS = ['合同名称', '合同编号', '项目编号', '客户名称', '签订日期', '金额', '状态', '类型', '标签', '行业', '描述']
+EXPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def _export_rows(contracts_db: Session, params: schemas.ContractSearchParams) -> Iterator[list]:
+    """Rows of every contract matching `params` (search filters and ordering), fetched in batches."""
+    query, rank = _apply_contract_keywords(contracts_db, select(ExistingContract), params.q)
+    query = _apply_contract_filters(contracts_db, query, params)
+    query = query.order_by(*order_clauses(_contract_sort_keys(params.q, rank)))
+    results = contracts_db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE)).scalars()
+    for contract in results:
+        yield [
+            contract.title,
+            contract.contract_number,
+            contract.project_code,
+            contract.customer_name,
+            contract.signed_at,
+            contract.contract_amount,
+            contract.status,
+            _contract_derived(contract)['contract_type_tag'],
+            contract.tags,
+            contract.industry,
+            contract.description
+        ]
+
+
+def _csv_chunks(rows: Iterator[list]) -> Iterator[bytes]:
+    yield b'\xef\xbb\xbf'  # BOM so Excel detects UTF-8
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADERS)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _xlsx_chunks(rows: Iterator[list]) -> Iterator[bytes]:
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    # Write-only mode streams rows to temporary XML parts instead of keeping cells in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('合同')
+    sheet.append(EXPORT_HEADERS)
+    for row in rows:
+        sheet.append([ILLEGAL_CHARACTERS_RE.sub('', v) if isinstance(v, str) else v for v in row])
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while chunk := output.read(EXPORT_CHUNK_BYTES):
+            yield chunk
+
+
 def export_contracts(
     db: Session,
-    params: schemas.ContractSearchParams
-) -> io.BytesIO:
+    params: schemas.ContractSearchParams,
+    file_format: str = 'csv'
+) -> Iterator[bytes]:
     """
-    Export contract search results to Excel-compatible CSV.
+    Stream contract search results as Excel-compatible CSV (UTF-8 with BOM) or XLSX.
+    Applies the same filters and ordering as search_contracts, without a row cap.
     """
     contracts_db = ContractsSessionLocal()
     try:
-        query = select(ExistingContract)
-        
-        if params.q:
-            keywords = params.q.split()
-            for keyword in keywords:
-                search_term = f"%{keyword}%"
-                query = query.where(
-                    or_(
-                        ExistingContract.title.like(search_term),
-                        ExistingContract.contract_number.like(search_term),
-                        ExistingContract.project_code.like(search_term),
-                        ExistingContract.customer_name.like(search_term),
-                        ExistingContract.description.like(search_term),
-                        ExistingContract.tags.like(search_term),
-                        ExistingContract.industry.like(search_term)
-                    )
-                )
-        if params.customer:
-            query = query.where(ExistingContract.customer_name.like(f"%{params.customer}%"))
-        if params.status:
-            query = query.where(ExistingContract.status.like(f"%{params.status}%"))
-        if params.contract_type:
-            query = query.where(ExistingContract.tags.like(f"%{params.contract_type}%"))
-        if params.tags:
-            query = query.where(ExistingContract.tags.like(f"%{params.tags}%"))
-        if params.industry:
-            query = query.where(ExistingContract.industry.like(f"%{params.industry}%"))
-        if params.start_date:
-            query = query.where(ExistingContract.signed_at >= params.start_date)
-        if params.end_date:
-            query = query.where(ExistingContract.signed_at <= params.end_date)
-        
-        # Limit export to 5000
-        query = query.limit(5000)
-        
-        results = contracts_db.execute(query).scalars().all()
-        
-        # Create CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Header
-        writer.writerow(['合同名称', '合同编号', '项目编号', '客户名称', '签订日期', '金额', '状态', '类型', '标签', '行业', '描述'])
-        
-        for contract in results:
-            contract_type = None
-            if contract.tags:
-                tags_list = [t.strip() for t in contract.tags.split(',')]
-                if tags_list:
-                    contract_type = tags_list[0]
-                    
-            writer.writerow([
-                contract.title,
-                contract.contract_number,
-                contract.project_code,
-                contract.customer_name,
-                contract.signed_at,
-                contract.contract_amount,
-                contract.status,
-                contract_type,
-                contract.tags,
-                contract.industry,
-                contract.description
-            ])
-            
-        output.seek(0)
-        byte_output = io.BytesIO()
-        byte_output.write(b'\xef\xbb\xbf') # BOM
-        byte_output.write(output.getvalue().encode('utf-8'))
-        byte_output.seek(0)
-        
-        return byte_output
-        
+        rows = _export_rows(contracts_db, params)
+        if file_format == 'xlsx':
+            yield from _xlsx_chunks(rows)
+        else:
+            yield from _csv_chunks(rows)
     finally:
         contracts_db.close()
 
 
+def _setup_date_bound(value: str, lower: bool):
+    bound = parse_date(value)
+    if bound is None:
+        # Not a recognizable date; compare against the raw text as before
+        return Company.setup_date >= value if lower else Company.setup_date <= value
+    return Company.setup_date_iso >= bound if lower else Company.setup_date_iso <= bound
+
+
 def search_companies(
     db: Session,
     params: schemas.CompanySearchParams,
@@ -830,7 +943,7 @@ def search_companies(
     contracts_db = ContractsSessionLocal()
     
     if current_user:
-        filters_dict = params.dict(exclude={'q', 'limit', 'offset'})
+        filters_dict = params.dict(exclude={'q', 'limit', 'offset', 'cursor', 'facets'})
         filters_dict['type'] = 'company'
         _log_search_history(db, current_user.id, params.q, filters_dict)
         
@@ -840,71 +953,55 @@ def search_companies(
         # Multi-field Fuzzy Search
         if params.q:
             search_term = f"%{params.q}%"
-            query = query.where(
-                or_(
-                    Company.name.ilike(search_term),
-                    Company.code.ilike(search_term),
-                    Company.nuccn.ilike(search_term),
-                    Company.legal_person.ilike(search_term)
-                )
-            )
+            q_clauses = [
+                Company.name.ilike(search_term),
+                Company.code.ilike(search_term),
+                Company.nuccn.ilike(search_term),
+                Company.legal_person.ilike(search_term)
+            ]
+            # Pinyin / initials / typo matches on the name, short name or former name
+            aliases = match_names(contracts_db, 'companies', ('name', 'shorthand', 'prev_name'), params.q)
+            q_clauses += [getattr(Company, column).in_(names) for column, names in aliases.items()]
+            query = query.where(or_(*q_clauses))
 
-        # Filters
+        # Filters (on the normalized columns maintained by search.indexing)
         if params.status:
-            query = query.where(Company.operating_state.ilike(f"%{params.status}%"))
+            state_code = operating_state_code(params.status)
+            if state_code:
+                query = query.where(Company.operating_state_code == state_code)
+            else:
+                query = query.where(Company.operating_state.ilike(f"%{params.status}%"))
             
         if params.start_date:
-            # Assuming format YYYY-MM-DD
-            query = query.where(Company.setup_date >= params.start_date)
+            query = query.where(_setup_date_bound(params.start_date, lower=True))
         if params.end_date:
-            query = query.where(Company.setup_date <= params.end_date)
+            query = query.where(_setup_date_bound(params.end_date, lower=False))
             
-        # Execute Query
-        results = contracts_db.execute(query).scalars().all()
-        
-        # Python-side filtering for Registered Capital (Text)
-        if params.capital_min is not None or params.capital_max is not None:
-            filtered = []
-            for company in results:
-                # Parse "100万元", "50.5万", etc.
-                cap_val = 0.0
-                try:
-                    raw = company.registered_capital
-                    if raw:
-                        # Simple extraction of numbers
-                        nums = re.findall(r"[-+]?\d*\.\d+|\d+", raw)
-                        if nums:
-                            cap_val = float(nums[0])
-                except:
-                    pass
-                
-                # Check range
-                if params.capital_min is not None and cap_val < params.capital_min:
-                    continue
-                if params.capital_max is not None and cap_val > params.capital_max:
-                    continue
-                filtered.append(company)
-            results = filtered
-
-        total = len(results)
-        
-        # Sort by Setup Date Descending (Newest first)
-        results.sort(key=lambda x: str(x.setup_date) if x.setup_date else '0000', reverse=True)
-        
-        # Pagination in Python
-        paginated_items = results[params.offset : params.offset + params.limit]
+        # Registered capital in 万元 (CNY); unparseable capital counts as 0 as before
+        if params.capital_min is not None:
+            capital_min_clause = Company.registered_capital_wan >= params.capital_min
+            if params.capital_min <= 0:
+                capital_min_clause = or_(capital_min_clause, Company.registered_capital_wan.is_(None))
+            query = query.where(capital_min_clause)
+        if params.capital_max is not None:
+            query = query.where(or_(
+                Company.registered_capital_wan <= params.capital_max,
+                Company.registered_capital_wan.is_(None)
+            ))
 
-        # Log search history
-        _log_search_history(db, current_user.id, params.q or "", {
-            "type": "company",
-            "filters": params.dict(exclude={'q', 'limit', 'offset'})
-        })
+        # Sort by relevance, then Setup Date Descending (Newest first, missing dates last)
+        paginated_items, total, next_cursor = _search_page(
+            contracts_db, 'companies', params, query, Company,
+            ranking_profile('companies').sort_keys(Company, params.q)
+            + [(Company.setup_date_iso, True), (Company.id, False)]
+        )
 
         return {
             "total": total,
             "results": paginated_items,
             "page": (params.offset // params.limit) + 1,
-            "page_size": params.limit
+            "page_size": params.limit,
+            "next_cursor": next_cursor
         }
     finally:
         contracts_db.close()
@@ -924,3 +1021,59 @@ def get_company_detail(
         return company
     finally:
         contracts_db.close()
+
+
+def _search_company_rows(db: Session, params: schemas.CompanySearchParams, current_user=None):
+    result = search_companies(db, params, current_user)
+    rows = [schemas.CompanyRead.model_validate(company).model_dump() for company in result["results"]]
+    return rows, result["total"], result["next_cursor"]
+
+
+# Entity -> (search function returning (results, total, next_cursor), params model)
+SEARCH_ALL_ENTITIES = {
+    'contracts': (search_contracts, schemas.ContractSearchParams),
+    'assets': (search_assets, schemas.AssetSearchParams),
+    'qualifications': (search_qualifications, schemas.QualificationSearchParams),
+    'employees': (search_employees, schemas.EmployeeSearchParams),
+    'companies': (_search_company_rows, schemas.CompanySearchParams),
+}
+
+# Shared by all /search/all requests; each entity search uses its own read-only contracts session
+_fanout_pool = ThreadPoolExecutor(max_workers=settings.search_fanout_workers, thread_name_prefix="search-fanout")
+
+
+def search_all(
+    db: Session,
+    q: str,
+    limit: int,
+    current_user: Optional[auth_models.User] = None
+) -> Dict[str, Any]:
+    """
+    Run every entity search for `q` concurrently and return the top `limit`
+    results plus the total of each. One history record is logged for the
+    whole search; an entity that fails or times out comes back empty with an error.
+    """
+    if current_user:
+        _log_search_history(db, current_user.id, q, {'type': 'all'})
+
+    # Each search runs in a copy of the request context so its spans land in the request trace
+    futures = {
+        entity: _fanout_pool.submit(copy_context().run, search, None, params_model(q=q, limit=limit))
+        for entity, (search, params_model) in SEARCH_ALL_ENTITIES.items()
+    }
+    # One deadline for the whole fan-out; whatever has not finished by then is dropped
+    done, _ = wait(futures.values(), timeout=settings.search_fanout_timeout_seconds)
+    sections: Dict[str, Any] = {}
+    for entity, future in futures.items():
+        if future not in done:
+            future.cancel()  # no-op if it already started
+            logger.warning(f"search_all: {entity} search timed out for q={q!r}")
+            sections[entity] = {'total': 0, 'results': [], 'next_cursor': None, 'error': 'timeout'}
+            continue
+        try:
+            results, total, next_cursor = future.result()
+            sections[entity] = {'total': total, 'results': results, 'next_cursor': next_cursor, 'error': None}
+        except Exception as exc:
+            logger.error(f"search_all: {entity} search failed for q={q!r}: {exc}", exc_info=True)
+            sections[entity] = {'total': 0, 'results': [], 'next_cursor': None, 'error': 'failed'}
+    return {'q': q, 'limit': limit, 'sections': sections}
@@ -0,0 +1,223 @@
+"""Type-ahead suggestions from an in-memory prefix index.
+
+The index is a sorted array of (key, suggestion) pairs. Prefix lookups are
+two bisections plus a bounded scan of the matching range. Every suggestion
+is stored under its lowercased text, and names are also stored under their
+pinyin and initials (taken from the name index, see search.names).
+Sources:
+
+* customer names and qualification names, weighted by how often they occur;
+* company names and contract titles;
+* frequent past queries from search_history.
+
+The index is rebuilt when the contracts DB data version changes, or after
+``search_suggest_refresh_seconds`` to pick up new history. Rebuilds run in
+the background while the previous index keeps serving; only the first build
+blocks.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from backend.app.auth import models as auth_models
+from backend.app.core.config import settings
+from backend.app.core.database import ContractsSessionLocal, SessionLocal
+from backend.app.search import indexing
+from backend.app.search.assets_models import QualificationAsset
+from backend.app.search.company_models import Company
+from backend.app.search.contracts_models import ExistingContract
+from backend.app.search.names import NAME_INDEX_TABLE, has_name_index, name_keys, normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Longest stretch of the index scanned for one prefix (very short prefixes
+# match most of it; the best suggestions among the first entries are enough)
+MAX_SCAN = 5000
+# A past query counts as much as this many occurrences of a name
+HISTORY_WEIGHT = 5
+
+_PREFIX_END = "\U0010ffff"
+
+
+class Suggestion(NamedTuple):
+    text: str
+    kind: str  # customer, contract, company, qualification or history
+    weight: int
+
+
+class PrefixIndex:
+    """Immutable sorted-array prefix index."""
+
+    def __init__(self, entries: Iterable[Tuple[str, Suggestion]]):
+        pairs = sorted((key, suggestion) for key, suggestion in entries if key)
+        self._keys = [key for key, _ in pairs]
+        self._values = [suggestion for _, suggestion in pairs]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def search(self, prefix: str, limit: int) -> List[Suggestion]:
+        lo = bisect_left(self._keys, prefix)
+        hi = min(bisect_left(self._keys, prefix + _PREFIX_END, lo), lo + MAX_SCAN)
+        # The same text can be reached through several keys and sources
+        best: Dict[str, Suggestion] = {}
+        for suggestion in self._values[lo:hi]:
+            current = best.get(suggestion.text)
+            if current is None or suggestion.weight > current.weight:
+                best[suggestion.text] = suggestion
+        return heapq.nlargest(limit, best.values(), key=lambda s: (s.weight, -len(s.text)))
+
+
+def _name_entries(kind: str, rows: Iterable[Tuple[str, int]],
+                  pinyin: Dict[str, Tuple[str, str]]) -> List[Tuple[str, Suggestion]]:
+    entries = []
+    for name, weight in rows:
+        suggestion = Suggestion(name, kind, weight)
+        entries.append((normalize_query(name), suggestion))
+        for key in pinyin.get(name, ()):
+            entries.append((key, suggestion))
+    return entries
+
+
+def _indexed_pinyin(contracts_db: Session, table_name: str, column_name: str) -> Dict[str, Tuple[str, str]]:
+    """(pinyin, initials) per name from the name index, if it has been built."""
+    if not has_name_index(contracts_db):
+        return {}
+    rows = contracts_db.execute(
+        text(f"SELECT name, pinyin, initials FROM {NAME_INDEX_TABLE} WHERE source_table = :t AND source_column = :c"),
+        {"t": table_name, "c": column_name},
+    )
+    return {name: (pinyin, initials) for name, pinyin, initials in rows}
+
+
+def _history_entries(db: Session) -> List[Tuple[str, Suggestion]]:
+    history = auth_models.SearchHistory
+    # Distinct users, so one user repeating a query cannot surface it to everyone
+    counts = func.count(func.distinct(history.user_id))
+    rows = db.execute(
+        select(history.query, counts)
+        .where(history.query.isnot(None), history.query != "")
+        .group_by(history.query)
+        .having(counts >= settings.search_suggest_history_min_count)
+        .order_by(counts.desc())
+        .limit(settings.search_suggest_history_limit)
+    )
+    entries = []
+    for query, count in rows:
+        query = query.strip()
+        suggestion = Suggestion(query, "history", count * HISTORY_WEIGHT)
+        entries.append((normalize_query(query), suggestion))
+        if not query.isascii():
+            # Let pinyin typing reach past Chinese queries too
+            entries += [(key, suggestion) for key in name_keys(query)[1:]]
+    return entries
+
+
+def build_prefix_index() -> PrefixIndex:
+    """Build the suggestion index from the contracts DB and the search history."""
+    entries: List[Tuple[str, Suggestion]] = []
+    with ContractsSessionLocal() as contracts_db:
+        customers = contracts_db.execute(
+            select(ExistingContract.customer_name, func.count())
+            .where(ExistingContract.customer_name.isnot(None), ExistingContract.customer_name != "")
+            .group_by(ExistingContract.customer_name)
+        )
+        entries += _name_entries("customer", customers,
+                                 _indexed_pinyin(contracts_db, "contracts", "customer_name"))
+        companies = contracts_db.execute(
+            select(Company.name, func.count()).where(Company.name != "").group_by(Company.name)
+        )
+        entries += _name_entries("company", companies,
+                                 _indexed_pinyin(contracts_db, "companies", "name"))
+        qualifications = contracts_db.execute(
+            select(QualificationAsset.qualification_name, func.count())
+            .where(QualificationAsset.qualification_name.isnot(None), QualificationAsset.qualification_name != "")
+            .group_by(QualificationAsset.qualification_name)
+        )
+        entries += _name_entries("qualification", qualifications, {})
+        titles = contracts_db.execute(
+            select(ExistingContract.title, func.count())
+            .where(ExistingContract.title.isnot(None), ExistingContract.title != "")
+            .group_by(ExistingContract.title)
+        )
+        entries += _name_entries("contract", titles, {})
+    with SessionLocal() as db:
+        entries += _history_entries(db)
+    return PrefixIndex(entries)
+
+
+class SuggestionIndex:
+    """Holds the current PrefixIndex and rebuilds it (single-flight) when stale."""
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._index: Optional[PrefixIndex] = None
+        self._version: Optional[int] = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._building = False
+        self.builds = 0
+
+    def suggest(self, contracts_db: Session, q: Optional[str], limit: int = 10) -> List[Suggestion]:
+        prefix = normalize_query(q or "")
+        if not prefix:
+            return []
+        version = indexing.read_data_version(contracts_db.connection())
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    self._build(version)
+            index = self._index
+        elif version != self._version or time.monotonic() - self._built_at > self.refresh_seconds:
+            self._rebuild_async(version)
+        return index.search(prefix, limit) if index is not None else []
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "entries": len(self._index) if self._index is not None else 0,
+            "version": self._version,
+            "builds": self.builds,
+            "age_seconds": round(time.monotonic() - self._built_at, 1) if self._index is not None else None,
+        }
+
+    def _rebuild_async(self, version: Optional[int]) -> None:
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+
+        def _run() -> None:
+            try:
+                self._build(version)
+            finally:
+                self._building = False
+
+        threading.Thread(target=_run, name="search-suggest-build", daemon=True).start()
+
+    def _build(self, version: Optional[int]) -> None:
+        started = time.perf_counter()
+        try:
+            index = build_prefix_index()
+        except Exception as exc:
+            logger.error(f"Failed to build suggestion index: {exc}", exc_info=True)
+            # Retry at the next refresh interval rather than on every keystroke
+            if self._index is None:
+                self._index, self._version = PrefixIndex(()), version
+            self._built_at = time.monotonic()
+            return
+        self._index, self._version, self._built_at = index, version, time.monotonic()
+        self.builds += 1
+        logger.info(f"Suggestion index built: {len(index)} keys in {time.perf_counter() - started:.2f}s")
+
+
+suggestion_index = SuggestionIndex(refresh_seconds=settings.search_suggest_refresh_seconds)
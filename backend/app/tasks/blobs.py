@@ -0,0 +1,110 @@
+"""Content-addressed store for files attached to tasks.
+
+Uploaded files are kept on local disk under their sha256 instead of as
+base64 inside ``Task.payload``; the payload only holds the reference
+(``file_sha256``, ``file_size``). Identical uploads are stored once.
+
+References are rows of ``task_blobs`` (one per task and file), so a blob's
+reference count is its number of rows. TaskService.cleanup_blobs drops the
+rows of terminal tasks and deletes files nothing references any more.
+Files younger than a grace period are never deleted, which covers the gap
+between storing an upload and committing the task that references it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, Collection, Iterator, Tuple
+
+from backend.app.core.config import settings
+
+CHUNK_SIZE = 1024 * 1024
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobStore:
+    """sha256-named files under `root`, fanned out as <root>/ab/<sha256>."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def path(self, sha256: str) -> Path:
+        if not _SHA256_RE.match(sha256):
+            raise ValueError(f"Invalid blob reference: {sha256!r}")
+        return self.root / sha256[:2] / sha256
+
+    def exists(self, sha256: str) -> bool:
+        return self.path(sha256).is_file()
+
+    def put_stream(self, stream: BinaryIO) -> Tuple[str, int]:
+        """Store the rest of `stream` (read in chunks) and return (sha256, size)."""
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            sha256 = digest.hexdigest()
+            target = self.path(sha256)
+            if target.exists():
+                # Already stored: refresh its age so a concurrent cleanup keeps it
+                os.utime(target)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_name, target)
+        finally:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+        return sha256, size
+
+    def put_bytes(self, data: bytes) -> Tuple[str, int]:
+        return self.put_stream(BytesIO(data))
+
+    @contextmanager
+    def open(self, sha256: str) -> Iterator[BinaryIO]:
+        """Open a stored file for (streamed) reading."""
+        with open(self.path(sha256), "rb") as handle:
+            yield handle
+
+    def read_bytes(self, sha256: str) -> bytes:
+        with self.open(sha256) as handle:
+            return handle.read()
+
+    def remove_unreferenced(self, referenced: Collection[str], min_age_seconds: float) -> int:
+        """Delete stored files not in `referenced` and older than `min_age_seconds`.
+
+        Also removes partial uploads left in tmp/ by a crash.
+        """
+        if not self.root.is_dir():
+            return 0
+        cutoff = time.time() - min_age_seconds
+        removed = 0
+        for shard in self.root.iterdir():
+            if not shard.is_dir() or (len(shard.name) != 2 and shard.name != "tmp"):
+                continue
+            for path in shard.iterdir():
+                if path.name in referenced:
+                    continue
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink()
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+blob_store = BlobStore(Path(settings.task_blob_dir))
@@ -5,12 +5,58 @@ from __future__ import annotations
 import base64
 import logging
 import os
+import shutil
 import tempfile
-from typing import Any, Dict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+from backend.app.tasks.blobs import blob_store
 
 logger = logging.getLogger(__name__)
 
 
+def _has_file(payload: Dict[str, Any]) -> bool:
+    return bool(payload.get("file_sha256") or payload.get("file_base64"))
+
+
+@contextmanager
+def _payload_file_path(payload: Dict[str, Any], suffix: str) -> Iterator[str]:
+    """Path of the payload's file, ending in `suffix` (extractors such as OCR pick their path by it).
+
+    A stored file is linked under a temp name (no copy); a legacy inline file is written to a temp file.
+    """
+    tmp_dir = tempfile.mkdtemp(prefix="task-file-")
+    tmp_path = os.path.join(tmp_dir, f"document{suffix}")
+    try:
+        if payload.get("file_sha256"):
+            source = blob_store.path(payload["file_sha256"])
+            try:
+                os.link(source, tmp_path)
+            except OSError:
+                # Temp dir on another filesystem (or no hardlinks)
+                try:
+                    os.symlink(source, tmp_path)
+                except OSError:
+                    shutil.copyfile(source, tmp_path)
+        else:
+            # Tasks queued before files moved out of the payload
+            with open(tmp_path, "wb") as tmp:
+                tmp.write(base64.b64decode(payload["file_base64"]))
+        yield tmp_path
+    finally:
+        # Clean up temp file (the link only; the stored file stays)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _payload_file_bytes(payload: Dict[str, Any]) -> bytes:
+    """Contents of the payload's file (read straight from the blob store)."""
+    if payload.get("file_sha256"):
+        return blob_store.read_bytes(payload["file_sha256"])
+    if payload.get("file_base64"):
+        return base64.b64decode(payload["file_base64"])
+    raise ValueError("Payload must contain 'file_sha256'")
+
+
 class BiddingAnalysisExecutor:
     """Execute bidding analysis tasks."""
 
@@ -20,7 +66,7 @@ class BiddingAnalysisExecutor:
         Args:
             payload: Task payload containing:
                 - text: Optional text content to analyze
-                - file_base64: Optional base64-encoded file
+                - file_sha256: Optional stored file (see tasks.blobs; legacy: file_base64)
                 - filename: Optional filename
                 - content_type: Optional MIME type
 
@@ -33,52 +79,44 @@ class BiddingAnalysisExecutor:
         """
         from BiddingAssistant.backend.analyzer.tender_llm import TenderLLMAnalyzer
         from BiddingAssistant.backend.analyzer.llm_enhanced import EnhancedLLMClient
-        from BiddingAssistant.backend.config import get_bidding_config
+        from BiddingAssistant.backend.config import load_config
         from BiddingAssistant.backend.extractors.dispatcher import extract_text_from_file
 
         # Get configuration
-        config = get_bidding_config()
+        config = load_config().llm
 
         # Create enhanced LLM client
         llm_client = EnhancedLLMClient(
-            provider=config.llm_provider,
-            model=config.llm_model,
-            api_key=config.llm_api_key,
-            base_url=config.llm_base_url,
-            timeout=config.llm_timeout,
+            provider=config.provider,
+            model=config.model,
+            api_key=config.api_key,
+            base_url=config.base_url,
+            timeout=config.timeout,
             max_retries=3,
         )
 
-        analyzer = TenderLLMAnalyzer(llm_client=llm_client)
+        analyzer = TenderLLMAnalyzer(llm_client)
 
         # Check if text or file provided
         text = payload.get("text")
-        file_base64 = payload.get("file_base64")
 
         if text:
             # Direct text analysis
             logger.info("Analyzing direct text input")
             result = analyzer.analyze(text)
 
-        elif file_base64:
+        elif _has_file(payload):
             # File analysis
             filename = payload.get("filename", "document.pdf")
             content_type = payload.get("content_type")
 
             logger.info(f"Analyzing file: {filename}")
 
-            # Decode base64 file
-            file_bytes = base64.b64decode(file_base64)
-
-            # Write to temp file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp:
-                tmp.write(file_bytes)
-                tmp_path = tmp.name
-
-            try:
+            # Extractors read the stored file through a link named with the upload's suffix
+            with _payload_file_path(payload, suffix=os.path.splitext(filename)[1]) as file_path:
                 # Extract text from file
                 extracted_text, meta = extract_text_from_file(
-                    tmp_path,
+                    file_path,
                     filename=filename,
                     content_type=content_type,
                 )
@@ -93,15 +131,8 @@ class BiddingAnalysisExecutor:
                 result["metadata"] = result.get("metadata", {})
                 result["metadata"].update(meta or {})
 
-            finally:
-                # Clean up temp file
-                try:
-                    os.unlink(tmp_path)
-                except Exception:
-                    pass
-
         else:
-            raise ValueError("Payload must contain either 'text' or 'file_base64'")
+            raise ValueError("Payload must contain either 'text' or 'file_sha256'")
 
         logger.info("Bidding analysis completed successfully")
         return result
@@ -115,7 +146,7 @@ class WorkloadAnalysisExecutor:
 
         Args:
             payload: Task payload containing:
-                - file_base64: Base64-encoded Excel file
+                - file_sha256: Stored Excel file (see tasks.blobs; legacy: file_base64)
                 - filename: Excel filename
                 - config: Optional analysis configuration
 
@@ -129,17 +160,16 @@ class WorkloadAnalysisExecutor:
         from SplitWorkload.backend.app.services.workload_service import WorkloadService
         from SplitWorkload.backend.app.models.api import ConstraintConfig
 
-        file_base64 = payload.get("file_base64")
-        if not file_base64:
-            raise ValueError("Payload must contain 'file_base64'")
+        if not _has_file(payload):
+            raise ValueError("Payload must contain 'file_sha256'")
 
         filename = payload.get("filename", "workload.xlsx")
         config_dict = payload.get("config", {})
 
         logger.info(f"Analyzing workload file: {filename}")
 
-        # Decode file
-        file_bytes = base64.b64decode(file_base64)
+        # Read file
+        file_bytes = _payload_file_bytes(payload)
 
         # Parse config
         config = ConstraintConfig(**config_dict)
@@ -174,7 +204,7 @@ class CostEstimationExecutor:
 
         Args:
             payload: Task payload containing:
-                - file_base64: Base64-encoded Excel file
+                - file_sha256: Stored Excel file (see tasks.blobs; legacy: file_base64)
                 - filename: Excel filename
                 - config: Cost estimation configuration
 
@@ -188,17 +218,16 @@ class CostEstimationExecutor:
         from backend.app.modules.costing.service import CostEstimator
         from backend.app.modules.costing.schemas import CostingConfig
 
-        file_base64 = payload.get("file_base64")
-        if not file_base64:
-            raise ValueError("Payload must contain 'file_base64'")
+        if not _has_file(payload):
+            raise ValueError("Payload must contain 'file_sha256'")
 
         filename = payload.get("filename", "cost_estimation.xlsx")
         config_dict = payload.get("config", {})
 
         logger.info(f"Estimating costs for file: {filename}")
 
-        # Decode file
-        file_bytes = base64.b64decode(file_base64)
+        # Read file
+        file_bytes = _payload_file_bytes(payload)
 
         # Parse config
         config = CostingConfig(**config_dict)
@@ -32,6 +32,12 @@ class TaskType(str, enum.Enum):
     COST_ESTIMATION = "cost_estimation"
 
 
+# Statuses a worker may claim a task from
+CLAIMABLE_STATUSES = (TaskStatus.PENDING, TaskStatus.RETRY)
+# Statuses after which a task is never processed again
+TERMINAL_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED)
+
+
 class Task(TimestampMixin, Base):
     """Persistent task record for async LLM operations.
 
@@ -59,14 +65,24 @@ class Task(TimestampMixin, Base):
     # Task payload (input data)
     payload: Mapped[Dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
 
+    # Scheduling priority: higher is claimed first; equal priorities are shared fairly between users
+    priority: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
     # Execution metadata
     retry_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     max_retries: Mapped[int] = mapped_column(Integer, nullable=False, default=3)
 
     # Timing
-    started_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+    started_at: Mapped[Optional[datetime]] = mapped_column(nullable=True, index=True)
     completed_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
 
+    # Claim lease: the worker running the task and until when its claim holds. Workers
+    # renew the lease while the task runs; an expired lease means the worker died and
+    # the task is reclaimed (see TaskService.reclaim_expired_tasks). A task cancelled
+    # while running keeps its lease until the worker is done with it
+    worker_id: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+
     # Results
     result: Mapped[Optional[Dict[str, Any]]] = mapped_column(JSON, nullable=True)
     error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
@@ -80,7 +96,7 @@ class Task(TimestampMixin, Base):
     @property
     def is_terminal(self) -> bool:
         """Check if task is in a terminal state (no further processing needed)."""
-        return self.status in {TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED}
+        return self.status in TERMINAL_STATUSES
 
     @property
     def can_retry(self) -> bool:
@@ -93,3 +109,16 @@ class Task(TimestampMixin, Base):
         if self.started_at and self.completed_at:
             return (self.completed_at - self.started_at).total_seconds()
         return None
+
+
+class TaskBlob(Base):
+    """Reference from a task to a file in the blob store (see tasks.blobs).
+
+    A blob's reference count is its number of rows; rows of terminal tasks
+    are dropped by TaskService.cleanup_blobs.
+    """
+
+    __tablename__ = "task_blobs"
+
+    task_id: Mapped[int] = mapped_column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True, index=True)
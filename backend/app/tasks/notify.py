@@ -0,0 +1,136 @@
+"""Wake task workers as soon as a task is queued.
+
+Workers poll the tasks table only as a fallback. ``notify_task_queued`` is
+called after a task becomes claimable and wakes every worker right away:
+
+* workers in the same process through their wakeup Event;
+* workers in other processes on this host through a Unix datagram socket.
+  Each worker binds its own socket in ``task_notify_dir``; the notifier sends
+  a one-byte datagram to every socket there and removes sockets whose worker
+  is gone.
+
+Notifications are best effort: a lost one only delays the task until the
+next poll. Without AF_UNIX (Windows) workers fall back to polling.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SOCKET_SUFFIX = ".sock"
+# The listener thread checks this often whether it was stopped
+LISTEN_TIMEOUT_SECONDS = 1.0
+
+_local_events: List[threading.Event] = []
+_local_lock = threading.Lock()
+
+
+def notify_dir() -> Path:
+    return Path(settings.task_notify_dir or Path(tempfile.gettempdir()) / "sales-assistant-tasks")
+
+
+def _unix_sockets_supported() -> bool:
+    return settings.task_notify_enabled and hasattr(socket, "AF_UNIX")
+
+
+def notify_task_queued() -> None:
+    """Wake all local and same-host workers (never raises)."""
+    with _local_lock:
+        events = list(_local_events)
+    for event in events:
+        event.set()
+
+    if not _unix_sockets_supported():
+        return
+    try:
+        paths = list(notify_dir().glob(f"*{SOCKET_SUFFIX}"))
+    except OSError:
+        return
+    if not paths:
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+        sender.setblocking(False)
+        for path in paths:
+            try:
+                sender.sendto(b"1", str(path))
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker exited without cleaning up
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            except OSError as exc:
+                # Full receive buffer: that worker already has a wakeup pending
+                logger.debug(f"Task notification to {path} failed: {exc}")
+
+
+class TaskNotificationListener:
+    """Sets `event` whenever a task is queued (in this process or on this host)."""
+
+    def __init__(self, event: threading.Event) -> None:
+        self.event = event
+        self.path: Optional[Path] = None
+        self._socket: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with _local_lock:
+            _local_events.append(self.event)
+
+        if not _unix_sockets_supported():
+            logger.info("Task notifications via socket unavailable, relying on polling")
+            return
+        try:
+            directory = notify_dir()
+            directory.mkdir(parents=True, exist_ok=True)
+            self.path = directory / f"worker-{os.getpid()}-{uuid.uuid4().hex[:8]}{SOCKET_SUFFIX}"
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._socket.bind(str(self.path))
+        except OSError as exc:
+            logger.warning(f"Could not open task notification socket, relying on polling: {exc}")
+            self._close_socket()
+            return
+
+        self._thread = threading.Thread(target=self._listen, name="task-notify-listener", daemon=True)
+        self._thread.start()
+        logger.info(f"Listening for task notifications on {self.path}")
+
+    def stop(self) -> None:
+        with _local_lock:
+            if self.event in _local_events:
+                _local_events.remove(self.event)
+        self._close_socket()
+
+    def _listen(self) -> None:
+        sock = self._socket
+        sock.settimeout(LISTEN_TIMEOUT_SECONDS)
+        while self._socket is sock:
+            try:
+                sock.recv(64)
+            except socket.timeout:
+                continue
+            except OSError:
+                return  # socket closed by stop()
+            self.event.set()
+
+    def _close_socket(self) -> None:
+        sock, self._socket = self._socket, None
+        if sock is not None:
+            sock.close()
+        if self.path is not None:
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+            self.path = None
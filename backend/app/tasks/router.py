@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import base64
 import logging
 from datetime import datetime
 from typing import Any, Dict, List, Optional
@@ -10,9 +9,11 @@ from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Response, UploadFile, status
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from backend.app.auth.models import User
 from backend.app.core.dependencies import get_current_user, get_db
+from backend.app.tasks.blobs import blob_store
 from backend.app.tasks.models import Task, TaskStatus, TaskType
 from backend.app.tasks.service import TaskService
 
@@ -20,6 +21,16 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+MAX_PRIORITY = 10
+
+
+def _check_priority(priority: int, current_user: User) -> None:
+    if priority > 0 and current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="只有管理员可以提高任务优先级",
+        )
+
 
 # ============================= Schemas =============================
 
@@ -30,6 +41,9 @@ class TaskCreateRequest(BaseModel):
     task_type: TaskType
     payload: Dict[str, Any]
     max_retries: int = Field(default=3, ge=0, le=10)
+    # Higher is scheduled first; raising it above 0 requires an admin, lowering it
+    # (e.g. for bulk jobs) is open to everyone
+    priority: int = Field(default=0, ge=-MAX_PRIORITY, le=MAX_PRIORITY)
 
 
 class TaskResponse(BaseModel):
@@ -40,6 +54,7 @@ class TaskResponse(BaseModel):
     status: TaskStatus
     retry_count: int
     max_retries: int
+    priority: int = 0
     created_at: datetime
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
@@ -82,6 +97,13 @@ def create_task(
 
     The task will be queued and processed by a background worker.
     """
+    _check_priority(request.priority, current_user)
+    if "file_sha256" in request.payload:
+        # Stored files are only referenced through the upload endpoints
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="payload 不能直接引用已存储的文件，请使用 file_base64 或文件上传接口",
+        )
     task_service = TaskService(db)
 
     task = task_service.create_task(
@@ -89,6 +111,7 @@ def create_task(
         user_id=current_user.id,
         payload=request.payload,
         max_retries=request.max_retries,
+        priority=request.priority,
     )
 
     logger.info(
@@ -103,10 +126,12 @@ def create_task(
 def create_bidding_text_task(
     text: str = Form(...),
     max_retries: int = Form(default=3),
+    priority: int = Form(default=0, ge=-MAX_PRIORITY, le=MAX_PRIORITY),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> Task:
     """Create a bidding analysis task from text input."""
+    _check_priority(priority, current_user)
     task_service = TaskService(db)
 
     payload = {"text": text}
@@ -116,6 +141,7 @@ def create_bidding_text_task(
         user_id=current_user.id,
         payload=payload,
         max_retries=max_retries,
+        priority=priority,
         metadata={"source": "text"},
     )
 
@@ -127,19 +153,21 @@ def create_bidding_text_task(
 async def create_bidding_file_task(
     file: UploadFile = File(...),
     max_retries: int = Form(default=3),
+    priority: int = Form(default=0, ge=-MAX_PRIORITY, le=MAX_PRIORITY),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> Task:
     """Create a bidding analysis task from file upload."""
+    _check_priority(priority, current_user)
     task_service = TaskService(db)
 
     try:
-        # Read and encode file
-        file_bytes = await file.read()
-        file_base64 = base64.b64encode(file_bytes).decode("utf-8")
+        # Stream the upload into the blob store; the task only keeps the reference
+        file_sha256, file_size = await run_in_threadpool(blob_store.put_stream, file.file)
 
         payload = {
-            "file_base64": file_base64,
+            "file_sha256": file_sha256,
+            "file_size": file_size,
             "filename": file.filename,
             "content_type": file.content_type,
         }
@@ -149,6 +177,7 @@ async def create_bidding_file_task(
             user_id=current_user.id,
             payload=payload,
             max_retries=max_retries,
+            priority=priority,
             metadata={"source": "file", "filename": file.filename},
         )
 
@@ -2,18 +2,37 @@
 
 from __future__ import annotations
 
+import base64
 import logging
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+from typing import Any, Collection, Dict, List, Mapping, Optional
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, delete, func, or_, select, update
+from sqlalchemy.orm import Session, defer
 
-from backend.app.tasks.models import Task, TaskStatus, TaskType
+from backend.app.core.config import settings
+from backend.app.tasks.blobs import blob_store
+from backend.app.tasks.models import CLAIMABLE_STATUSES, TERMINAL_STATUSES, Task, TaskBlob, TaskStatus, TaskType
+from backend.app.tasks.notify import notify_task_queued
 
 logger = logging.getLogger(__name__)
 
 
+def _externalize_file(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Move an inline base64 file of `payload` to the blob store, leaving a reference."""
+    if not payload.get("file_base64"):
+        return payload
+    payload = dict(payload)
+    sha256, size = blob_store.put_bytes(base64.b64decode(payload.pop("file_base64")))
+    payload.update(file_sha256=sha256, file_size=size)
+    return payload
+
+
+def _schedule_order(table) -> tuple:
+    """Claim order of a _share_slots subquery: priority, then fair-share slot, then age."""
+    return (table.c.priority.desc(), table.c.share_slot, table.c.created_at, table.c.id)
+
+
 class TaskService:
     """Service layer for task CRUD operations."""
 
@@ -27,6 +46,7 @@ class TaskService:
         user_id: int,
         payload: Dict[str, Any],
         max_retries: int = 3,
+        priority: int = 0,
         metadata: Optional[Dict[str, Any]] = None,
     ) -> Task:
         """Create a new task in PENDING status.
@@ -34,26 +54,35 @@ class TaskService:
         Args:
             task_type: Type of task to execute
             user_id: ID of the user who owns this task
-            payload: Input data for the task
+            payload: Input data for the task. Files are referenced by
+                ``file_sha256`` (see tasks.blobs); an inline ``file_base64`` is
+                moved to the blob store first.
             max_retries: Maximum number of retry attempts
+            priority: Scheduling priority (higher is claimed first, see claim_tasks)
             metadata: Optional metadata for debugging
 
         Returns:
             Created task instance
         """
+        payload = _externalize_file(payload)
         task = Task(
             task_type=task_type,
             user_id=user_id,
             payload=payload,
             status=TaskStatus.PENDING,
             max_retries=max_retries,
+            priority=priority,
             task_metadata=metadata or {},
         )
         self.db.add(task)
+        if payload.get("file_sha256"):
+            self.db.flush()
+            self.db.add(TaskBlob(task_id=task.id, sha256=payload["file_sha256"]))
         self.db.commit()
         self.db.refresh(task)
+        notify_task_queued()
         logger.info(
-            f"Created task {task.id} (type={task_type}, user_id={user_id})",
+            f"Created task {task.id} (type={task_type}, user_id={user_id}, priority={priority})",
             extra={"task_id": task.id, "task_type": task_type, "user_id": user_id},
         )
         return task
@@ -95,7 +124,8 @@ class TaskService:
         Returns:
             List of tasks sorted by created_at DESC
         """
-        stmt = select(Task).order_by(Task.created_at.desc())
+        # Listings never show payload or result; leave them unloaded
+        stmt = select(Task).options(defer(Task.payload), defer(Task.result)).order_by(Task.created_at.desc())
 
         if user_id is not None:
             stmt = stmt.where(Task.user_id == user_id)
@@ -142,6 +172,9 @@ class TaskService:
         if status in {TaskStatus.COMPLETED, TaskStatus.FAILED}:
             task.completed_at = datetime.utcnow()
 
+        if status != TaskStatus.RUNNING:
+            task.lease_expires_at = None
+
         if error is not None:
             task.error = error
 
@@ -189,8 +222,10 @@ class TaskService:
         task.retry_count += 1
         task.status = TaskStatus.RETRY
         task.error = None  # Clear previous error
+        task.lease_expires_at = None
         self.db.commit()
         self.db.refresh(task)
+        notify_task_queued()
 
         logger.info(
             f"Incremented retry for task {task_id} (attempt {task.retry_count}/{task.max_retries})",
@@ -201,6 +236,10 @@ class TaskService:
     def cancel_task(self, task_id: int, user_id: Optional[int] = None) -> Optional[Task]:
         """Cancel a pending or running task.
 
+        A running task keeps its lease: its worker may still be reading the
+        task's file and lets go of it when the attempt ends (see
+        finish_leased_task), or the lease runs out.
+
         Args:
             task_id: Task ID
             user_id: If provided, only cancel if task belongs to this user
@@ -220,11 +259,17 @@ class TaskService:
         logger.info(f"Cancelled task {task_id}", extra={"task_id": task_id})
         return task
 
-    def get_pending_tasks(self, limit: int = 10) -> List[Task]:
+    def get_pending_tasks(
+        self,
+        limit: int = 10,
+        *,
+        exclude_types: Optional[Collection[TaskType]] = None,
+    ) -> List[Task]:
         """Get pending or retry tasks for worker processing.
 
         Args:
             limit: Maximum number of tasks to fetch
+            exclude_types: Task types to skip (e.g. types at their concurrency limit)
 
         Returns:
             List of tasks ready for execution
@@ -232,12 +277,314 @@ class TaskService:
         stmt = (
             select(Task)
             .where(Task.status.in_([TaskStatus.PENDING, TaskStatus.RETRY]))
-            .order_by(Task.created_at.asc())
+            .order_by(Task.priority.desc(), Task.created_at.asc())
             .limit(limit)
         )
+        if exclude_types:
+            stmt = stmt.where(Task.task_type.notin_(list(exclude_types)))
         result = self.db.execute(stmt)
         return list(result.scalars().all())
 
+    def claim_tasks(
+        self,
+        worker_id: str,
+        *,
+        limit: int,
+        lease_seconds: float,
+        type_budgets: Optional[Mapping[TaskType, int]] = None,
+    ) -> List[Task]:
+        """Atomically claim pending or retry tasks for a worker.
+
+        One UPDATE moves the next claimable tasks to RUNNING under a lease
+        owned by `worker_id`. Its WHERE re-checks the status, so when several
+        workers claim at the same time each task goes to exactly one of them.
+
+        Scheduling (all in the claim query): each task type is its own queue
+        with its own budget. Within a queue, higher priority goes first, then
+        users take turns: a user's n-th queued task gets fair-share slot
+        n + (tasks of that user and type running or started within
+        ``task_fair_share_window_seconds``), and lower slots go first. So ten
+        uploads from one user interleave with everyone else's tasks instead of
+        running ahead of them. Ties go to the oldest task.
+
+        Args:
+            worker_id: ID of the claiming worker
+            limit: Maximum number of tasks to claim
+            lease_seconds: How long the claim holds unless renewed (see renew_leases)
+            type_budgets: Maximum number of tasks to claim per task type (types not
+                listed are only bounded by `limit`)
+
+        Returns:
+            Claimed tasks, in scheduling order
+        """
+        if limit <= 0:
+            return []
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=lease_seconds)
+
+        claimable = Task.status.in_(CLAIMABLE_STATUSES)
+        type_budgets = type_budgets or {}
+
+        queued = self._share_slots(now, claimable)
+        exhausted = [task_type for task_type, budget in type_budgets.items() if budget <= 0]
+        if exhausted:
+            queued = queued.where(Task.task_type.notin_(exhausted))
+        queued = queued.subquery()
+
+        budgets = {task_type: budget for task_type, budget in type_budgets.items() if budget > 0}
+        if budgets:
+            # At most its budget from the head of each type's queue
+            ranked = select(
+                queued,
+                func.row_number().over(partition_by=queued.c.task_type, order_by=_schedule_order(queued)).label("type_rank"),
+            ).subquery()
+            candidate_ids = (
+                select(ranked.c.id)
+                .where(ranked.c.type_rank <= case(
+                    *((ranked.c.task_type == task_type, budget) for task_type, budget in budgets.items()),
+                    else_=limit,
+                ))
+                .order_by(*_schedule_order(ranked))
+                .limit(limit)
+            )
+        else:
+            candidate_ids = select(queued.c.id).order_by(*_schedule_order(queued)).limit(limit)
+
+        stmt = (
+            update(Task)
+            .where(Task.id.in_(candidate_ids.scalar_subquery()), claimable)
+            .values(
+                status=TaskStatus.RUNNING,
+                worker_id=worker_id,
+                lease_expires_at=lease_until,
+                started_at=func.coalesce(Task.started_at, now),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if self.db.get_bind().dialect.update_returning:
+            claimed_ids = list(self.db.scalars(stmt.returning(Task.id)))
+        else:
+            # No RETURNING (SQLite < 3.35): this claim's lease timestamp identifies its rows
+            self.db.execute(stmt)
+            claimed_ids = list(self.db.scalars(
+                select(Task.id).where(Task.worker_id == worker_id, Task.lease_expires_at == lease_until)
+            ))
+        self.db.commit()
+        if not claimed_ids:
+            return []
+
+        # Same slots as in the claim: the claimed tasks are the head of each user's
+        # queue, and only those the claim itself started were not counted as served
+        claimed = self._share_slots(
+            now, Task.id.in_(claimed_ids), not_served=and_(Task.id.in_(claimed_ids), Task.started_at == now)
+        ).subquery()
+        tasks = self.db.scalars(
+            select(Task)
+            .join(claimed, claimed.c.id == Task.id)
+            .order_by(*_schedule_order(claimed))
+            .execution_options(populate_existing=True)
+        ).all()
+        logger.info(
+            f"Worker {worker_id} claimed {len(tasks)} tasks: {[task.id for task in tasks]}",
+            extra={"worker_id": worker_id, "task_ids": claimed_ids},
+        )
+        return list(tasks)
+
+    def _share_slots(self, now: datetime, queued_filter, not_served=None):
+        """(id, task_type, priority, created_at, share_slot) of the tasks matching `queued_filter`.
+
+        share_slot is the task's turn among its user's queued tasks of that type
+        plus the user's recent service (running or started within the fair-share
+        window, except tasks matching `not_served`).
+        """
+        served_since = now - timedelta(seconds=settings.task_fair_share_window_seconds)
+        served_filter = or_(Task.status == TaskStatus.RUNNING, Task.started_at >= served_since)
+        if not_served is not None:
+            served_filter = and_(served_filter, ~not_served)
+        # Recent service per user and type (decays as the window moves on)
+        served = (
+            select(Task.user_id, Task.task_type, func.count().label("served"))
+            .where(served_filter)
+            .group_by(Task.user_id, Task.task_type)
+            .subquery()
+        )
+        user_turn = func.row_number().over(
+            partition_by=(Task.task_type, Task.user_id),
+            order_by=(Task.priority.desc(), Task.created_at, Task.id),
+        )
+        return (
+            select(
+                Task.id,
+                Task.task_type,
+                Task.priority,
+                Task.created_at,
+                (user_turn + func.coalesce(served.c.served, 0)).label("share_slot"),
+            )
+            .outerjoin(served, and_(served.c.user_id == Task.user_id, served.c.task_type == Task.task_type))
+            .where(queued_filter)
+        )
+
+    def renew_leases(self, worker_id: str, task_ids: Collection[int], lease_seconds: float) -> List[int]:
+        """Extend the leases `worker_id` holds on running tasks (heartbeat).
+
+        Tasks cancelled while running are still renewed, since the worker is
+        still running them, but are reported as lost.
+
+        Args:
+            worker_id: ID of the worker holding the leases
+            task_ids: Tasks the worker is still running
+            lease_seconds: New lease duration from now
+
+        Returns:
+            IDs of the tasks whose lease the worker no longer holds (reclaimed or cancelled)
+        """
+        if not task_ids:
+            return []
+        owned = and_(Task.id.in_(list(task_ids)), Task.worker_id == worker_id, Task.status == TaskStatus.RUNNING)
+        cancelled = and_(
+            Task.id.in_(list(task_ids)),
+            Task.worker_id == worker_id,
+            Task.status == TaskStatus.CANCELLED,
+            Task.lease_expires_at.isnot(None),
+        )
+        self.db.execute(
+            update(Task)
+            .where(or_(owned, cancelled))
+            .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        renewed = set(self.db.scalars(select(Task.id).where(owned)))
+        self.db.commit()
+        return [task_id for task_id in task_ids if task_id not in renewed]
+
+    def finish_leased_task(
+        self,
+        task_id: int,
+        worker_id: str,
+        attempt: int,
+        status: TaskStatus,
+        *,
+        error: Optional[str] = None,
+        result: Optional[Dict[str, Any]] = None,
+        metadata_update: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """Record the outcome of a task attempt, if `worker_id` still holds its lease.
+
+        The write is a single UPDATE conditioned on the lease (worker, RUNNING,
+        retry_count of the attempt), so a task that was cancelled, or reclaimed
+        and claimed again meanwhile, is left untouched. A task cancelled during
+        the attempt only has its lease released.
+
+        Args:
+            task_id: Task ID
+            worker_id: ID of the worker that ran the attempt
+            attempt: retry_count of the task when it was claimed
+            status: COMPLETED, FAILED, or RETRY to queue the task again
+            error: Error message if status is FAILED
+            result: Result data if status is COMPLETED
+            metadata_update: Additional metadata to merge
+
+        Returns:
+            True if the outcome was recorded, False if the lease was lost
+        """
+        values: Dict[str, Any] = {"status": status, "lease_expires_at": None}
+        if status == TaskStatus.RETRY:
+            values.update(retry_count=Task.retry_count + 1, error=None)
+        else:
+            values["completed_at"] = datetime.utcnow()
+        if error is not None:
+            values["error"] = error
+        if result is not None:
+            values["result"] = result
+        if metadata_update:
+            # Only the lease holder writes metadata, so merging into a prior read is safe
+            metadata = self.db.scalar(select(Task.task_metadata).where(Task.id == task_id)) or {}
+            values["task_metadata"] = {**metadata, **metadata_update}
+
+        attempt_of_worker = and_(Task.id == task_id, Task.worker_id == worker_id, Task.retry_count == attempt)
+        recorded = self.db.execute(
+            update(Task)
+            .where(attempt_of_worker, Task.status == TaskStatus.RUNNING)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not recorded:
+            # Cancelled meanwhile: the worker is done with the task's file
+            self.db.execute(
+                update(Task)
+                .where(attempt_of_worker, Task.status == TaskStatus.CANCELLED)
+                .values(lease_expires_at=None)
+                .execution_options(synchronize_session=False)
+            )
+        self.db.commit()
+
+        if recorded and status == TaskStatus.RETRY:
+            notify_task_queued()
+        return bool(recorded)
+
+    def reclaim_expired_tasks(self) -> int:
+        """Return running tasks whose lease expired (their worker died) to the queue.
+
+        A reclaimed task counts as a failed attempt: it goes to RETRY while it
+        has retries left and to FAILED otherwise, so a task that keeps killing
+        its worker is not retried forever. Running tasks without a lease
+        (claimed before leases existed) are left alone.
+
+        Returns:
+            Number of tasks reclaimed
+        """
+        now = datetime.utcnow()
+        expired = and_(Task.status == TaskStatus.RUNNING, Task.lease_expires_at < now)
+        error = "Worker lease expired before the task finished"
+        retried = self.db.execute(
+            update(Task)
+            .where(expired, Task.retry_count < Task.max_retries)
+            .values(status=TaskStatus.RETRY, retry_count=Task.retry_count + 1, lease_expires_at=None, error=error)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        failed = self.db.execute(
+            update(Task)
+            .where(expired)
+            .values(status=TaskStatus.FAILED, completed_at=now, lease_expires_at=None, error=error)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        self.db.commit()
+
+        if retried:
+            notify_task_queued()
+        if retried or failed:
+            logger.warning(f"Reclaimed tasks with expired leases ({retried} to retry, {failed} failed)")
+        return retried + failed
+
+    def cleanup_blobs(self, grace_seconds: float) -> int:
+        """Release the files of terminal tasks and delete files no task references.
+
+        A terminal task keeps its files while a worker still holds its lease
+        (cancelled while running, see cancel_task).
+
+        Args:
+            grace_seconds: Files younger than this are kept even if unreferenced
+                (uploads whose task is being created)
+
+        Returns:
+            Number of files deleted
+        """
+        released = and_(
+            Task.status.in_(TERMINAL_STATUSES),
+            or_(Task.lease_expires_at.is_(None), Task.lease_expires_at < datetime.utcnow()),
+        )
+        self.db.execute(
+            delete(TaskBlob)
+            .where(TaskBlob.task_id.in_(select(Task.id).where(released)))
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        referenced = set(self.db.scalars(select(TaskBlob.sha256).distinct()))
+        removed = blob_store.remove_unreferenced(referenced, min_age_seconds=grace_seconds)
+        if removed:
+            logger.info(f"Deleted {removed} unreferenced task files ({len(referenced)} still referenced)")
+        return removed
+
     def get_task_stats(self, user_id: Optional[int] = None) -> Dict[str, Any]:
         """Get task statistics.
 
@@ -2,18 +2,23 @@
 
 from __future__ import annotations
 
-import asyncio
 import logging
+import os
 import signal
+import socket
 import sys
+import threading
 import time
+import uuid
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, Optional
-
-from sqlalchemy.orm import Session
+from functools import partial
+from typing import Any, Dict, Mapping, Optional
 
+from backend.app.core.config import settings
 from backend.app.core.database import SessionLocal
 from backend.app.tasks.models import Task, TaskStatus, TaskType
+from backend.app.tasks.notify import TaskNotificationListener
 from backend.app.tasks.service import TaskService
 from backend.app.tasks.executors import (
     BiddingAnalysisExecutor,
@@ -23,16 +28,44 @@ from backend.app.tasks.executors import (
 
 logger = logging.getLogger(__name__)
 
+EXECUTORS = {
+    TaskType.BIDDING_ANALYSIS: BiddingAnalysisExecutor,
+    TaskType.WORKLOAD_ANALYSIS: WorkloadAnalysisExecutor,
+    TaskType.COST_ESTIMATION: CostEstimationExecutor,
+}
+
+
+def execute_task(task_type: TaskType, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute a task payload with the executor for its type.
+
+    Module-level (and given plain data rather than a Task) so a process pool
+    can run it.
+
+    Raises:
+        Exception: If task execution fails
+    """
+    executor_cls = EXECUTORS.get(task_type)
+    if executor_cls is None:
+        raise ValueError(f"Unknown task type: {task_type}")
+    return executor_cls().execute(payload)
+
 
 class TaskWorker:
     """Background worker that polls database for pending tasks and executes them.
 
     This worker runs in a separate process/thread and continuously:
-    1. Polls database for pending/retry tasks
-    2. Executes tasks using appropriate executors
-    3. Updates task status and results
+    1. Atomically claims pending/retry tasks under a lease
+    2. Dispatches them to a bounded thread/process pool, within per-type limits
+    3. Updates task status and results as each task finishes
     4. Handles retries on failure
-    5. Gracefully shuts down on signals
+    5. Gracefully shuts down on signals, letting in-flight tasks finish
+
+    Polling continues while tasks run, so a long bidding analysis does not
+    hold up workload or costing tasks behind it. New tasks wake the worker
+    immediately (see tasks.notify); polling is only a fallback, backing off
+    from poll_interval to max_poll_interval while the queue is empty. A
+    heartbeat thread renews the leases of running tasks and reclaims tasks
+    whose worker died, so any number of workers can share one queue.
     """
 
     def __init__(
@@ -40,20 +73,54 @@ class TaskWorker:
         poll_interval: float = 2.0,
         batch_size: int = 5,
         max_consecutive_errors: int = 10,
+        max_concurrency: int = 8,
+        type_limits: Optional[Mapping[str, int]] = None,
+        pool: str = "thread",
+        lease_seconds: float = 120.0,
+        heartbeat_interval: float = 30.0,
+        max_poll_interval: float = 30.0,
+        blob_cleanup_interval: float = 600.0,
+        blob_grace_seconds: float = 3600.0,
     ) -> None:
         """Initialize worker.
 
         Args:
-            poll_interval: Seconds to wait between polling cycles
-            batch_size: Maximum number of tasks to process per cycle
+            poll_interval: Seconds to wait between polling cycles (when busy or just woken)
+            batch_size: Maximum number of tasks to dispatch per cycle
             max_consecutive_errors: Stop worker after this many consecutive errors
+            max_concurrency: Maximum number of tasks running at once
+            type_limits: Maximum number of running tasks per task type (value or TaskType)
+            pool: "thread" (I/O-bound executors) or "process"
+            lease_seconds: How long a claim holds without a heartbeat
+            heartbeat_interval: Seconds between lease renewals / reclaim passes
+            max_poll_interval: Longest wait between polls while the queue stays empty
+            blob_cleanup_interval: Seconds between removals of unreferenced task files (0 disables)
+            blob_grace_seconds: Minimum age of a task file before it may be removed
         """
         self.poll_interval = poll_interval
         self.batch_size = batch_size
         self.max_consecutive_errors = max_consecutive_errors
+        self.max_concurrency = max(max_concurrency, 1)
+        self.type_limits = {TaskType(task_type): limit for task_type, limit in (type_limits or {}).items()}
+        self.pool = pool
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.max_poll_interval = max(max_poll_interval, poll_interval)
+        self.blob_cleanup_interval = blob_cleanup_interval
+        self.blob_grace_seconds = blob_grace_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
 
         self._running = False
         self._consecutive_errors = 0
+        self._executor: Optional[Executor] = None
+        # task id -> type of every dispatched task that has not finished yet
+        self._in_flight: Dict[int, TaskType] = {}
+        self._lock = threading.Lock()
+        # Set when a task is queued, a slot frees up or on shutdown, to cut the poll sleep short
+        self._wakeup = threading.Event()
+        self._listener = TaskNotificationListener(self._wakeup)
+        self._heartbeat_stop = threading.Event()
+        self._last_blob_cleanup = time.monotonic()
 
         # Register signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -64,6 +131,12 @@ class TaskWorker:
         signal_name = signal.Signals(signum).name
         logger.info(f"Received {signal_name}, shutting down gracefully...")
         self._running = False
+        self._wakeup.set()
+
+    def _create_executor(self) -> Executor:
+        if self.pool == "process":
+            return ProcessPoolExecutor(max_workers=self.max_concurrency)
+        return ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="task-worker")
 
     def start(self) -> None:
         """Start the worker loop.
@@ -71,80 +144,177 @@ class TaskWorker:
         This method blocks until the worker is stopped via signal or error.
         """
         logger.info(
-            f"Starting task worker (poll_interval={self.poll_interval}s, batch_size={self.batch_size})"
+            f"Starting task worker (poll_interval={self.poll_interval}s, batch_size={self.batch_size}, "
+            f"{self.pool} pool of {self.max_concurrency}, type_limits={self._type_limits_display()}, "
+            f"worker_id={self.worker_id}, lease={self.lease_seconds}s)"
         )
         self._running = True
         self._consecutive_errors = 0
+        self._executor = self._create_executor()
+        self._heartbeat_stop.clear()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="task-worker-heartbeat", daemon=True)
+        heartbeat.start()
+        self._listener.start()
+        idle_interval = self.poll_interval
 
-        while self._running:
-            try:
-                processed = self._process_batch()
+        try:
+            while self._running:
+                try:
+                    self._wakeup.clear()
+                    processed = self._process_batch()
+
+                    # Reset error counter on successful batch
+                    if processed >= 0:
+                        self._consecutive_errors = 0
+
+                    # Poll again right away while tasks are waiting and slots are free;
+                    # otherwise sleep until woken (task queued / slot freed) or the next
+                    # fallback poll, which backs off while the queue stays empty
+                    if processed:
+                        idle_interval = self.poll_interval
+                    if processed == 0 or self._free_slots() == 0:
+                        if self._wakeup.wait(idle_interval):
+                            idle_interval = self.poll_interval
+                        elif processed == 0:
+                            idle_interval = min(idle_interval * 2, self.max_poll_interval)
+
+                except KeyboardInterrupt:
+                    logger.info("Worker interrupted by user")
+                    break
 
-                # Reset error counter on successful batch
-                if processed >= 0:
-                    self._consecutive_errors = 0
+                except Exception as exc:
+                    self._consecutive_errors += 1
+                    logger.error(
+                        f"Worker batch error ({self._consecutive_errors}/{self.max_consecutive_errors}): {exc}",
+                        exc_info=True,
+                    )
 
-                # Sleep before next poll
-                time.sleep(self.poll_interval)
+                    if self._consecutive_errors >= self.max_consecutive_errors:
+                        logger.critical("Max consecutive errors reached, stopping worker")
+                        break
 
-            except KeyboardInterrupt:
-                logger.info("Worker interrupted by user")
-                break
+                    # Back off on errors
+                    time.sleep(min(self.poll_interval * 2, 10.0))
+        finally:
+            self._listener.stop()
+            in_flight = self.stats()["in_flight"]
+            if in_flight:
+                logger.info(f"Waiting for {in_flight} in-flight tasks to finish...")
+            self._executor.shutdown(wait=True)
+            # Leases are renewed until the last in-flight task has finished
+            self._heartbeat_stop.set()
+            heartbeat.join()
 
-            except Exception as exc:
-                self._consecutive_errors += 1
-                logger.error(
-                    f"Worker batch error ({self._consecutive_errors}/{self.max_consecutive_errors}): {exc}",
-                    exc_info=True,
-                )
+        logger.info("Task worker stopped")
 
-                if self._consecutive_errors >= self.max_consecutive_errors:
-                    logger.critical("Max consecutive errors reached, stopping worker")
-                    break
+    def _heartbeat_loop(self) -> None:
+        """Renew the leases of in-flight tasks, reclaim expired ones and clean up task files, until stopped."""
+        while not self._heartbeat_stop.wait(self.heartbeat_interval):
+            try:
+                self._heartbeat()
+            except Exception as exc:
+                logger.error(f"Task heartbeat failed: {exc}", exc_info=True)
 
-                # Back off on errors
-                time.sleep(min(self.poll_interval * 2, 10.0))
+    def _heartbeat(self) -> None:
+        with self._lock:
+            task_ids = list(self._in_flight)
+        db = SessionLocal()
+        try:
+            task_service = TaskService(db)
+            lost = task_service.renew_leases(self.worker_id, task_ids, self.lease_seconds)
+            for task_id in lost:
+                # Reclaimed by another worker or cancelled; its result will be discarded
+                logger.warning(f"Lost lease on task {task_id}", extra={"task_id": task_id, "worker_id": self.worker_id})
+            task_service.reclaim_expired_tasks()  # wakes the workers if tasks were requeued
+            if self.blob_cleanup_interval > 0 and time.monotonic() - self._last_blob_cleanup >= self.blob_cleanup_interval:
+                self._last_blob_cleanup = time.monotonic()
+                task_service.cleanup_blobs(self.blob_grace_seconds)
+        finally:
+            db.close()
 
-        logger.info("Task worker stopped")
+    def stats(self) -> Dict[str, Any]:
+        """In-flight task counts (total and per type) against the configured limits."""
+        with self._lock:
+            by_type: Dict[str, int] = {}
+            for task_type in self._in_flight.values():
+                by_type[task_type.value] = by_type.get(task_type.value, 0) + 1
+            in_flight = len(self._in_flight)
+        return {
+            "worker_id": self.worker_id,
+            "in_flight": in_flight,
+            "max_concurrency": self.max_concurrency,
+            "by_type": by_type,
+            "type_limits": self._type_limits_display(),
+        }
+
+    def _type_limits_display(self) -> Dict[str, int]:
+        return {task_type.value: limit for task_type, limit in self.type_limits.items()}
+
+    def _free_slots(self) -> int:
+        with self._lock:
+            return self.max_concurrency - len(self._in_flight)
+
+    def _running_of_type(self, task_type: TaskType) -> int:
+        with self._lock:
+            return sum(1 for running in self._in_flight.values() if running == task_type)
+
+    def _type_budgets(self) -> Dict[TaskType, int]:
+        """How many more tasks of each limited type may start now."""
+        return {
+            task_type: max(limit - self._running_of_type(task_type), 0)
+            for task_type, limit in self.type_limits.items()
+        }
 
     def _process_batch(self) -> int:
-        """Process one batch of pending tasks.
+        """Dispatch one batch of pending tasks to the pool.
 
         Returns:
-            Number of tasks processed (can be 0)
+            Number of tasks dispatched (can be 0)
         """
+        free_slots = self._free_slots()
+        if free_slots <= 0:
+            logger.debug("All worker slots busy")
+            return 0
+
         db = SessionLocal()
         try:
             task_service = TaskService(db)
 
-            # Get pending tasks
-            tasks = task_service.get_pending_tasks(limit=self.batch_size)
+            # Claim pending tasks (no more per type than its limit still allows)
+            tasks = task_service.claim_tasks(
+                self.worker_id,
+                limit=min(self.batch_size, free_slots),
+                lease_seconds=self.lease_seconds,
+                type_budgets=self._type_budgets(),
+            )
 
             if not tasks:
                 logger.debug("No pending tasks found")
                 return 0
 
-            logger.info(f"Processing batch of {len(tasks)} tasks")
-
+            dispatched = 0
             for task in tasks:
                 try:
-                    self._process_task(task, task_service)
+                    self._dispatch_task(task, task_service)
+                    dispatched += 1
                 except Exception as exc:
                     logger.error(
-                        f"Failed to process task {task.id}: {exc}",
+                        f"Failed to dispatch task {task.id}: {exc}",
                         exc_info=True,
                         extra={"task_id": task.id, "task_type": task.task_type},
                     )
-                    # Individual task errors don't count as worker errors
-                    pass
+                    # Individual task errors don't count as worker errors; the
+                    # claimed task is reclaimed once its lease expires
 
-            return len(tasks)
+            if dispatched:
+                logger.info(f"Dispatched {dispatched} tasks ({self.stats()})")
+            return dispatched
 
         finally:
             db.close()
 
-    def _process_task(self, task: Task, task_service: TaskService) -> None:
-        """Process a single task.
+    def _dispatch_task(self, task: Task, task_service: TaskService) -> None:
+        """Submit a claimed (RUNNING) task to the pool.
 
         Args:
             task: Task to process
@@ -158,95 +328,131 @@ class TaskWorker:
             extra={"task_id": task_id, "task_type": task_type, "retry_count": task.retry_count},
         )
 
-        # Update status to RUNNING
-        task_service.update_task_status(task_id, TaskStatus.RUNNING)
-
-        start_time = time.time()
+        with self._lock:
+            self._in_flight[task_id] = task_type
+        try:
+            future = self._executor.submit(execute_task, task_type, task.payload)
+        except Exception:
+            with self._lock:
+                self._in_flight.pop(task_id, None)
+            raise
+        future.add_done_callback(
+            partial(self._on_task_done, task_id, task_type, task.retry_count, task.max_retries, time.time())
+        )
 
+    def _on_task_done(
+        self, task_id: int, task_type: TaskType, attempt: int, max_retries: int, start_time: float, future: Future
+    ) -> None:
+        """Record the outcome of a finished task (runs on a pool thread)."""
         try:
-            # Execute task based on type
-            result = self._execute_task(task)
+            db = SessionLocal()
+            try:
+                self._complete_task(task_id, task_type, attempt, max_retries, start_time, future, TaskService(db))
+            finally:
+                db.close()
+        except Exception as exc:
+            logger.error(
+                f"Failed to record outcome of task {task_id}: {exc}",
+                exc_info=True,
+                extra={"task_id": task_id, "task_type": task_type},
+            )
+        finally:
+            with self._lock:
+                self._in_flight.pop(task_id, None)
+            self._wakeup.set()
+
+    def _complete_task(
+        self,
+        task_id: int,
+        task_type: TaskType,
+        attempt: int,
+        max_retries: int,
+        start_time: float,
+        future: Future,
+        task_service: TaskService,
+    ) -> None:
+        """Update status, result and retries of a finished task.
 
-            duration_ms = (time.time() - start_time) * 1000
+        Args:
+            task_id: ID of the finished task
+            task_type: Its type
+            attempt: retry_count of the task when it was claimed
+            max_retries: Its max_retries
+            start_time: time.time() at dispatch
+            future: Pool future holding the result or the exception
+            task_service: TaskService instance for updates
+        """
+        duration_ms = (time.time() - start_time) * 1000
+        exc = future.exception()
 
+        # Each write below only applies while this worker still holds the lease
+        if exc is None:
             # Update status to COMPLETED
-            task_service.update_task_status(
+            recorded = task_service.finish_leased_task(
                 task_id,
+                self.worker_id,
+                attempt,
                 TaskStatus.COMPLETED,
-                result=result,
+                result=future.result(),
                 metadata_update={
                     "duration_ms": round(duration_ms, 2),
                     "completed_at_timestamp": datetime.utcnow().isoformat(),
                 },
             )
-
-            logger.info(
-                f"Task {task_id} completed successfully ({duration_ms:.0f}ms)",
-                extra={
-                    "task_id": task_id,
-                    "task_type": task_type,
-                    "duration_ms": duration_ms,
-                },
-            )
-
-        except Exception as exc:
-            duration_ms = (time.time() - start_time) * 1000
-            error_msg = str(exc)
-
-            logger.error(
-                f"Task {task_id} failed: {error_msg}",
-                exc_info=True,
-                extra={
-                    "task_id": task_id,
-                    "task_type": task_type,
-                    "error": error_msg,
-                    "duration_ms": duration_ms,
-                },
-            )
-
-            # Determine if task should retry
-            if task.can_retry:
-                logger.info(f"Task {task_id} will retry (attempt {task.retry_count + 1}/{task.max_retries})")
-                task_service.increment_retry(task_id)
-            else:
-                # Mark as FAILED
-                task_service.update_task_status(
-                    task_id,
-                    TaskStatus.FAILED,
-                    error=error_msg,
-                    metadata_update={
-                        "duration_ms": round(duration_ms, 2),
-                        "failed_at_timestamp": datetime.utcnow().isoformat(),
-                        "retry_exhausted": True,
+            if recorded:
+                logger.info(
+                    f"Task {task_id} completed successfully ({duration_ms:.0f}ms)",
+                    extra={
+                        "task_id": task_id,
+                        "task_type": task_type,
+                        "duration_ms": duration_ms,
                     },
                 )
+            else:
+                self._log_lost_lease(task_id, task_type)
+            return
+
+        error_msg = str(exc)
+
+        logger.error(
+            f"Task {task_id} failed: {error_msg}",
+            exc_info=exc,
+            extra={
+                "task_id": task_id,
+                "task_type": task_type,
+                "error": error_msg,
+                "duration_ms": duration_ms,
+            },
+        )
 
-    def _execute_task(self, task: Task) -> Dict[str, Any]:
-        """Execute task based on type.
-
-        Args:
-            task: Task to execute
-
-        Returns:
-            Task result dictionary
-
-        Raises:
-            Exception: If task execution fails
-        """
-        if task.task_type == TaskType.BIDDING_ANALYSIS:
-            executor = BiddingAnalysisExecutor()
-            return executor.execute(task.payload)
-
-        elif task.task_type == TaskType.WORKLOAD_ANALYSIS:
-            executor = WorkloadAnalysisExecutor()
-            return executor.execute(task.payload)
-
-        elif task.task_type == TaskType.COST_ESTIMATION:
-            executor = CostEstimationExecutor()
-            return executor.execute(task.payload)
-
+        # Determine if task should retry
+        if attempt < max_retries:
+            recorded = task_service.finish_leased_task(task_id, self.worker_id, attempt, TaskStatus.RETRY)
+            if recorded:
+                logger.info(f"Task {task_id} will retry (attempt {attempt + 1}/{max_retries})")
         else:
-            raise ValueError(f"Unknown task type: {task.task_type}")
+            # Mark as FAILED
+            recorded = task_service.finish_leased_task(
+                task_id,
+                self.worker_id,
+                attempt,
+                TaskStatus.FAILED,
+                error=error_msg,
+                metadata_update={
+                    "duration_ms": round(duration_ms, 2),
+                    "failed_at_timestamp": datetime.utcnow().isoformat(),
+                    "retry_exhausted": True,
+                },
+            )
+        if not recorded:
+            self._log_lost_lease(task_id, task_type)
+
+    def _log_lost_lease(self, task_id: int, task_type: TaskType) -> None:
+        # A task that was cancelled, or reclaimed and handed to another worker, has moved on without us
+        logger.warning(
+            f"Discarding outcome of task {task_id}: no longer leased by this worker",
+            extra={"task_id": task_id, "task_type": task_type, "worker_id": self.worker_id},
+        )
 
 
 def run_worker() -> None:
@@ -260,9 +466,17 @@ def run_worker() -> None:
     logger.info("Initializing task worker...")
 
     worker = TaskWorker(
-        poll_interval=2.0,
-        batch_size=5,
+        poll_interval=settings.task_worker_poll_interval_seconds,
+        batch_size=settings.task_worker_batch_size,
         max_consecutive_errors=10,
+        max_concurrency=settings.task_worker_max_concurrency,
+        type_limits=settings.task_worker_type_limits,
+        pool=settings.task_worker_pool,
+        lease_seconds=settings.task_lease_seconds,
+        heartbeat_interval=settings.task_heartbeat_interval_seconds,
+        max_poll_interval=settings.task_worker_max_poll_interval_seconds,
+        blob_cleanup_interval=settings.task_blob_cleanup_interval_seconds,
+        blob_grace_seconds=settings.task_blob_grace_seconds,
     )
 
     try:
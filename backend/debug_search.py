@@ -17,7 +17,7 @@ def test_search():
     print("--- Testing Contracts Search ---")
     try:
         params = schemas.ContractSearchParams(q="", limit=5)
-        results, total = service.search_contracts(db, params, user)
+        results, total, _ = service.search_contracts(db, params, user)
         print(f"Contracts Found: {total}")
         if results:
             print(f"Sample Contract: {results[0]['contract_title']}")
@@ -31,7 +31,7 @@ def test_search():
     print("\n--- Testing Assets (IP) Search ---")
     try:
         params = schemas.AssetSearchParams(q="", limit=5, category="intellectual_property")
-        results, total = service.search_assets(db, params, user)
+        results, total, _ = service.search_assets(db, params, user)
         print(f"IP Assets Found: {total}")
         if results:
             print(f"Sample IP: {results[0]['qualification_name']}")
@@ -43,7 +43,7 @@ def test_search():
     print("\n--- Testing Qualifications Search ---")
     try:
         params = schemas.QualificationSearchParams(q="", limit=5)
-        results, total = service.search_qualifications(db, params, user)
+        results, total, _ = service.search_qualifications(db, params, user)
         print(f"Quals Found: {total}")
         if results:
             print(f"Sample Qual: {results[0]['qualification_name']}")
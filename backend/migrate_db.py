@@ -12,7 +12,7 @@ from pathlib import Path
 # Add backend to Python path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from backend.app.core.database import Base, engine
+from backend.app.core.database import Base, _ensure_task_columns, engine
 from backend.app.auth.models import User
 from backend.app.tasks.models import Task
 
@@ -38,6 +38,8 @@ def migrate_db() -> None:
         # Create all tables
         logger.info("Creating tables...")
         Base.metadata.create_all(bind=engine)
+        # Columns added to existing tables since they were created
+        _ensure_task_columns()
 
         logger.info("✓ Database migration completed successfully")
 
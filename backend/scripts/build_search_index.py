@@ -0,0 +1,32 @@
+"""Build or rebuild the shadow search indexes in data/contracts_new.db.
+
+Usage:
+    python -m backend.scripts.build_search_index            # create missing indexes
+    python -m backend.scripts.build_search_index --rebuild  # drop and rebuild everything
+
+Once built, triggers keep the indexes in sync with harvester writes, so this
+only needs to run after deployment or if the index is suspected to be stale.
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Add repo root to sys.path to allow imports
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from backend.app.search import indexing
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rebuild", action="store_true", help="Drop and rebuild all search indexes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    indexing.build_search_indexes(rebuild=args.rebuild)
+    print("Search indexes are up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 from sqlalchemy import func, text
-from backend.app.core.database import ContractsSessionLocal
+from sqlalchemy.orm import Session
+from backend.app.core.database import create_contracts_engine
 from backend.app.search.employee_models import EmployeeCertificate
 
 def deduplicate():
-    db = ContractsSessionLocal()
+    # The shared contracts engine is read-only; this script deletes rows
+    db = Session(bind=create_contracts_engine(read_only=False))
     try:
         print("Starting deduplication...")
         # Find duplicates: group by employee_id, certificate_name, count > 1
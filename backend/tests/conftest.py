@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import os
+import tempfile
+
+import pytest
+
+# Importing backend.app runs init_db() and ensure_search_schema(); keep both databases
+# out of the working tree. The contracts path does not exist, so the schema pass is skipped.
+_TEST_DATA_DIR = tempfile.mkdtemp(prefix="sa-tests-")
+os.environ.setdefault("SA_DATABASE_URL", f"sqlite:///{_TEST_DATA_DIR}/sales_assistant.db")
+os.environ.setdefault("SA_CONTRACTS_DB_PATH", f"{_TEST_DATA_DIR}/contracts_new.db")
+# Queued-task notifications must not wake workers of a running dev server
+os.environ.setdefault("SA_TASK_NOTIFY_DIR", f"{_TEST_DATA_DIR}/task-notify")
+
+
+@pytest.fixture()
+def task_sessions(tmp_path):
+    """Session factory on a fresh main database (WAL, like the app's), for tasks tests."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session, sessionmaker
+
+    from backend.app.core.database import Base, _apply_sqlite_pragmas
+    from backend.app.auth import models as auth_models  # noqa: F401
+    from backend.app.tasks import models as task_models  # noqa: F401
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    _apply_sqlite_pragmas(engine, wal=True)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, expire_on_commit=False, class_=Session)
+    engine.dispose()
+
+
+@pytest.fixture()
+def task_blobs(tmp_path, monkeypatch):
+    """The task blob store, rooted in a temporary directory."""
+    from backend.app.tasks.blobs import blob_store
+
+    monkeypatch.setattr(blob_store, "root", tmp_path / "blobs")
+    return blob_store
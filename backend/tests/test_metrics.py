@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import pytest
+
+from backend.app.core.metrics import _percentile
+
+
+@pytest.mark.parametrize(
+    "fraction, expected",
+    [(0.0, 1), (0.1, 1), (0.5, 5), (0.9, 9), (0.95, 10), (0.99, 10), (1.0, 10)],
+)
+def test_percentile_is_nearest_rank(fraction, expected):
+    assert _percentile([float(value) for value in range(1, 11)], fraction) == expected
+
+
+def test_percentile_of_single_sample():
+    assert _percentile([42.0], 0.5) == 42.0
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from backend.app.core.config import settings
+from backend.app.search import schemas, service
+
+
+def test_fanout_has_one_overall_deadline(monkeypatch):
+    release = threading.Event()
+
+    def searcher(delay):
+        def search(db, params):
+            time.sleep(delay)
+            return [{"id": 1}], 1, None
+        return search
+
+    def stuck(db, params):
+        release.wait(5)
+        return [], 0, None
+
+    monkeypatch.setattr(settings, "search_fanout_timeout_seconds", 0.5)
+    monkeypatch.setattr(service, "SEARCH_ALL_ENTITIES", {
+        "contracts": (searcher(0.1), schemas.ContractSearchParams),
+        "assets": (stuck, schemas.AssetSearchParams),
+        "employees": (stuck, schemas.EmployeeSearchParams),
+    })
+
+    started = time.monotonic()
+    try:
+        result = service.search_all(None, "华为", 5)
+    finally:
+        release.set()
+    elapsed = time.monotonic() - started
+
+    # Two stuck entities share the deadline instead of waiting for it one after another
+    assert elapsed < 0.9
+    sections = result["sections"]
+    assert sections["contracts"] == {"total": 1, "results": [{"id": 1}], "next_cursor": None, "error": None}
+    assert sections["assets"]["error"] == "timeout"
+    assert sections["employees"]["error"] == "timeout"
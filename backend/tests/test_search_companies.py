@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.app.search import schemas, service
+from backend.app.search.cache import search_cache
+from backend.app.search.company_models import Company
+from backend.app.search.contracts_models import ContractsBase
+
+CAPITALS = {1: 500.0, 2: 5000.0, 3: None}  # 3: unparseable registered capital
+
+
+@pytest.fixture()
+def contracts_db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'contracts.db'}")
+    ContractsBase.metadata.create_all(engine)
+
+    now = datetime(2024, 1, 1)
+    with Session(engine) as db:
+        db.add_all(
+            Company(id=company_id, name=f"公司{company_id}", registered_capital_wan=capital,
+                    created_at=now, updated_at=now, normalized_at=now)
+            for company_id, capital in CAPITALS.items()
+        )
+        db.commit()
+
+    monkeypatch.setattr(service, "ContractsSessionLocal", sessionmaker(bind=engine, class_=Session))
+    search_cache.clear()
+    yield engine
+    search_cache.clear()
+    engine.dispose()
+
+
+@pytest.mark.parametrize(
+    "bounds, expected",
+    [
+        ({"capital_min": 0}, [1, 2, 3]),
+        ({"capital_min": 1000}, [2]),
+        ({"capital_max": 1000}, [1, 3]),
+        ({"capital_min": 0, "capital_max": 1000}, [1, 3]),
+    ],
+)
+def test_unparseable_capital_counts_as_zero(contracts_db, bounds, expected):
+    result = service.search_companies(None, schemas.CompanySearchParams(**bounds), None)
+
+    assert sorted(company.id for company in result["results"]) == expected
+    assert result["total"] == len(expected)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.app.common.exchange_rates import rate_provider
+from backend.app.search import indexing, schemas, service
+from backend.app.search.cache import search_cache
+from backend.app.search.contracts_models import ContractsBase, ExistingContract
+
+AMOUNTS = {
+    1: "中国人民币 500,000.00",
+    2: "美元 100,000.00",  # ¥ 700,000 at the loaded rate
+    3: "欧元 500,000.00",  # no EUR rate loaded
+    4: "待定",
+    5: "欧元 50.00",
+}
+
+
+@pytest.fixture()
+def contracts_db(tmp_path, monkeypatch):
+    """Contracts DB with one amount per currency case, normalized with only a USD rate loaded."""
+    monkeypatch.setattr(rate_provider, "rates", lambda: {"USD": 7.0})
+    engine = create_engine(f"sqlite:///{tmp_path / 'contracts.db'}")
+    ContractsBase.metadata.create_all(engine)
+
+    now = datetime(2024, 1, 1)
+    with Session(engine) as db:
+        for contract_id, amount in AMOUNTS.items():
+            db.add(ExistingContract(
+                id=contract_id, contract_number=f"HT-{contract_id}", title=f"合同{contract_id}",
+                contract_amount=amount, collected_at=now, created_at=now, updated_at=now,
+            ))
+        db.commit()
+    with engine.begin() as connection:
+        indexing.normalize_contracts(connection)
+
+    monkeypatch.setattr(service, "ContractsSessionLocal", sessionmaker(bind=engine, class_=Session))
+    search_cache.clear()
+    yield engine
+    search_cache.clear()
+    engine.dispose()
+
+
+def test_amount_range_compares_unconverted_amounts_as_written(contracts_db):
+    results, total, _ = service.search_contracts(
+        None, schemas.ContractSearchParams(min_amount=400000, max_amount=600000)
+    )
+
+    # 2 is out of range in CNY; 3 has no rate and is compared as written; 4 is unparseable
+    assert sorted(result["id"] for result in results) == [1, 3, 4]
+    assert total == 3
+
+
+def test_amount_without_rate_is_not_shown_in_cny(contracts_db):
+    results, _, _ = service.search_contracts(None, schemas.ContractSearchParams())
+    formatted = {result["id"]: result["contract_amount"] for result in results}
+
+    assert formatted[1] == "¥ 500,000.00"
+    assert formatted[2] == "$ 100,000.00（¥ 700,000.00）"
+    assert formatted[3] == "€ 500,000.00"
+    assert formatted[4] == "待定"
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.app.search import indexing, schemas, service
+from backend.app.search.cache import search_cache
+from backend.app.search.contracts_models import ContractsBase
+from backend.app.search.employee_models import Employee, EmployeeCertificate, EmployeeEducation
+
+
+@pytest.fixture()
+def contracts_db(tmp_path, monkeypatch):
+    """Small contracts DB with 150 employees, each with educations and certificates."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'contracts.db'}")
+    ContractsBase.metadata.create_all(engine)
+
+    now = datetime(2024, 1, 1)
+    with Session(engine) as db:
+        for i in range(150):
+            employee = Employee(id=i + 1, employee_no=f"E{i:04d}", name=f"员工{i}", created_at=now, updated_at=now)
+            employee.educations = [
+                EmployeeEducation(degree="本科", school="清华大学", major="计算机"),
+                EmployeeEducation(degree="硕士", school="北京大学", major="软件工程"),
+            ]
+            employee.certificates = [
+                EmployeeCertificate(certificate_name=name, certificate_no=f"{name}-{i}")
+                for name in ("PMP", "CISP", "软考高级")[: i % 3 + 1]
+            ]
+            db.add(employee)
+        db.commit()
+    with engine.begin() as connection:
+        indexing._sync_employees(connection, rebuild=True)
+
+    monkeypatch.setattr(service, "ContractsSessionLocal", sessionmaker(bind=engine, class_=Session))
+    search_cache.clear()
+    yield engine
+    search_cache.clear()
+    engine.dispose()
+
+
+def _count_queries(engine, params: schemas.EmployeeSearchParams):
+    statements = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _before)
+    try:
+        results, total, _ = service.search_employees(None, params)
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+    return results, total, len(statements)
+
+
+def test_employee_page_issues_constant_number_of_queries(contracts_db):
+    small, _, small_queries = _count_queries(contracts_db, schemas.EmployeeSearchParams(limit=10))
+    search_cache.clear()
+    page, total, page_queries = _count_queries(contracts_db, schemas.EmployeeSearchParams(limit=100))
+
+    assert total == 150
+    assert len(small) == 10
+    assert len(page) == 100
+    # Children are batch-loaded per page: no query per employee
+    assert page_queries == small_queries
+    assert page_queries <= 6
+    assert all(len(emp["educations"]) == 2 for emp in page)
+    # Most certificates first
+    assert [len(emp["certificates"]) for emp in page] == [3] * 50 + [2] * 50
+
+
+def test_replaced_employee_keeps_derived_columns(contracts_db):
+    with contracts_db.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT OR REPLACE INTO employees (id, employee_no, name, created_at, updated_at) "
+            "VALUES (3, 'E0002', '员工2', '2024-01-02', '2024-01-02')"
+        )
+        row = connection.exec_driver_sql(
+            "SELECT certificate_count, search_text FROM employees WHERE id = 3"
+        ).one()
+
+    assert row.certificate_count == 3
+    assert set(row.search_text.split("\x1f")) == {"清华大学", "北京大学", "计算机", "软件工程", "PMP", "CISP", "软考高级"}
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.app.search import indexing, names, ranking, schemas, service
+from backend.app.search.cache import search_cache
+from backend.app.search.contracts_models import ContractsBase, ExistingContract
+
+NOW = datetime(2024, 1, 1)
+CONTRACTS = [
+    # id, title, customer
+    (1, "智慧城市平台开发", "华为技术有限公司"),
+    (2, "银行核心系统运维", "招商银行股份有限公司"),
+    (3, "数据中台建设项目", "国家电网有限公司"),
+    (4, "平台开发", "腾讯科技有限公司"),
+    (5, "平台开发二期", "华为技术有限公司"),
+    (6, "ERP咨询", "Acme Corp"),
+    (7, "运维平台开发与运维服务", "招商银行股份有限公司"),
+]
+
+
+def _contract(contract_id, title, customer):
+    return ExistingContract(
+        id=contract_id, contract_number=f"HT-{contract_id:05d}", title=title, customer_name=customer,
+        project_code=f"P{contract_id:05d}", collected_at=NOW, created_at=NOW, updated_at=NOW,
+    )
+
+
+@pytest.fixture()
+def contracts_db(tmp_path, monkeypatch):
+    """Contracts DB with the full search schema built as by build_search_indexes."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'contracts.db'}")
+    ContractsBase.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all(_contract(*row) for row in CONTRACTS)
+        db.commit()
+
+    # Positive index checks are cached per process
+    monkeypatch.setattr(indexing, "_fts_available", False)
+    monkeypatch.setattr(names, "_names_available", False)
+    monkeypatch.setattr(indexing, "maintenance_engine", lambda: engine)
+    indexing.build_search_indexes(rebuild=True)
+
+    monkeypatch.setattr(service, "ContractsSessionLocal", sessionmaker(bind=engine, class_=Session))
+    search_cache.clear()
+    yield engine
+    search_cache.clear()
+    engine.dispose()
+
+
+def _search_ids(**params):
+    results, total, _ = service.search_contracts(None, schemas.ContractSearchParams(limit=100, **params))
+    assert total == len(results)
+    return [result["id"] for result in results]
+
+
+@pytest.mark.parametrize("q", ["平台开发", "运维 银行", "HT-00003", "中台", "P00006", "erp"])
+def test_fts_matches_the_like_fallback(contracts_db, monkeypatch, q):
+    with Session(contracts_db) as db:
+        assert indexing.has_contracts_fts(db)
+    with_index = _search_ids(q=q)
+    search_cache.clear()
+    monkeypatch.setattr(indexing, "has_contracts_fts", lambda db: False)
+    without_index = _search_ids(q=q)
+
+    assert with_index
+    assert sorted(with_index) == sorted(without_index)
+
+
+def test_fts_index_follows_harvester_writes(contracts_db):
+    assert _search_ids(q="安全审计") == []
+
+    with Session(contracts_db) as db:
+        db.add(_contract(8, "安全审计服务", "国家电网有限公司"))
+        db.get(ExistingContract, 3).title = "安全审计平台建设"
+        db.delete(db.get(ExistingContract, 4))
+        db.commit()
+    search_cache.clear()
+
+    assert sorted(_search_ids(q="安全审计")) == [3, 8]
+    assert 4 not in _search_ids(q="平台开发")
+
+
+
+def _page(**params):
+    results, total, _ = service.search_contracts(None, schemas.ContractSearchParams(q="平台", limit=2, **params))
+    return [result["id"] for result in results], total
+
+
+def test_result_cache_serves_other_pages_and_is_invalidated_by_writes(contracts_db):
+    first_page, total = _page()
+    hits, misses = search_cache.hits, search_cache.misses
+    second_page, _ = _page(offset=2)
+
+    # Same search, other page: served from the cached key list
+    assert (search_cache.hits, search_cache.misses) == (hits + 1, misses)
+    assert not set(first_page) & set(second_page)
+
+    with Session(contracts_db) as db:
+        db.add(_contract(9, "平台迁移", "腾讯科技有限公司"))
+        db.commit()
+
+    # The write bumped the data version: a new entry is built, without clearing anything
+    _, new_total = _page()
+    assert search_cache.misses == misses + 1
+    assert new_total == total + 1
+
+
+def test_relevance_ranks_exact_then_prefix_then_contains(contracts_db):
+    ranked = _search_ids(q="平台开发")
+
+    assert ranked[:2] == [4, 5]
+    assert sorted(ranked[2:]) == [1, 7]
+
+
+
+def test_ranking_weights_can_be_overridden(contracts_db, monkeypatch):
+    with Session(contracts_db) as db:
+        db.add(_contract(9, "华为云迁移", "腾讯科技有限公司"))
+        db.commit()
+
+    # A title prefix match outranks a customer name match...
+    assert _search_ids(q="华为")[0] == 9
+
+    # ...unless customer names weigh more (SA_SEARCH_RANKING_WEIGHTS)
+    profile = ranking._with_overrides(ranking.DEFAULT_PROFILES["contracts"], {"customer_name": 5.0})
+    monkeypatch.setitem(ranking._PROFILES, "contracts", profile)
+    search_cache.clear()
+    ranked = _search_ids(q="华为")
+
+    assert sorted(ranked[:2]) == [1, 5]
+    assert ranked[2] == 9
+
+
+def test_name_keys():
+    assert names.name_keys("华为技术 有限公司") == ("华为技术有限公司", "huaweijishuyouxiangongsi", "hwjsyxgs")
+    assert names.name_keys("Acme Corp")[2] == "ac"
+
+
+@pytest.mark.parametrize("query, distance", [("招商银行", 0), ("招商很行", 1), ("招上很行", None)])
+def test_prefix_edit_distance(query, distance):
+    assert names.prefix_edit_distance(query, "招商银行股份有限公司", names.max_edits(len(query))) == distance
+
+
+@pytest.mark.parametrize("q, expected", [
+    ("huawei", [1, 5]),
+    ("hwjs", [1, 5]),
+    ("zhaoshangyinhang", [2, 7]),
+    ("招商很行", [2, 7]),
+])
+def test_customers_are_found_by_pinyin_initials_and_typos(contracts_db, q, expected):
+    assert sorted(_search_ids(q=q)) == expected
+    search_cache.clear()
+    assert sorted(_search_ids(customer=q)) == expected
+
+
+def test_name_index_picks_up_new_names(contracts_db):
+    with Session(contracts_db) as db:
+        db.add(_contract(9, "短视频平台运维", "字节跳动有限公司"))
+        db.commit()
+    indexing.build_search_indexes()
+
+    assert _search_ids(q="zjtd") == [9]
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import base64
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.app import app
+from backend.app.core import dependencies
+from backend.app.search import schemas, service
+from backend.app.search.cache import search_cache
+from backend.app.search.contracts_models import ContractsBase, ExistingContract
+from backend.app.search.pagination import (
+    InvalidCursorError,
+    after_clause,
+    decode_cursor,
+    encode_cursor,
+    order_clauses,
+)
+
+TITLES = ["平台开发", "智慧城市平台开发", "银行核心系统运维", "数据中台建设项目"]
+
+
+@pytest.fixture()
+def contracts_db(tmp_path, monkeypatch):
+    """80 contracts with repeated titles and signing dates, some undated."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'contracts.db'}")
+    ContractsBase.metadata.create_all(engine)
+
+    rng = random.Random(7)
+    now = datetime(2024, 1, 1)
+    with Session(engine) as db:
+        for contract_id in range(1, 81):
+            signed = None if contract_id % 9 == 0 else date(2020, 1, 1) + timedelta(days=rng.randint(0, 5) * 30)
+            db.add(ExistingContract(
+                id=contract_id, contract_number=f"HT-{contract_id}", title=rng.choice(TITLES),
+                signed_date=signed, collected_at=now, created_at=now, updated_at=now, normalized_at=now,
+            ))
+        db.commit()
+
+    monkeypatch.setattr(service, "ContractsSessionLocal", sessionmaker(bind=engine, class_=Session))
+    search_cache.clear()
+    yield engine
+    search_cache.clear()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("values", [
+    [3, "平台开发", None, 1.5, True],
+    ["2024-01-01", 42],
+    [],
+])
+def test_cursor_round_trip(values):
+    cursor = encode_cursor(values)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, len(values)) == values
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    encode_cursor([1, 2])[:-3],
+    base64.urlsafe_b64encode(b'{"id": 1}').decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+    encode_cursor([1, 2, 3]),
+])
+def test_tampered_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, 2)
+
+
+def test_after_clause_follows_sqlite_null_ordering():
+    metadata = MetaData()
+    rows = Table("rows", metadata, Column("id", Integer, primary_key=True), Column("a", String), Column("b", Integer))
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    rng = random.Random(3)
+    values = [
+        {"id": row_id, "a": rng.choice(["x", "y", None]), "b": rng.choice([1, 2, None])}
+        for row_id in range(1, 61)
+    ]
+    sort_keys = [(rows.c.a, True), (rows.c.b, False), (rows.c.id, False)]
+    key_query = select(rows.c.a, rows.c.b, rows.c.id).order_by(*order_clauses(sort_keys))
+
+    with engine.begin() as connection:
+        connection.execute(insert(rows), values)
+        expected = [tuple(row) for row in connection.execute(key_query)]
+        walked, after = [], None
+        while True:
+            page_query = key_query if after is None else key_query.where(after_clause(sort_keys, after))
+            page = [tuple(row) for row in connection.execute(page_query.limit(7))]
+            if not page:
+                break
+            walked += page
+            after = page[-1]
+
+    assert walked == expected
+
+
+@pytest.mark.parametrize("q", [None, "平台"])
+def test_keyset_pages_match_offset_pages(contracts_db, q):
+    by_offset = []
+    for offset in range(0, 80, 7):
+        results, total, _ = service.search_contracts(None, schemas.ContractSearchParams(q=q, limit=7, offset=offset))
+        by_offset += [result["id"] for result in results]
+
+    by_cursor, cursor = [], None
+    while True:
+        results, cursor_total, cursor = service.search_contracts(
+            None, schemas.ContractSearchParams(q=q, limit=7, cursor=cursor)
+        )
+        by_cursor += [result["id"] for result in results]
+        if cursor is None:
+            break
+
+    assert cursor_total == total == len(by_offset)
+    assert by_cursor == by_offset
+    assert len(set(by_cursor)) == len(by_cursor)
+
+
+def test_tampered_cursor_is_a_bad_request(contracts_db):
+    app.dependency_overrides[dependencies.get_current_user] = lambda: None
+    app.dependency_overrides[dependencies.get_db] = lambda: None
+    try:
+        with TestClient(app) as client:
+            valid = client.get("/api/search/contracts", params={"limit": 5})
+            assert valid.status_code == 200
+            assert valid.json()["next_cursor"]
+
+            tampered = client.get("/api/search/contracts", params={"limit": 5, "cursor": "not-a-cursor"})
+            mismatched = client.get("/api/search/contracts", params={"limit": 5, "cursor": encode_cursor([1])})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert tampered.status_code == 400
+    assert mismatched.status_code == 400
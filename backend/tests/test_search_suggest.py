@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from backend.app.auth.models import SearchHistory
+from backend.app.core.config import settings
+from backend.app.search import suggest
+
+
+def test_history_suggestions_need_distinct_users(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "search_suggest_history_min_count", 2)
+    engine = create_engine(f"sqlite:///{tmp_path / 'main.db'}")
+    SearchHistory.__table__.create(engine)
+
+    with Session(engine) as db:
+        # One user searching over and over, and a query two users searched once each
+        db.add_all(SearchHistory(user_id=1, query="私密项目") for _ in range(5))
+        db.add_all(SearchHistory(user_id=user_id, query="智慧城市") for user_id in (1, 2))
+        db.commit()
+
+        entries = suggest._history_entries(db)
+
+    suggested = {suggestion.text: suggestion.weight for _, suggestion in entries}
+    assert set(suggested) == {"智慧城市"}
+    assert suggested["智慧城市"] == 2 * suggest.HISTORY_WEIGHT
+    engine.dispose()
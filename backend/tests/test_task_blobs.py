@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import base64
+import os
+import time
+
+import pytest
+
+from backend.app.tasks.models import TaskStatus, TaskType
+from backend.app.tasks.service import TaskService
+
+UPLOAD = b"%PDF-1.4 tender document"
+
+
+@pytest.fixture()
+def tasks(task_sessions, task_blobs):
+    with task_sessions() as db:
+        yield TaskService(db)
+
+
+@pytest.fixture()
+def upload(task_blobs):
+    sha256, _ = task_blobs.put_bytes(UPLOAD)
+    return sha256
+
+
+def _create(tasks, payload):
+    return tasks.create_task(task_type=TaskType.BIDDING_ANALYSIS, user_id=1, payload=payload).id
+
+
+def _run(tasks, task_id, status=TaskStatus.COMPLETED):
+    (task,) = tasks.claim_tasks("worker-a", limit=1, lease_seconds=60)
+    assert task.id == task_id
+    return tasks.finish_leased_task(task_id, "worker-a", task.retry_count, status)
+
+
+def _age(task_blobs, sha256, seconds):
+    then = time.time() - seconds
+    os.utime(task_blobs.path(sha256), (then, then))
+
+
+def test_a_file_is_kept_while_any_task_references_it(tasks, task_blobs, upload):
+    first, second = _create(tasks, {"file_sha256": upload}), _create(tasks, {"file_sha256": upload})
+    _age(task_blobs, upload, 7200)
+
+    assert _run(tasks, first)
+    assert tasks.cleanup_blobs(grace_seconds=3600) == 0
+    assert task_blobs.exists(upload)
+
+    assert _run(tasks, second)
+    assert tasks.cleanup_blobs(grace_seconds=3600) == 1
+    assert not task_blobs.exists(upload)
+
+
+def test_an_unreferenced_file_is_kept_during_the_grace_period(tasks, task_blobs, upload):
+    # Uploaded, but its task is not created yet
+    assert tasks.cleanup_blobs(grace_seconds=3600) == 0
+    assert task_blobs.exists(upload)
+
+    _age(task_blobs, upload, 7200)
+    assert tasks.cleanup_blobs(grace_seconds=3600) == 1
+    assert not task_blobs.exists(upload)
+
+
+def test_inline_uploads_are_moved_to_the_store_and_released(tasks, task_blobs, upload):
+    task_id = _create(tasks, {"file_base64": base64.b64encode(UPLOAD).decode()})
+    _age(task_blobs, upload, 7200)
+    assert tasks.cleanup_blobs(grace_seconds=3600) == 0
+
+    assert _run(tasks, task_id, TaskStatus.FAILED)
+    assert tasks.cleanup_blobs(grace_seconds=3600) == 1
+
+
+def test_a_task_cancelled_while_running_keeps_its_file_until_the_worker_lets_go(tasks, task_blobs, upload):
+    task_id = _create(tasks, {"file_sha256": upload})
+    _age(task_blobs, upload, 7200)
+    (claimed,) = tasks.claim_tasks("worker-a", limit=1, lease_seconds=60)
+
+    assert tasks.cancel_task(task_id) is not None
+    # The worker is still reading the file
+    assert tasks.cleanup_blobs(grace_seconds=3600) == 0
+    assert task_blobs.exists(upload)
+    assert tasks.renew_leases("worker-a", [task_id], 60) == [task_id]
+    assert tasks.cleanup_blobs(grace_seconds=3600) == 0
+
+    # Its outcome is discarded, and the lease released with it
+    assert not tasks.finish_leased_task(task_id, "worker-a", claimed.retry_count, TaskStatus.COMPLETED)
+    assert tasks.get_task(task_id).status == TaskStatus.CANCELLED
+    assert tasks.cleanup_blobs(grace_seconds=3600) == 1
+    assert not task_blobs.exists(upload)
+
+
+def test_a_cancelled_task_whose_worker_died_releases_its_file_when_the_lease_expires(tasks, task_blobs, upload):
+    task_id = _create(tasks, {"file_sha256": upload})
+    _age(task_blobs, upload, 7200)
+    tasks.claim_tasks("worker-a", limit=1, lease_seconds=-1)
+
+    assert tasks.cancel_task(task_id) is not None
+    assert tasks.cleanup_blobs(grace_seconds=3600) == 1
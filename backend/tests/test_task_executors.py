@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from BiddingAssistant.backend.analyzer.tender_llm import TenderLLMAnalyzer
+from BiddingAssistant.backend.extractors import dispatcher, ocr_extractor
+from backend.app.tasks.executors import BiddingAnalysisExecutor
+
+
+class _FakeTesseract:
+    @staticmethod
+    def image_to_string(image, lang=None):
+        return "扫描件中的招标文本"
+
+
+def test_scanned_pdf_upload_is_ocred_from_the_blob_store(task_blobs, monkeypatch):
+    ocr_paths = []
+
+    def fake_convert_from_path(path):
+        # The OCR helper picks its path by suffix: it must see ".pdf"
+        ocr_paths.append(path)
+        assert Path(path).read_bytes() == pdf_bytes
+        return [object()]
+
+    # A scanned PDF has no text layer
+    monkeypatch.setattr(dispatcher, "extract_text_from_pdf", lambda path: "")
+    monkeypatch.setattr(ocr_extractor, "pytesseract", _FakeTesseract)
+    monkeypatch.setattr(ocr_extractor, "Image", object())
+    monkeypatch.setattr(ocr_extractor, "convert_from_path", fake_convert_from_path)
+    monkeypatch.setattr(TenderLLMAnalyzer, "analyze", lambda self, text: {"analyzed_text": text})
+
+    pdf_bytes = b"%PDF-1.4 scanned pages only"
+    sha256, size = task_blobs.put_bytes(pdf_bytes)
+    result = BiddingAnalysisExecutor().execute({
+        "file_sha256": sha256,
+        "file_size": size,
+        "filename": "招标文件.pdf",
+        "content_type": "application/pdf",
+    })
+
+    assert result["analyzed_text"] == "扫描件中的招标文本"
+    assert result["metadata"]["ocr_used"] == "true"
+    assert len(ocr_paths) == 1 and ocr_paths[0].endswith(".pdf")
+    # The temp link is gone, the stored file stays
+    assert not Path(ocr_paths[0]).exists()
+    assert task_blobs.exists(sha256)
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import threading
+
+from backend.app.tasks.models import Task, TaskStatus, TaskType
+from backend.app.tasks.service import TaskService
+
+
+def _create_tasks(sessions, count, **kwargs):
+    with sessions() as db:
+        service = TaskService(db)
+        return [
+            service.create_task(task_type=TaskType.WORKLOAD_ANALYSIS, user_id=1, payload={"n": n}, **kwargs).id
+            for n in range(count)
+        ]
+
+
+def _task(sessions, task_id) -> Task:
+    with sessions() as db:
+        return db.get(Task, task_id)
+
+
+def test_a_task_is_claimed_by_one_worker_only(task_sessions):
+    task_ids = _create_tasks(task_sessions, 3)
+
+    with task_sessions() as first, task_sessions() as second:
+        claimed_first = TaskService(first).claim_tasks("worker-a", limit=2, lease_seconds=60)
+        claimed_second = TaskService(second).claim_tasks("worker-b", limit=5, lease_seconds=60)
+        assert TaskService(first).claim_tasks("worker-a", limit=5, lease_seconds=60) == []
+
+    assert [task.id for task in claimed_first] == task_ids[:2]
+    assert [task.id for task in claimed_second] == task_ids[2:]
+    assert {task.worker_id for task in claimed_second} == {"worker-b"}
+    assert all(task.status == TaskStatus.RUNNING for task in claimed_first + claimed_second)
+
+
+def test_concurrent_claims_never_share_a_task(task_sessions):
+    task_ids = _create_tasks(task_sessions, 40)
+    barrier = threading.Barrier(4)
+    claims = {}
+
+    def claim(worker_id):
+        with task_sessions() as db:
+            service = TaskService(db)
+            barrier.wait()
+            claimed = []
+            while batch := service.claim_tasks(worker_id, limit=3, lease_seconds=60):
+                claimed += [task.id for task in batch]
+            claims[worker_id] = claimed
+
+    workers = [threading.Thread(target=claim, args=(f"worker-{n}",)) for n in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    all_claimed = [task_id for claimed in claims.values() for task_id in claimed]
+    assert sorted(all_claimed) == task_ids
+    for worker_id, claimed in claims.items():
+        assert all(_task(task_sessions, task_id).worker_id == worker_id for task_id in claimed)
+
+
+def test_expired_lease_is_reclaimed_and_the_stale_holder_cannot_finish(task_sessions):
+    (task_id,) = _create_tasks(task_sessions, 1)
+
+    with task_sessions() as stale, task_sessions() as fresh:
+        stale_service, fresh_service = TaskService(stale), TaskService(fresh)
+        # An already expired lease: the worker died right after claiming
+        (claimed,) = stale_service.claim_tasks("worker-a", limit=1, lease_seconds=-1)
+        assert claimed.retry_count == 0
+
+        assert fresh_service.reclaim_expired_tasks() == 1
+        reclaimed = _task(task_sessions, task_id)
+        assert reclaimed.status == TaskStatus.RETRY
+        assert reclaimed.retry_count == 1
+        assert reclaimed.lease_expires_at is None
+
+        (reclaimed,) = fresh_service.claim_tasks("worker-b", limit=1, lease_seconds=60)
+        assert reclaimed.worker_id == "worker-b"
+
+        # The first worker comes back: its heartbeat and its result are both refused
+        assert stale_service.renew_leases("worker-a", [task_id], 60) == [task_id]
+        assert not stale_service.finish_leased_task(task_id, "worker-a", 0, TaskStatus.COMPLETED, result={"by": "a"})
+        task = _task(task_sessions, task_id)
+        assert task.status == TaskStatus.RUNNING
+        assert task.worker_id == "worker-b"
+
+        assert fresh_service.renew_leases("worker-b", [task_id], 60) == []
+        assert fresh_service.finish_leased_task(task_id, "worker-b", 1, TaskStatus.COMPLETED, result={"by": "b"})
+
+    task = _task(task_sessions, task_id)
+    assert task.status == TaskStatus.COMPLETED
+    assert task.result == {"by": "b"}
+    assert task.lease_expires_at is None
+
+
+def test_reclaim_fails_a_task_without_retries_left(task_sessions):
+    (task_id,) = _create_tasks(task_sessions, 1, max_retries=0)
+
+    with task_sessions() as db:
+        service = TaskService(db)
+        service.claim_tasks("worker-a", limit=1, lease_seconds=-1)
+        assert service.reclaim_expired_tasks() == 1
+
+    task = _task(task_sessions, task_id)
+    assert task.status == TaskStatus.FAILED
+    assert task.completed_at is not None
+
+
+def test_live_leases_are_not_reclaimed(task_sessions):
+    (task_id,) = _create_tasks(task_sessions, 1)
+
+    with task_sessions() as db:
+        service = TaskService(db)
+        service.claim_tasks("worker-a", limit=1, lease_seconds=60)
+        assert service.reclaim_expired_tasks() == 0
+
+    assert _task(task_sessions, task_id).status == TaskStatus.RUNNING
+
+
+def test_finishing_a_cancelled_task_is_refused(task_sessions):
+    (task_id,) = _create_tasks(task_sessions, 1)
+
+    with task_sessions() as worker, task_sessions() as api:
+        TaskService(worker).claim_tasks("worker-a", limit=1, lease_seconds=60)
+        assert TaskService(api).cancel_task(task_id) is not None
+        assert not TaskService(worker).finish_leased_task(task_id, "worker-a", 0, TaskStatus.RETRY)
+
+    assert _task(task_sessions, task_id).status == TaskStatus.CANCELLED
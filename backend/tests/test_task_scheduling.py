@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from backend.app.tasks.models import TaskType
+from backend.app.tasks.service import TaskService
+
+
+def _queue(service, user_id, count, priority=0, task_type=TaskType.WORKLOAD_ANALYSIS):
+    return [
+        service.create_task(task_type=task_type, user_id=user_id, payload={"n": n}, priority=priority).id
+        for n in range(count)
+    ]
+
+
+def test_a_busy_user_cannot_starve_others(task_sessions):
+    with task_sessions() as db:
+        service = TaskService(db)
+        heavy = _queue(service, user_id=1, count=10)
+        light = _queue(service, user_id=2, count=2)
+
+        claimed = service.claim_tasks("worker-a", limit=4, lease_seconds=60)
+
+    # Users take turns although all of user 1's tasks are older
+    assert [task.id for task in claimed] == [heavy[0], light[0], heavy[1], light[1]]
+
+
+def test_recent_service_counts_against_a_user(task_sessions):
+    with task_sessions() as db:
+        service = TaskService(db)
+        heavy = _queue(service, user_id=1, count=5)
+        assert [task.id for task in service.claim_tasks("worker-a", limit=2, lease_seconds=60)] == heavy[:2]
+
+        # User 1 already has two tasks running, so a newcomer goes first
+        light = _queue(service, user_id=2, count=1)
+        claimed = service.claim_tasks("worker-a", limit=2, lease_seconds=60)
+
+    assert [task.id for task in claimed] == [light[0], heavy[2]]
+
+
+def test_higher_priority_is_claimed_first(task_sessions):
+    with task_sessions() as db:
+        service = TaskService(db)
+        normal = _queue(service, user_id=2, count=3)
+        (urgent,) = _queue(service, user_id=1, count=1, priority=10)
+
+        claimed = service.claim_tasks("worker-a", limit=2, lease_seconds=60)
+
+    assert [task.id for task in claimed] == [urgent, normal[0]]
+
+
+def test_type_budgets_bound_each_queue(task_sessions):
+    with task_sessions() as db:
+        service = TaskService(db)
+        bidding = _queue(service, user_id=1, count=3, task_type=TaskType.BIDDING_ANALYSIS)
+        workload = _queue(service, user_id=1, count=3)
+
+        claimed = service.claim_tasks(
+            "worker-a", limit=4, lease_seconds=60, type_budgets={TaskType.BIDDING_ANALYSIS: 1}
+        )
+
+    assert sorted(task.id for task in claimed) == sorted(bidding[:1] + workload)
@@ -11,6 +11,7 @@ Page({
         hasMore: true,
         page: 0,
         limit: 20,
+        nextCursor: null, // keyset cursor returned by the last page
         // Filter State
         showFilter: false,
         hasActiveFilters: false,
@@ -316,7 +317,7 @@ Page({
             return;
         }
 
-        this.setData({ loading: true, page: 0, results: [] });
+        this.setData({ loading: true, page: 0, results: [], nextCursor: null });
 
         try {
             // DEBUG: Show Params
@@ -340,6 +341,7 @@ Page({
             this.setData({
                 results: processedResults,
                 hasMore: (result.total || 0) > this.data.limit,
+                nextCursor: result.next_cursor || null,
                 loading: false
             });
         } catch (error) {
@@ -350,13 +352,15 @@ Page({
     },
 
     // 根据标签搜索
-    async searchByTab(tabIndex, query, offset) {
+    async searchByTab(tabIndex, query, offset, cursor) {
         const { filters, quickTags, limit } = this.data;
         let params = {
             q: query,
             limit: limit,
             offset: offset
         };
+        // Cursor pages cost the same no matter how deep the user scrolls
+        if (cursor) params.cursor = cursor;
 
         // Construct params specifically for each tab to avoid filter polling
         // Construct params specifically for each tab to avoid filter polling
@@ -480,13 +484,15 @@ Page({
             const result = await this.searchByTab(
                 this.data.activeTab,
                 this.data.searchQuery,
-                nextPage * this.data.limit
+                nextPage * this.data.limit,
+                this.data.nextCursor
             );
 
             const processedResults = this.processResults(result.results || []);
             this.setData({
                 results: [...this.data.results, ...processedResults],
                 hasMore: (nextPage + 1) * this.data.limit < (result.total || 0),
+                nextCursor: result.next_cursor || null,
                 loading: false
             });
         } catch (error) {